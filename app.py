@@ -1,18 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, g, has_request_context, stream_with_context, send_file, session, make_response
+from flask.signals import before_render_template, template_rendered
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from sqlalchemy import event, func, case, and_, or_, select, tuple_, insert, update, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy.dialects import postgresql, sqlite
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
 import os
 import smtplib
+import sqlite3
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.header import Header
 import io
 import csv
+import threading
+import time
+import json
+import hashlib
+import hmac
+import click
+import gzip
+from functools import wraps
+import uuid
+import re
+import unicodedata
+import bisect
+import atexit
+import logging
+from logging.handlers import RotatingFileHandler
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava de arquivo entre processos
+    fcntl = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'chave-secreta-aqui'
 
+# Catálogo oficial de discursos usado na criação dos dados iniciais
+CAMINHO_CATALOGO = os.path.join(app.root_path, 'data', 'discursos.json')
+
 # CONFIGURAÇÃO DO BANCO
 database_url = os.environ.get('DATABASE_URL')
 
@@ -24,18 +60,151 @@ if database_url:
     
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     print("✅ Conectado ao PostgreSQL via pg8000")
+    
+    # Pool de conexões de cada processo do gunicorn (ver gunicorn.conf.py)
+    if not database_url.startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        }
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sistema_discursos.db'
     print("✅ Usando SQLite local")
 
 # Configurações de Email
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'seu-email@gmail.com'
-app.config['MAIL_PASSWORD'] = 'sua-senha'
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') == '1'
+app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'seu-email@gmail.com')
+app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'sua-senha')
+app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
+
+# Caixa de saída de emails, esvaziada pelo worker `flask --app app enviar-emails`:
+# mensagens por conexão SMTP, tentativas antes de desistir, espera base entre
+# tentativas (dobra a cada falha) e quantos dias antes do discurso vai o lembrete
+app.config['EMAIL_LOTE'] = int(os.environ.get('EMAIL_LOTE', 50))
+app.config['EMAIL_TENTATIVAS'] = int(os.environ.get('EMAIL_TENTATIVAS', 5))
+app.config['EMAIL_ESPERA_BASE'] = int(os.environ.get('EMAIL_ESPERA_BASE', 60))
+app.config['EMAIL_TIMEOUT'] = int(os.environ.get('EMAIL_TIMEOUT', 300))
+app.config['EMAIL_LEMBRETE_DIAS'] = int(os.environ.get('EMAIL_LEMBRETE_DIAS', 3))
+# Fuso dos horários do circuito: o lembrete sai à meia-noite local, convertida
+# para UTC como o resto da caixa de saída
+app.config['FUSO_HORARIO'] = os.environ.get('FUSO_HORARIO', 'America/Sao_Paulo')
+
+# Tempo máximo (segundos) que um worker mantém os contadores do dashboard sem recalcular.
+# Limita a defasagem entre workers, já que a invalidação por escrita é local ao processo.
+app.config['CACHE_DASHBOARD_TTL'] = int(os.environ.get('CACHE_DASHBOARD_TTL', 60))
+
+# Listas de referência dos formulários (congregações, oradores, anfitriões, discursos):
+# validade em segundos e número máximo de listas mantidas por processo. Alterações
+# feitas em outro worker são vistas pelos contadores de data_versions, não pelo TTL.
+app.config['CACHE_REFERENCIAS_TTL'] = int(os.environ.get('CACHE_REFERENCIAS_TTL', 300))
+app.config['CACHE_REFERENCIAS_MAXIMO'] = int(os.environ.get('CACHE_REFERENCIAS_MAXIMO', 64))
+
+# Usuário logado: evita o SELECT em users a cada requisição autenticada. Alterações
+# em users (desativação, troca de senha) mudam o contador 'tabela:users' em
+# data_versions e valem em todos os workers na requisição seguinte.
+app.config['CACHE_USUARIOS_TTL'] = int(os.environ.get('CACHE_USUARIOS_TTL', 30))
+app.config['CACHE_USUARIOS_MAXIMO'] = int(os.environ.get('CACHE_USUARIOS_MAXIMO', 256))
+
+# Hash de senhas (PBKDF2): iterações por hash, processos dedicados, quantos hashes
+# podem rodar ao mesmo tempo e quanto uma requisição espera por uma vaga antes de
+# desistir. Com SENHA_PROCESSOS=0 o hash roda na própria requisição.
+app.config['SENHA_ITERACOES'] = int(os.environ.get('SENHA_ITERACOES', 600000))
+app.config['SENHA_PROCESSOS'] = int(os.environ.get('SENHA_PROCESSOS', 2))
+app.config['SENHA_CONCORRENCIA'] = int(os.environ.get('SENHA_CONCORRENCIA', app.config['SENHA_PROCESSOS'] or 1))
+app.config['SENHA_ESPERA_MAXIMA'] = float(os.environ.get('SENHA_ESPERA_MAXIMA', 10))
+
+# Paginação das listagens de agenda e histórico (?por_pagina= até o máximo)
+app.config['ITENS_POR_PAGINA'] = int(os.environ.get('ITENS_POR_PAGINA', 50))
+app.config['ITENS_POR_PAGINA_MAXIMO'] = int(os.environ.get('ITENS_POR_PAGINA_MAXIMO', 500))
+
+# API JSON: respostas a partir deste tamanho (bytes) são comprimidas com gzip
+app.config['API_GZIP_MINIMO'] = int(os.environ.get('API_GZIP_MINIMO', 1024))
+
+# Linhas buscadas por vez do cursor do banco nas exportações CSV
+app.config['EXPORTACAO_LOTE'] = int(os.environ.get('EXPORTACAO_LOTE', 1000))
+
+# Fila de relatórios PDF: arquivos gerados pelo worker `flask --app app processar-relatorios`
+app.config['RELATORIOS_PDF_DIR'] = os.environ.get(
+    'RELATORIOS_PDF_DIR', os.path.join(app.instance_path, 'relatorios')
+)
+app.config['RELATORIOS_PDF_TIMEOUT'] = int(os.environ.get('RELATORIOS_PDF_TIMEOUT', 600))
+app.config['RELATORIOS_PDF_RETENCAO_DIAS'] = int(os.environ.get('RELATORIOS_PDF_RETENCAO_DIAS', 7))
+
+# SQLite (instalação local, sem DATABASE_URL): pragmas aplicados a cada conexão
+# nova. Com WAL, leitores não bloqueiam o escritor nem são bloqueados por ele;
+# SQLITE_OTIMIZADO=0 volta ao modo padrão (rollback journal) do SQLite.
+app.config['SQLITE_OTIMIZADO'] = os.environ.get('SQLITE_OTIMIZADO', '1') == '1'
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+app.config['SQLITE_CACHE_KB'] = int(os.environ.get('SQLITE_CACHE_KB', 64 * 1024))
+
+# Métricas por rota expostas em /metrics (formato Prometheus). Cada processo do
+# gunicorn grava seus totais em METRICAS_DIR a cada METRICAS_INTERVALO segundos;
+# o /metrics soma os arquivos de todos os processos. Só usuários logados acessam;
+# o coletor do Prometheus envia `Authorization: Bearer <METRICAS_TOKEN>`.
+app.config['METRICAS_ATIVAS'] = os.environ.get('METRICAS_ATIVAS', '1') == '1'
+app.config['METRICAS_DIR'] = os.environ.get('METRICAS_DIR', os.path.join(app.instance_path, 'metricas'))
+app.config['METRICAS_INTERVALO'] = float(os.environ.get('METRICAS_INTERVALO', 5))
+app.config['METRICAS_FAIXAS'] = [
+    float(limite) for limite in
+    os.environ.get('METRICAS_FAIXAS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10').split(',')
+]
+app.config['METRICAS_TOKEN'] = os.environ.get('METRICAS_TOKEN')
+
+# Consultas SQL acima de CONSULTAS_LENTAS_MS (0 desativa) são gravadas, com
+# rota e plano de execução, num arquivo rotativo exibido em /admin/consultas-lentas.
+# O plano de um mesmo SQL é reaproveitado por CONSULTAS_LENTAS_PLANO_TTL segundos.
+# Os parâmetros (emails, tokens...) só são gravados com CONSULTAS_LENTAS_PARAMETROS=1.
+app.config['CONSULTAS_LENTAS_MS'] = float(os.environ.get('CONSULTAS_LENTAS_MS', 500))
+app.config['CONSULTAS_LENTAS_ARQUIVO'] = os.environ.get(
+    'CONSULTAS_LENTAS_ARQUIVO', os.path.join(app.instance_path, 'logs', 'consultas_lentas.log')
+)
+app.config['CONSULTAS_LENTAS_TAMANHO'] = int(os.environ.get('CONSULTAS_LENTAS_TAMANHO', 1024 * 1024))  # bytes
+app.config['CONSULTAS_LENTAS_COPIAS'] = int(os.environ.get('CONSULTAS_LENTAS_COPIAS', 5))
+app.config['CONSULTAS_LENTAS_PLANO'] = os.environ.get('CONSULTAS_LENTAS_PLANO', '1') == '1'
+app.config['CONSULTAS_LENTAS_PLANO_TTL'] = int(os.environ.get('CONSULTAS_LENTAS_PLANO_TTL', 600))
+app.config['CONSULTAS_LENTAS_PARAMETROS'] = os.environ.get('CONSULTAS_LENTAS_PARAMETROS') == '1'
+
+# Busca global: auto escolhe pelo banco (GIN no PostgreSQL, FTS5 no SQLite);
+# memoria força o índice em memória, reconstruído quando discursos, oradores ou
+# congregações mudam (em qualquer processo)
+app.config['BUSCA_MOTOR'] = os.environ.get('BUSCA_MOTOR', 'auto')
+
+# Calendários .ics por orador e congregação: por CALENDARIO_TTL segundos o
+# processo serve o calendário em cache sem consultar o banco; depois confere a
+# versão (um SELECT) e só remonta se a agenda mudou
+app.config['CALENDARIO_TTL'] = int(os.environ.get('CALENDARIO_TTL', 300))
+app.config['CALENDARIO_CACHE_MAXIMO'] = int(os.environ.get('CALENDARIO_CACHE_MAXIMO', 2000))
+app.config['CALENDARIO_DIAS_PASSADOS'] = int(os.environ.get('CALENDARIO_DIAS_PASSADOS', 90))
+app.config['CALENDARIO_FUSO'] = os.environ.get('CALENDARIO_FUSO', app.config['FUSO_HORARIO'])
+
+# Modo de depuração: falha a requisição se algum template disparar lazy load
+app.config['PROIBIR_LAZY_LOAD'] = os.environ.get('PROIBIR_LAZY_LOAD') == '1'
 
 db = SQLAlchemy(app)
+
+@event.listens_for(Engine, 'connect')
+def configurar_conexao_sqlite(conexao_dbapi, registro):
+    """Aplica os pragmas do SQLite a cada conexão aberta pelo pool"""
+    if not isinstance(conexao_dbapi, sqlite3.Connection):
+        return
+    cursor = conexao_dbapi.cursor()
+    # Integridade referencial vale em qualquer modo (como no PostgreSQL); os
+    # formulários gravam None, não '', nas chaves estrangeiras opcionais
+    cursor.execute('PRAGMA foreign_keys=ON')
+    if app.config['SQLITE_OTIMIZADO']:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT']}")
+        cursor.execute(f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']}")
+        cursor.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_KB']}")
+    cursor.close()
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -68,6 +237,9 @@ class Discurso(db.Model):
     duracao = db.Column(db.Integer, default=30)
     bloqueado = db.Column(db.Boolean, default=False)
     ativo = db.Column(db.Boolean, default=True)
+    __table_args__ = (
+        db.Index('ix_speeches_numero', 'numero'),
+    )
 
 class Orador(db.Model):
     __tablename__ = 'speakers'
@@ -80,6 +252,10 @@ class Orador(db.Model):
     aprovado = db.Column(db.Boolean, default=True)
     ativo = db.Column(db.Boolean, default=True)
     congregacao = db.relationship('Congregacao', foreign_keys=[congregacao_id])
+    __table_args__ = (
+        db.Index('ix_speakers_congregacao_ativos', 'congregacao_id',
+                 sqlite_where=ativo == True, postgresql_where=ativo == True),
+    )
 
 class AgendaDiscurso(db.Model):
     __tablename__ = 'speech_schedule'
@@ -98,6 +274,13 @@ class AgendaDiscurso(db.Model):
     orador = db.relationship('Orador', foreign_keys=[orador_id])
     congregacao = db.relationship('Congregacao', foreign_keys=[congregacao_id])
     anfitriao = db.relationship('Orador', foreign_keys=[anfitriao_id])
+    __table_args__ = (
+        db.Index('ix_speech_schedule_data', 'data_discurso', 'id'),
+        db.Index('ix_speech_schedule_congregacao_data', 'congregacao_id', 'data_discurso'),
+        db.Index('ix_speech_schedule_orador_data', 'orador_id', 'data_discurso'),
+        db.Index('ix_speech_schedule_congregacao_data_horario', 'congregacao_id', 'data_discurso', 'horario'),
+        db.Index('ix_speech_schedule_anfitriao_data', 'anfitriao_id', 'data_discurso'),
+    )
 
 class UsuarioOrador(db.Model):
     __tablename__ = 'speaker_users'
@@ -108,6 +291,10 @@ class UsuarioOrador(db.Model):
     ativo = db.Column(db.Boolean, default=True)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     orador = db.relationship('Orador', foreign_keys=[orador_id])
+    __table_args__ = (
+        db.Index('ix_speaker_users_orador_ativos', 'orador_id',
+                 sqlite_where=ativo == True, postgresql_where=ativo == True),
+    )
 
 class HistoricoDiscurso(db.Model):
     __tablename__ = 'speech_history'
@@ -121,6 +308,20 @@ class HistoricoDiscurso(db.Model):
     discurso = db.relationship('Discurso', foreign_keys=[discurso_id])
     orador = db.relationship('Orador', foreign_keys=[orador_id])
     congregacao = db.relationship('Congregacao', foreign_keys=[congregacao_id])
+    __table_args__ = (
+        db.Index('ix_speech_history_data', 'data_realizacao', 'id'),
+        db.Index('ix_speech_history_congregacao_data', 'congregacao_id', 'data_realizacao'),
+        db.Index('ix_speech_history_orador_data', 'orador_id', 'data_realizacao'),
+        db.Index('ix_speech_history_discurso_data', 'discurso_id', 'data_realizacao'),
+    )
+
+class UltimaRealizacao(db.Model):
+    """Índice derivado do histórico: última vez que cada discurso foi feito em cada congregação"""
+    __tablename__ = 'speech_last_given'
+    congregacao_id = db.Column(db.Integer, db.ForeignKey('congregations.id'), primary_key=True)
+    discurso_id = db.Column(db.Integer, db.ForeignKey('speeches.id'), primary_key=True)
+    ultima_data = db.Column(db.Date, nullable=False)
+    vezes = db.Column(db.Integer, nullable=False, default=1)
 
 class CoordenadorDiscursos(db.Model):
     __tablename__ = 'speech_coordinators'
@@ -133,6 +334,10 @@ class CoordenadorDiscursos(db.Model):
     data_fim = db.Column(db.Date)
     congregacao = db.relationship('Congregacao', foreign_keys=[congregacao_id])
     orador = db.relationship('Orador', foreign_keys=[orador_id])
+    __table_args__ = (
+        db.Index('ix_speech_coordinators_congregacao_ativos', 'congregacao_id',
+                 sqlite_where=ativo == True, postgresql_where=ativo == True),
+    )
 
 class OradorDiscurso(db.Model):
     __tablename__ = 'speaker_speeches'
@@ -146,6 +351,11 @@ class OradorDiscurso(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     orador = db.relationship('Orador', foreign_keys=[orador_id])
     discurso = db.relationship('Discurso', foreign_keys=[discurso_id])
+    __table_args__ = (
+        db.Index('ix_speaker_speeches_orador_discurso', 'orador_id', 'discurso_id'),
+        db.Index('ix_speaker_speeches_aceitos', 'data_aceitacao',
+                 sqlite_where=aceito == True, postgresql_where=aceito == True),
+    )
 
 class Evento(db.Model):
     __tablename__ = 'events'
@@ -160,253 +370,764 @@ class Evento(db.Model):
     congregacao_id = db.Column(db.Integer, db.ForeignKey('congregations.id'))
     congregacao = db.relationship('Congregacao', foreign_keys=[congregacao_id])
 
+class RelatorioPDF(db.Model):
+    __tablename__ = 'pdf_reports'
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(64), nullable=False, index=True)
+    filtros = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')
+    arquivo = db.Column(db.String(255))
+    erro = db.Column(db.Text)
+    solicitado_por = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
+
+class EmailPendente(db.Model):
+    __tablename__ = 'email_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # confirmacao, cancelamento, lembrete
+    agenda_id = db.Column(db.Integer)  # sem FK: o agendamento pode ser excluído
+    destinatario = db.Column(db.String(100), nullable=False)
+    assunto = db.Column(db.String(200), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, enviando, enviado, erro, cancelado
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    enviar_apos = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lote = db.Column(db.String(32))
+    iniciado_em = db.Column(db.DateTime)
+    enviado_em = db.Column(db.DateTime)
+    ultimo_erro = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_envio', 'status', 'enviar_apos'),
+        db.Index('ix_email_outbox_agenda', 'agenda_id'),
+    )
+
+class VersaoDados(db.Model):
+    """Contadores incrementados a cada alteração (ETag das páginas do portal do orador)"""
+    __tablename__ = 'data_versions'
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+class EstadoSemeadura(db.Model):
+    __tablename__ = 'seed_state'
+    nome = db.Column(db.String(50), primary_key=True)
+    checksum = db.Column(db.String(64), nullable=False)
+    aplicado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MigracaoAplicada(db.Model):
+    __tablename__ = 'schema_migrations'
+    versao = db.Column(db.Integer, primary_key=True)
+    descricao = db.Column(db.String(200), nullable=False)
+    aplicada_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# =============================================
+# CARREGAMENTO ANTECIPADO DE RELACIONAMENTOS
+# =============================================
+
+# Relacionamentos que cada listagem renderiza linha a linha. São carregados
+# junto com a consulta principal para evitar um SELECT extra por linha.
+RELACIONAMENTOS_AGENDA = (
+    joinedload(AgendaDiscurso.discurso),
+    joinedload(AgendaDiscurso.orador),
+    joinedload(AgendaDiscurso.congregacao),
+)
+
+RELACIONAMENTOS_HISTORICO = (
+    joinedload(HistoricoDiscurso.discurso),
+    joinedload(HistoricoDiscurso.orador),
+    joinedload(HistoricoDiscurso.congregacao),
+)
+
+RELACIONAMENTOS_ORADOR = (
+    joinedload(Orador.congregacao),
+)
+
+# Consultas que já fazem JOIN com Orador reaproveitam esse JOIN
+RELACIONAMENTOS_DISCURSOS_ACEITOS = (
+    contains_eager(OradorDiscurso.orador).joinedload(Orador.congregacao),
+    joinedload(OradorDiscurso.discurso),
+)
+
+RELACIONAMENTOS_USUARIOS_ORADORES = (
+    contains_eager(UsuarioOrador.orador).joinedload(Orador.congregacao),
+)
+
+class LazyLoadProibido(RuntimeError):
+    """Relacionamento carregado sob demanda durante a renderização de um template"""
+
+@before_render_template.connect_via(app)
+def marcar_renderizacao_template(sender, template, context, **extra):
+    g.renderizando_template = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def bloquear_lazy_load(orm_execute_state):
+    """Com PROIBIR_LAZY_LOAD ativo, falha a requisição em vez de emitir o SELECT"""
+    # lazy_loaded_from só existe em SELECTs do ORM (text() e comandos DML levantam erro)
+    if not app.config['PROIBIR_LAZY_LOAD'] or not orm_execute_state.is_select:
+        return
+    if orm_execute_state.lazy_loaded_from is None:
+        return
+    if has_request_context() and g.get('renderizando_template'):
+        origem = orm_execute_state.lazy_loaded_from.class_.__name__
+        raise LazyLoadProibido(
+            f"Lazy load a partir de {origem} ao renderizar '{request.endpoint}'. "
+            f"Declare o relacionamento nas opções de carregamento da rota."
+        )
+
+# =============================================
+# INVALIDAÇÃO DE CACHES POR ESCRITA
+# =============================================
+
+# Funções chamadas após cada commit com o conjunto de tabelas alteradas
+ouvintes_alteracao = []
+
+def ao_alterar_tabelas(funcao):
+    """Registra uma função para ser avisada das tabelas alteradas em cada commit"""
+    ouvintes_alteracao.append(funcao)
+    return funcao
+
+def registrar_tabelas_alteradas(session, *tabelas):
+    session.info.setdefault('tabelas_alteradas', set()).update(tabelas)
+
+@event.listens_for(Session, 'after_flush')
+def coletar_tabelas_do_flush(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        registrar_tabelas_alteradas(session, obj.__tablename__)
+
+@event.listens_for(Session, 'do_orm_execute')
+def coletar_tabelas_em_massa(orm_execute_state):
+    """UPDATE/DELETE/INSERT em massa não passam pelo flush"""
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    registrar_tabelas_alteradas(
+        orm_execute_state.session,
+        orm_execute_state.bind_mapper.local_table.name
+    )
+
+@event.listens_for(Session, 'after_commit')
+def notificar_tabelas_alteradas(session):
+    tabelas = session.info.pop('tabelas_alteradas', None)
+    if tabelas:
+        for funcao in ouvintes_alteracao:
+            funcao(tabelas)
+
+@event.listens_for(Session, 'after_rollback')
+def descartar_tabelas_alteradas(session):
+    session.info.pop('tabelas_alteradas', None)
+
+class ContadoresDashboard:
+    """Cache em processo dos contadores exibidos no dashboard"""
+    
+    TABELAS = {'speakers', 'speech_schedule', 'congregations', 'speeches'}
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._valores = None
+        self._mes = None
+        self._expira_em = 0
+        self._geracao = 0
+    
+    def obter(self):
+        hoje = date.today()
+        mes = (hoje.year, hoje.month)
+        with self._lock:
+            if self._valores is not None and self._mes == mes and time.monotonic() < self._expira_em:
+                return self._valores
+            geracao = self._geracao
+        
+        valores = self._calcular(date(hoje.year, hoje.month, 1))
+        with self._lock:
+            # Uma escrita concorrente invalida o que acabou de ser calculado
+            if geracao == self._geracao:
+                self._valores = valores
+                self._mes = mes
+                self._expira_em = time.monotonic() + self.ttl
+        return valores
+    
+    def invalidar(self, tabelas=None):
+        if tabelas is None or tabelas & self.TABELAS:
+            with self._lock:
+                self._valores = None
+                self._geracao += 1
+    
+    @staticmethod
+    def _calcular(inicio_mes):
+        """Calcula todos os contadores em uma única consulta"""
+        linha = db.session.query(
+            select(func.count(Orador.id)).where(Orador.ativo == True).scalar_subquery(),
+            select(func.count(AgendaDiscurso.id)).scalar_subquery(),
+            select(func.count(AgendaDiscurso.id)).where(
+                AgendaDiscurso.data_discurso >= inicio_mes
+            ).scalar_subquery(),
+            select(func.count(Congregacao.id)).where(Congregacao.ativo == True).scalar_subquery(),
+            select(func.count(Discurso.id)).scalar_subquery()
+        ).one()
+        return {
+            'total_oradores': linha[0],
+            'total_discursos': linha[1],
+            'discursos_este_mes': linha[2],
+            'congregacoes_count': linha[3],
+            'total_discursos_cadastrados': linha[4],
+        }
+
+contadores_dashboard = ContadoresDashboard(app.config['CACHE_DASHBOARD_TTL'])
+ao_alterar_tabelas(contadores_dashboard.invalidar)
+
+# =============================================
+# CACHE DAS LISTAS DE REFERÊNCIA
+# =============================================
+
+def copiar_registro(objeto, *relacionamentos):
+    """Cópia desvinculada da sessão com as colunas (e relacionamentos pedidos) do objeto"""
+    valores = {coluna.key: getattr(objeto, coluna.key) for coluna in db.inspect(objeto).mapper.column_attrs}
+    for nome in relacionamentos:
+        relacionado = getattr(objeto, nome)
+        valores[nome] = copiar_registro(relacionado) if relacionado is not None else None
+    return SimpleNamespace(**valores)
+
+class CachePorVersao:
+    """Cache em processo, limitado em tamanho (LRU) e tempo (TTL)
+    
+    Cada valor é guardado sob a versão atual das tabelas de que depende: a versão
+    local (um commit neste processo recarrega na hora) e, para as tabelas de
+    TABELAS_VERSIONADAS, o contador compartilhado em data_versions, lido uma vez
+    por requisição, que muda com escritas de qualquer worker.
+    """
+    
+    def __init__(self, ttl, maximo):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._versoes = {}
+        self._entradas = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+    
+    def obter(self, nome, tabelas, carregar):
+        compartilhadas = versoes_compartilhadas(tabelas)
+        with self._lock:
+            chave = (nome,) + tuple(self._versoes.get(tabela, 0) for tabela in tabelas) + compartilhadas
+            entrada = self._entradas.get(chave)
+            if entrada and time.monotonic() < entrada[0]:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[1]
+            self.falhas += 1
+        
+        valores = carregar()
+        with self._lock:
+            # Se uma escrita ocorreu durante a carga, a chave já está obsoleta e sai pelo LRU
+            self._entradas[chave] = (time.monotonic() + self.ttl, valores)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+        return valores
+    
+    def invalidar(self, tabelas=None):
+        with self._lock:
+            if tabelas is None:
+                self._entradas.clear()
+                return
+            for tabela in tabelas:
+                self._versoes[tabela] = self._versoes.get(tabela, 0) + 1
+
+cache_referencias = CachePorVersao(app.config['CACHE_REFERENCIAS_TTL'], app.config['CACHE_REFERENCIAS_MAXIMO'])
+ao_alterar_tabelas(cache_referencias.invalidar)
+
+cache_usuarios = CachePorVersao(app.config['CACHE_USUARIOS_TTL'], app.config['CACHE_USUARIOS_MAXIMO'])
+ao_alterar_tabelas(cache_usuarios.invalidar)
+
+class UsuarioLogado(UserMixin):
+    """Dados do usuário da sessão, sem vínculo com a sessão do banco"""
+    
+    def __init__(self, usuario):
+        self.id = usuario.id
+        self.username = usuario.username
+        self.nome = usuario.nome
+        self.congregacao_id = usuario.congregacao_id
+
+def carregar_usuario_logado(user_id):
+    usuario = User.query.filter_by(id=user_id, ativo=True).first()
+    return UsuarioLogado(usuario) if usuario else None
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """Usuários desativados deixam de ser carregados e perdem a sessão"""
+    user_id = int(user_id)
+    return cache_usuarios.obter(('usuario', user_id), ('users',), lambda: carregar_usuario_logado(user_id))
+
+def congregacoes_ativas():
+    return cache_referencias.obter('congregacoes_ativas', ('congregations',), lambda: [
+        copiar_registro(congregacao)
+        for congregacao in Congregacao.query.filter_by(ativo=True).all()
+    ])
+
+def oradores_filtrados(nome, **filtros):
+    return cache_referencias.obter(nome, ('speakers', 'congregations'), lambda: [
+        copiar_registro(orador, 'congregacao')
+        for orador in Orador.query.options(*RELACIONAMENTOS_ORADOR).filter_by(ativo=True, **filtros).all()
+    ])
+
+def oradores_ativos():
+    return oradores_filtrados('oradores_ativos')
+
+def oradores_aprovados():
+    return oradores_filtrados('oradores_aprovados', aprovado=True)
+
+def anfitrioes_aprovados():
+    return oradores_filtrados('anfitrioes_aprovados', anfitriao=True, aprovado=True)
+
+def discursos_ativos():
+    return cache_referencias.obter('discursos_ativos', ('speeches',), lambda: [
+        copiar_registro(discurso)
+        for discurso in Discurso.query.filter_by(ativo=True).order_by(Discurso.numero).all()
+    ])
+
+def discursos_liberados():
+    return [discurso for discurso in discursos_ativos() if not discurso.bloqueado]
+
+# =============================================
+# VERSÕES DOS DADOS DO PORTAL DO ORADOR (ETAG)
+# =============================================
+
+# Alterações em massa nessas tabelas mudam a versão geral do portal (vale para todos os oradores)
+TABELAS_PORTAL = {'speeches', 'congregations', 'speech_schedule', 'speaker_speeches', 'speakers'}
+
+def incrementar_versoes(conexao, nomes):
+    """Soma 1 a cada contador em data_versions, criando os que ainda não existem"""
+    tabela = VersaoDados.__table__
+    for nome in sorted(nomes):
+        atualizados = conexao.execute(
+            tabela.update().where(tabela.c.nome == nome).values(versao=tabela.c.versao + 1)
+        ).rowcount
+        if not atualizados:
+            dialeto = conexao.dialect.name
+            if dialeto in ('postgresql', 'sqlite'):
+                comando = (postgresql if dialeto == 'postgresql' else sqlite).insert(tabela).values(nome=nome, versao=1)
+                conexao.execute(comando.on_conflict_do_update(
+                    index_elements=['nome'], set_={'versao': tabela.c.versao + 1}
+                ))
+            else:
+                conexao.execute(tabela.insert().values(nome=nome, versao=1))
+
+def oradores_alterados(objeto):
+    """Oradores cujas páginas mudam com o objeto (inclusive o orador anterior de um agendamento)"""
+    if isinstance(objeto, Orador):
+        return {objeto.id}
+    if isinstance(objeto, (AgendaDiscurso, OradorDiscurso)):
+        historico = db.inspect(objeto).attrs.orador_id.history
+        return {orador_id for orador_id in (*historico.added, *historico.unchanged, *historico.deleted) if orador_id}
+    return set()
+
+@event.listens_for(Session, 'after_flush')
+def versionar_portal_do_flush(session, flush_context):
+    nomes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Discurso, Congregacao)):
+            nomes.add('portal')
+        nomes.update(f'orador:{orador_id}' for orador_id in oradores_alterados(obj))
+    if nomes:
+        incrementar_versoes(session.connection(), nomes)
+
+@event.listens_for(Session, 'do_orm_execute')
+def versionar_portal_em_massa(orm_execute_state):
+    """Alterações em massa não dizem quais oradores afetam: muda a versão de todos"""
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.bind_mapper.local_table.name in TABELAS_PORTAL:
+        incrementar_versoes(orm_execute_state.session.connection(), {'portal'})
+
+# Tabelas com contador próprio ('tabela:<nome>'): caches que dependem delas
+# conferem o contador para enxergar alterações feitas por qualquer processo
+# (users: desativação, troca de senha e de perfil valem na próxima requisição)
+TABELAS_VERSIONADAS = {'speeches', 'speakers', 'congregations', 'users'}
+
+@event.listens_for(Session, 'after_flush')
+def versionar_tabelas_do_flush(session, flush_context):
+    nomes = {
+        f'tabela:{obj.__tablename__}'
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if obj.__tablename__ in TABELAS_VERSIONADAS
+    }
+    if nomes:
+        incrementar_versoes(session.connection(), nomes)
+
+@event.listens_for(Session, 'do_orm_execute')
+def versionar_tabelas_em_massa(orm_execute_state):
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    tabela = orm_execute_state.bind_mapper.local_table.name
+    if tabela in TABELAS_VERSIONADAS:
+        incrementar_versoes(orm_execute_state.session.connection(), {f'tabela:{tabela}'})
+
+def versoes_compartilhadas(tabelas):
+    """Contadores das tabelas versionadas entre `tabelas`, lidos uma vez por requisição"""
+    if has_request_context():
+        if 'versoes_tabelas' not in g:
+            todas = sorted(TABELAS_VERSIONADAS)
+            g.versoes_tabelas = dict(zip(todas, versoes_tabelas(todas)))
+        versoes = g.versoes_tabelas
+    else:
+        versionadas = [tabela for tabela in tabelas if tabela in TABELAS_VERSIONADAS]
+        versoes = dict(zip(versionadas, versoes_tabelas(versionadas)))
+    return tuple(versoes.get(tabela, 0) for tabela in tabelas if tabela in TABELAS_VERSIONADAS)
+
+def versoes_tabelas(tabelas):
+    """Contadores atuais das tabelas, na ordem pedida (um SELECT pela chave primária)"""
+    nomes = [f'tabela:{tabela}' for tabela in tabelas]
+    versoes = dict(db.session.query(VersaoDados.nome, VersaoDados.versao).filter(
+        VersaoDados.nome.in_(nomes)
+    ).all())
+    return [versoes.get(nome, 0) for nome in nomes]
+
+def etag_orador(orador_id):
+    """ETag das páginas do orador: um SELECT pela chave primária de data_versions"""
+    versoes = dict(db.session.query(VersaoDados.nome, VersaoDados.versao).filter(
+        VersaoDados.nome.in_(('portal', f'orador:{orador_id}'))
+    ).all())
+    # A data entra porque a agenda do orador só mostra discursos a partir de hoje
+    return f"{orador_id}-{versoes.get('portal', 0)}-{versoes.get(f'orador:{orador_id}', 0)}-{date.today().isoformat()}"
+
+def resposta_condicional_orador(view):
+    """Responde 304 sem consultar nem renderizar quando a ETag do orador não mudou"""
+    @wraps(view)
+    def verificar(orador_id, *args, **kwargs):
+        # Mensagens flash pendentes precisam ser exibidas: renderiza normalmente
+        if '_flashes' in session:
+            return view(orador_id, *args, **kwargs)
+        
+        etag = etag_orador(orador_id)
+        if request.if_none_match.contains_weak(etag):
+            resposta = Response(status=304)
+        else:
+            resposta = make_response(view(orador_id, *args, **kwargs))
+        resposta.set_etag(etag, weak=True)
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta
+    return verificar
+
+def carregar_catalogo_discursos():
+    """Lê o catálogo de discursos e devolve (itens, checksum SHA-256 do arquivo)"""
+    with open(CAMINHO_CATALOGO, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    return json.loads(conteudo), hashlib.sha256(conteudo).hexdigest()
 
 def criar_dados_iniciais():
     """Cria apenas os dados que não existem"""
     try:
-        if not Congregacao.query.first():
+        congregacao = Congregacao.query.order_by(Congregacao.id).first()
+        if not congregacao:
             congregacao = Congregacao(nome="Congregação Central", localidade="São Paulo")
             db.session.add(congregacao)
             db.session.commit()
             print("✅ Congregação padrão criada")
-        else:
-            congregacao = Congregacao.query.first()
         
         if not User.query.filter_by(username="admin").first():
             admin = User(
                 username="admin",
-                password=generate_password_hash("admin123"),
+                password=servico_senhas.gerar("admin123"),
                 nome="Administrador Principal",
                 congregacao_id=congregacao.id
             )
             db.session.add(admin)
             print("✅ Usuário admin criado")
         
-        discursos_existentes = Discurso.query.count()
-        if discursos_existentes < 194:
-            print(f"🔧 Criando discursos faltantes... ({discursos_existentes}/194)")
-            
-            todos_discursos = [
-                (1, "Você conhece bem a Deus?", "Conhecimento de Deus"),
-                (2, "Você vai sobreviver aos últimos dias?", "Sobrevivência"),
-                (3, "Você está avançando com a organização unida de Jeová?", "Organização"),
-                (4, "Que provas temos de que Deus existe?", "Existência de Deus"),
-                (5, "Você pode ter uma família feliz!", "Família"),
-                (6, "O Dilúvio dos dias de Noé e você", "Dilúvio"),
-                (7, "Imite a misericórdia de Jeová", "Misericórdia"),
-                (8, "Viva para fazer a vontade de Deus", "Vontade de Deus"),
-                (9, "Escute e faça o que a Bíblia diz", "Obediência"),
-                (10, "Seja honesto em tudo", "Honestidade"),
-                (11, "Imite a Jesus e não faça parte do mundo", "Imitação de Cristo"),
-                (12, "Deus quer que você respeite quem tem autoridade", "Autoridade"),
-                (13, "Qual o ponto de vista de Deus sobre o sexo e o casamento?", "Casamento"),
-                (14, "Um povo puro e limpo honra a Jeová", "Pureza"),
-                (15, "'Faça o bem a todos'", "Bondade"),
-                (16, "Seja cada vez mais amigo de Jeová", "Amizade com Deus"),
-                (17, "Glorifique a Deus com tudo o que você tem", "Glorificação"),
-                (18, "Faça de Jeová a sua fortaleza", "Fortaleza"),
-                (19, "Como você pode saber seu futuro?", "Futuro"),
-                (20, "Chegou o tempo de Deus governar o mundo?", "Governo de Deus"),
-                (21, "Dê valor ao seu lugar no Reino de Deus", "Reino de Deus"),
-                (22, "Você está usando bem o que Jeová lhe dá?", "Mordomia"),
-                (23, "A vida tem objetivo", "Objetivo da Vida"),
-                (24, "Você encontrou 'uma pérola de grande valor'?", "Valor Espiritual"),
-                (25, "Lute contra o espírito do mundo", "Luta Espiritual"),
-                (26, "Você é importante para Deus?", "Importância para Deus"),
-                (27, "Como construir um casamento feliz", "Casamento Feliz"),
-                (28, "Mostre respeito e amor no seu casamento", "Respeito no Casamento"),
-                (29, "As responsabilidades e recompensas de ter filhos", "Paternidade"),
-                (30, "Como melhorar a comunicação na família", "Comunicação Familiar"),
-                (31, "Você tem consciência da sua necessidade espiritual?", "Necessidade Espiritual"),
-                (32, "Como lidar com as ansiedades da vida", "Ansiedades"),
-                (33, "Quando vai existir verdadeira justiça?", "Justiça"),
-                (34, "Você vai ser marcado para sobreviver?", "Sobrevivência"),
-                (35, "É possível viver para sempre? O que você precisa fazer?", "Vida Eterna"),
-                (36, "Será que a vida é só isso?", "Sentido da Vida"),
-                (37, "Obedecer a Deus é mesmo a melhor coisa a fazer?", "Obediência a Deus"),
-                (38, "Como você pode sobreviver ao fim do mundo?", "Fim do Mundo"),
-                (39, "Jesus Cristo vence o mundo — Como e quando?", "Vitória de Cristo"),
-                (40, "O que vai acontecer em breve?", "Eventos Futuros"),
-                (41, "Fiquem parados e vejam como Jeová os salvará", "Salvação"),
-                (42, "O amor pode vencer o ódio?", "Amor vs Ódio"),
-                (43, "Tudo o que Deus nos pede é para o nosso bem", "Bem-estar"),
-                (44, "Como os ensinos de Jesus podem ajudar você?", "Ensinos de Jesus"),
-                (45, "Continue andando no caminho que leva à vida", "Caminho da Vida"),
-                (46, "Fortaleça sua confiança em Jeová", "Confiança"),
-                (47, "Discurso Reservado", "Tema Reservado"),
-                (48, "Seja leal a Deus mesmo quando for testado", "Lealdade"),
-                (49, "Será que um dia a Terra vai ser limpa?", "Terra Limpa"),
-                (50, "Como sempre tomar as melhores decisões", "Decisões"),
-                (51, "Será que a verdade da Bíblia está mudando a sua vida?", "Verdade Bíblica"),
-                (52, "Quem é o seu Deus?", "Deus Verdadeiro"),
-                (53, "Você pensa como Deus?", "Pensamento Divino"),
-                (54, "Fortaleça sua fé em Deus e em suas promessas", "Fé"),
-                (55, "Você está fazendo um bom nome perante Deus?", "Reputação"),
-                (56, "Existe um líder em quem você pode confiar?", "Liderança"),
-                (57, "Como suportar perseguição", "Perseguição"),
-                (58, "Quem são os verdadeiros seguidores de Cristo?", "Seguidores de Cristo"),
-                (59, "Discurso Reservado", "Tema Reservado"),
-                (60, "Você tem um objetivo na vida?", "Objetivo"),
-                (61, "Nas promessas de quem você confia?", "Promessas"),
-                (62, "Onde encontrar uma esperança real para o futuro?", "Esperança"),
-                (63, "Tem você espírito evangelizador?", "Evangelização"),
-                (64, "Você ama os prazeres ou a Deus?", "Amor a Deus"),
-                (65, "Como podemos ser pacíficos num mundo cheio de ódio", "Paz"),
-                (66, "Você também vai participar na colheita?", "Colheita"),
-                (67, "Medite na Bíblia e nas criações de Jeová", "Meditação"),
-                (68, "'Continuem a perdoar uns aos outros liberalmente'", "Perdão"),
-                (69, "Por que mostrar amor abnegado?", "Amor Abnegado"),
-                (70, "Por que Deus merece sua confiança?", "Confiança em Deus"),
-                (71, "'Mantenha-se desperto' — Por que e como?", "Vigilância"),
-                (72, "O amor identifica os cristãos verdadeiros", "Amor Cristão"),
-                (73, "Você tem 'um coração sábio?'", "Sabedoria"),
-                (74, "Os olhos de Jeová estão em todo lugar", "Onisciência"),
-                (75, "Mostre que você apoia o direito de Jeová governar", "Governo Divino"),
-                (76, "Princípios bíblicos — Podem nos ajudar a lidar com os problemas atuais?", "Princípios Bíblicos"),
-                (77, "'Sempre mostrem hospitalidade'", "Hospitalidade"),
-                (78, "Sirva a Jeová com um coração alegre", "Serviço Alegre"),
-                (79, "Você vai escolher ser amigo de Deus?", "Amizade com Deus"),
-                (80, "Você baseia a sua esperança na ciência ou na Bíblia?", "Ciência vs Bíblia"),
-                (81, "Quem está qualificado para fazer discípulos?", "Discipulado"),
-                (82, "Discurso Reservado", "Tema Reservado"),
-                (83, "Será que os cristãos precisam obedecer aos Dez Mandamentos?", "Dez Mandamentos"),
-                (84, "Escapará do destino deste mundo?", "Destino Mundial"),
-                (85, "Boas notícias num mundo violento", "Boas Notícias"),
-                (86, "Como orar a Deus e ser ouvido por ele?", "Oração"),
-                (87, "Qual é a sua relação com Deus?", "Relação com Deus"),
-                (88, "Por que viver de acordo com os padrões da Bíblia?", "Padrões Bíblicos"),
-                (89, "Quem tem sede da verdade, venha!", "Verdade"),
-                (90, "Faça o máximo para alcançar a verdadeira vida!", "Vida Verdadeira"),
-                (91, "A presença do Messias e seu domínio", "Messias"),
-                (92, "O papel da religião nos assuntos do mundo", "Religião"),
-                (93, "Desastres naturais — Quando vão acabar?", "Desastres Naturais"),
-                (94, "A religião verdadeira atende às necessidades da sociedade humana", "Religião Verdadeira"),
-                (95, "Não seja enganado pelo ocultismo!", "Ocultismo"),
-                (96, "O que vai acontecer com as religiões?", "Futuro das Religiões"),
-                (97, "Permaneçamos inculpes em meio a uma geração pervertida", "Inculpabilidade"),
-                (98, "'A cena deste mundo está mudando'", "Mudança Mundial"),
-                (99, "Por que podemos confiar no que a Bíblia diz?", "Confiança na Bíblia"),
-                (100, "Como fazer amizades fortes e verdadeiras", "Amizades"),
-                (101, "Jeová é o 'Grandioso Criador'", "Criação"),
-                (102, "Preste atenção à 'palavra profética'", "Profecia"),
-                (103, "Como você pode ter a verdadeira alegria?", "Alegria"),
-                (104, "Pais, vocês estão construindo com materiais à prova de fogo?", "Paternidade Cristã"),
-                (105, "Somos consolados em todas as nossas tribulações", "Consolo"),
-                (106, "Arruinar a Terra provocará retribuição divina", "Cuidado da Terra"),
-                (107, "Você está treinando bem a sua consciência?", "Consciência"),
-                (108, "Você pode encarar o futuro com confiança!", "Confiança no Futuro"),
-                (109, "O Reino de Deus está próximo", "Reino Próximo"),
-                (110, "Deus vem primeiro na vida familiar bem-sucedida", "Deus em Primeiro"),
-                (111, "É possível que a humanidade seja completamente curada?", "Cura"),
-                (112, "Discurso Reservado", "Tema Reservado"),
-                (113, "Jovens — Como vocês podem ter uma vida feliz?", "Juventude"),
-                (114, "Aprecio pelas maravilhas da criação de Deus", "Maravilhas da Criação"),
-                (115, "Não caia nas armadilhas de Satanás", "Armadilhas de Satanás"),
-                (116, "Escolha sabiamente com quem irá associar-se!", "Associações"),
-                (117, "Como vencer o mal com o bem", "Bem vs Mal"),
-                (118, "Olhemos os jovens do ponto de vista de Jeová", "Juventude e Deus"),
-                (119, "Por que é benéfico que os cristãos vivam separados do mundo", "Separação do Mundo"),
-                (120, "Por que se submeter à regência de Deus agora", "Submissão a Deus"),
-                (121, "Uma família mundial que será salva da destruição", "Família Mundial"),
-                (122, "Discurso Reservado", "Tema Reservado"),
-                (123, "Discurso Reservado", "Tema Reservado"),
-                (124, "Razões para crer que a Bíblia é de autoria divina", "Autoria Divina"),
-                (125, "Por que a humanidade precisa de resgate", "Resgate"),
-                (126, "Quem se salvará?", "Salvação"),
-                (127, "O que acontece quando morremos?", "Morte"),
-                (128, "É o inferno um lugar de tormento ardente?", "Inferno"),
-                (129, "O que a Bíblia diz sobre a Trindade?", "Trindade"),
-                (130, "A Terra permanecerá para sempre", "Terra Eterna"),
-                (131, "Discurso Reservado", "Tema Reservado"),
-                (132, "Ressurreição — A vitória sobre a morte!", "Ressurreição"),
-                (133, "Tem importância o que cremos sobre a nossa origem?", "Origem"),
-                (134, "Será que os cristãos precisam guardar o sábado?", "Sábado"),
-                (135, "A santidade da vida e do sangue", "Santidade da Vida"),
-                (136, "Será que Deus aprova o uso de imagens na adoração?", "Imagens"),
-                (137, "Ocorreram realmente os milagres da Bíblia?", "Milagres"),
-                (138, "Viva com bom juízo num mundo depravado", "Bom Juízo"),
-                (139, "Sabedoria divina num mundo científico", "Sabedoria Divina"),
-                (140, "Quem é realmente Jesus Cristo?", "Jesus Cristo"),
-                (141, "Quando terão fim os gemidos da criação humana?", "Gemidos da Criação"),
-                (142, "Por que refugiar-se em Jeová", "Refúgio em Deus"),
-                (143, "Confie no Deus de todo consolo", "Deus de Consolo"),
-                (144, "Uma congregação leal sob a liderança de Cristo", "Congregação Leal"),
-                (145, "Quem é semelhante a Jeová, nosso Deus?", "Unicidade de Deus"),
-                (146, "Use a educação para louvar a Jeová", "Educação"),
-                (147, "Confie que Jeová tem o poder para nos salvar", "Poder de Deus"),
-                (148, "Você tem o mesmo conceito de Deus sobre a vida?", "Conceito de Vida"),
-                (149, "O que significa 'andar com Deus'?", "Andar com Deus"),
-                (150, "Este mundo está condenado à destruição?", "Destruição Mundial"),
-                (151, "Jeová é 'uma altura protetora' para seu povo", "Proteção Divina"),
-                (152, "Armagedom — Por que e quando?", "Armagedom"),
-                (153, "Tenha bem em mente o 'atemorizante dia'!", "Dia do Juízo"),
-                (154, "O governo humano é pesado na balança", "Governo Humano"),
-                (155, "Chegou a hora do julgamento de Babilônia?", "Julgamento de Babilônia"),
-                (156, "O Dia do Juízo — Tempo de temor ou de esperança?", "Dia do Juízo"),
-                (157, "Como os verdadeiros cristãos adornam o ensino divino", "Ensino Divino"),
-                (158, "Seja corajoso e confie em Jeová", "Coragem"),
-                (159, "Como encontrar segurança num mundo perigoso", "Segurança"),
-                (160, "Mantenha a identidade cristã!", "Identidade Cristã"),
-                (161, "Por que Jesus sofreu e morreu?", "Morte de Jesus"),
-                (162, "Seja liberto deste mundo em escuridão", "Libertação"),
-                (163, "Por que temer o Deus verdadeiro?", "Temor a Deus"),
-                (164, "Será que Deus ainda está no controle?", "Controle Divino"),
-                (165, "Os valores de quem você preza?", "Valores"),
-                (166, "Verdadeira fé — O que é e como mostrar", "Fé Verdadeira"),
-                (167, "Ajamos sabiamente num mundo insensato", "Sabedoria Prática"),
-                (168, "Você pode sentir-se seguro neste mundo atribulado!", "Segurança"),
-                (169, "Por que ser orientado pela Bíblia?", "Orientação Bíblica"),
-                (170, "Quem está qualificado para governar a humanidade?", "Governo"),
-                (171, "Poderá viver em paz agora — E para sempre!", "Paz Eterna"),
-                (172, "Que reputação você tem perante Deus?", "Reputação"),
-                (173, "Existe uma religião verdadeira do ponto de vista de Deus?", "Religião Verdadeira"),
-                (174, "Quem se qualificará para entrar no novo mundo de Deus?", "Novo Mundo"),
-                (175, "O que prova que a Bíblia é autêntica?", "Autenticidade Bíblica"),
-                (176, "Quando haverá verdadeira paz e segurança?", "Paz e Segurança"),
-                (177, "Onde encontrar ajuda em tempos de aflição?", "Ajuda Divina"),
-                (178, "Ande no caminho da integridade", "Integridade"),
-                (179, "Rejeite as fantasias do mundo, empenhe-se pelas realidades do Reino", "Realidades do Reino"),
-                (180, "A ressurreição — Por que essa esperança deve ser real para você", "Esperança da Ressurreição"),
-                (181, "Já é mais tarde do que você imagina?", "Tempo"),
-                (182, "O que o Reino de Deus está fazendo por nós agora?", "Reino de Deus"),
-                (183, "Desvie seus olhos do que é fútil!", "Futilidade"),
-                (184, "A morte é o fim de tudo?", "Morte"),
-                (185, "Será que a verdade influencia sua vida?", "Influência da Verdade"),
-                (186, "Sirva em união com o povo feliz de Deus", "União"),
-                (187, "Por que um Deus amoroso permite a maldade?", "Problema do Mal"),
-                (188, "Você confia em Jeová?", "Confiança"),
-                (189, "Ande com Deus e receba bênçãos para sempre", "Bênçãos"),
-                (190, "Como se cumprirá a promessa de perfeita felicidade familiar", "Felicidade Familiar"),
-                (191, "Como o amor e a fé vencem o mundo", "Amor e Fé"),
-                (192, "Você está no caminho para a vida eterna?", "Caminho da Vida"),
-                (193, "Os problemas de hoje logo serão coisa do passado", "Problemas Temporários"),
-                (194, "Como a sabedoria de Deus nos ajuda", "Sabedoria de Deus")
-            ]
-            
-            for numero, titulo, tema in todos_discursos:
-                discurso_existente = Discurso.query.filter_by(numero=numero).first()
-                if not discurso_existente:
-                    discurso = Discurso(
-                        numero=numero,
-                        titulo=titulo,
-                        tema=tema,
-                        descricao=f"Discurso público #{numero}",
-                        duracao=30,
-                        bloqueado=False
-                    )
-                    db.session.add(discurso)
-            
+        catalogo, checksum = carregar_catalogo_discursos()
+        estado = EstadoSemeadura.query.get('discursos')
+        
+        if estado and estado.checksum == checksum:
             db.session.commit()
-            print(f"✅ Discursos criados: {Discurso.query.count()}/194")
+            print("✅ Catálogo de discursos inalterado, nada a criar")
+            return
+        
+        existentes = {numero for (numero,) in db.session.query(Discurso.numero)}
+        faltantes = [
+            {
+                'numero': item['numero'],
+                'titulo': item['titulo'],
+                'tema': item['tema'],
+                'descricao': f"Discurso público #{item['numero']}",
+                'duracao': 30,
+                'bloqueado': False,
+                'ativo': True
+            }
+            for item in catalogo if item['numero'] not in existentes
+        ]
+        
+        if faltantes:
+            print(f"🔧 Criando discursos faltantes... ({len(existentes)}/{len(catalogo)})")
+            db.session.execute(insert(Discurso), faltantes)
+        
+        if estado:
+            estado.checksum = checksum
+            estado.aplicado_em = datetime.utcnow()
         else:
-            print(f"✅ Todos os 194 discursos já existem")
+            db.session.add(EstadoSemeadura(nome='discursos', checksum=checksum))
+        
+        db.session.commit()
+        print(f"✅ Discursos criados: {len(faltantes)} ({len(catalogo)} no catálogo)")
             
     except Exception as e:
         print(f"❌ Erro ao criar dados iniciais: {e}")
         db.session.rollback()
+        # inicializar_banco decide se o erro interrompe (semear) ou só é registrado
+        raise
+
+# =============================================
+# PAGINAÇÃO POR CURSOR (KEYSET)
+# =============================================
+
+class Pagina:
+    """Itens de uma página e os cursores para a próxima e a anterior"""
+    
+    def __init__(self, itens, por_pagina, proximo=None, anterior=None):
+        self.itens = itens
+        self.por_pagina = por_pagina
+        self.proximo = proximo
+        self.anterior = anterior
+
+def obter_tamanho_pagina():
+    por_pagina = request.args.get('por_pagina', '')
+    if not por_pagina.isdigit() or int(por_pagina) < 1:
+        return app.config['ITENS_POR_PAGINA']
+    return min(int(por_pagina), app.config['ITENS_POR_PAGINA_MAXIMO'])
+
+def codificar_cursor(data_item, id_item):
+    return f"{data_item.isoformat()}_{id_item}"
+
+def decodificar_cursor(cursor):
+    """Converte 'AAAA-MM-DD_id' em (data, id); cursores inválidos são ignorados"""
+    if not cursor:
+        return None
+    try:
+        data_cursor, id_cursor = cursor.split('_', 1)
+        return datetime.strptime(data_cursor, '%Y-%m-%d').date(), int(id_cursor)
+    except ValueError:
+        return None
+
+def paginar_por_cursor(query, coluna_data, coluna_id, decrescente=False):
+    """Pagina a consulta por (data, id) a partir dos parâmetros ?apos= / ?antes=
+    
+    Cada página custa uma consulta indexada de por_pagina + 1 linhas,
+    independente de quantas páginas vêm antes dela.
+    """
+    por_pagina = obter_tamanho_pagina()
+    apos = decodificar_cursor(request.args.get('apos'))
+    antes = decodificar_cursor(request.args.get('antes')) if not apos else None
+    chave = tuple_(coluna_data, coluna_id)
+    voltando = antes is not None
+    
+    if apos:
+        query = query.filter(chave < apos if decrescente else chave > apos)
+    elif antes:
+        query = query.filter(chave > antes if decrescente else chave < antes)
+    
+    # Ao voltar uma página a ordenação é invertida e o resultado desinvertido depois
+    ordem_decrescente = decrescente != voltando
+    if ordem_decrescente:
+        query = query.order_by(coluna_data.desc(), coluna_id.desc())
+    else:
+        query = query.order_by(coluna_data.asc(), coluna_id.asc())
+    
+    itens = query.limit(por_pagina + 1).all()
+    tem_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+    if voltando:
+        itens.reverse()
+    
+    pagina = Pagina(itens, por_pagina)
+    if not itens:
+        return pagina
+    
+    atributo_data = coluna_data.key
+    cursor_primeiro = codificar_cursor(getattr(itens[0], atributo_data), itens[0].id)
+    cursor_ultimo = codificar_cursor(getattr(itens[-1], atributo_data), itens[-1].id)
+    if voltando:
+        pagina.anterior = cursor_primeiro if tem_mais else None
+        pagina.proximo = cursor_ultimo
+    else:
+        pagina.anterior = cursor_primeiro if apos else None
+        pagina.proximo = cursor_ultimo if tem_mais else None
+    return pagina
+
+def paginar_por_id(query, coluna_id):
+    """Como paginar_por_cursor, para listas ordenadas só pelo id (?apos=<id> / ?antes=<id>)"""
+    por_pagina = obter_tamanho_pagina()
+    apos = request.args.get('apos', type=int)
+    antes = request.args.get('antes', type=int) if apos is None else None
+    voltando = antes is not None
+    
+    if apos is not None:
+        query = query.filter(coluna_id > apos)
+    elif voltando:
+        query = query.filter(coluna_id < antes)
+    
+    query = query.order_by(coluna_id.desc() if voltando else coluna_id.asc())
+    itens = query.limit(por_pagina + 1).all()
+    tem_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+    if voltando:
+        itens.reverse()
+    
+    pagina = Pagina(itens, por_pagina)
+    if not itens:
+        return pagina
+    if voltando:
+        pagina.anterior = str(itens[0].id) if tem_mais else None
+        pagina.proximo = str(itens[-1].id)
+    else:
+        pagina.anterior = str(itens[0].id) if apos is not None else None
+        pagina.proximo = str(itens[-1].id) if tem_mais else None
+    return pagina
+
+def argumentos_sem_cursor():
+    """Filtros atuais da query string, para os links de paginação"""
+    return {chave: valor for chave, valor in request.args.items() if chave not in ('apos', 'antes')}
+
+# =============================================
+# EXPORTAÇÃO CSV EM STREAMING
+# =============================================
+
+def gerar_csv(cabecalho, linhas, linhas_por_bloco=500):
+    """Gera o CSV em blocos de bytes, sem montar o arquivo inteiro na memória"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(cabecalho)
+    
+    for i, linha in enumerate(linhas, 1):
+        writer.writerow(linha)
+        if i % linhas_por_bloco == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    yield buffer.getvalue().encode('utf-8')
+
+def resposta_csv(prefixo_arquivo, cabecalho, linhas):
+    filename = f"{prefixo_arquivo}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    return Response(
+        stream_with_context(gerar_csv(cabecalho, linhas)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment;filename={filename}"}
+    )
+
+# =============================================
+# HASH DE SENHAS EM PROCESSOS SEPARADOS
+# =============================================
+
+class ServicoSenhasOcupado(RuntimeError):
+    pass
+
+class ServicoSenhas:
+    """Executa o hash de senhas num pool de processos limitado
+    
+    O PBKDF2 é lento de propósito; rodando fora do worker web, uma rajada de
+    logins ocupa apenas as vagas do pool e as demais páginas continuam respondendo.
+    """
+    
+    def __init__(self, iteracoes, processos, concorrencia, espera_maxima):
+        self.metodo = f'pbkdf2:sha256:{iteracoes}'
+        self.processos = processos
+        self.espera_maxima = espera_maxima
+        self._vagas = threading.BoundedSemaphore(concorrencia)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.metricas = {
+            'concorrencia': concorrencia,
+            'em_execucao': 0,
+            'na_fila': 0,
+            'pico_fila': 0,
+            'concluidos': 0,
+            'recusados': 0,
+            'espera_total_segundos': 0.0,
+            'execucao_total_segundos': 0.0,
+        }
+    
+    def _obter_executor(self):
+        # O pool não sobrevive ao fork dos workers do gunicorn: cria um por processo.
+        # forkserver (ou spawn, no Windows) evita herdar threads e conexões do worker.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processos,
+                    mp_context=multiprocessing.get_context(metodo)
+                )
+                self._pid = os.getpid()
+            return self._executor
+    
+    def _executar(self, funcao, *args):
+        inicio = time.monotonic()
+        with self._lock:
+            self.metricas['na_fila'] += 1
+            self.metricas['pico_fila'] = max(self.metricas['pico_fila'], self.metricas['na_fila'])
+        
+        conseguiu_vaga = self._vagas.acquire(timeout=self.espera_maxima)
+        with self._lock:
+            self.metricas['na_fila'] -= 1
+            self.metricas['espera_total_segundos'] += time.monotonic() - inicio
+            if not conseguiu_vaga:
+                self.metricas['recusados'] += 1
+            else:
+                self.metricas['em_execucao'] += 1
+        if not conseguiu_vaga:
+            raise ServicoSenhasOcupado('Muitos acessos simultâneos')
+        
+        inicio_execucao = time.monotonic()
+        try:
+            if self.processos <= 0:
+                return funcao(*args)
+            return self._obter_executor().submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+            with self._lock:
+                self.metricas['em_execucao'] -= 1
+                self.metricas['concluidos'] += 1
+                self.metricas['execucao_total_segundos'] += time.monotonic() - inicio_execucao
+    
+    def gerar(self, senha):
+        return self._executar(generate_password_hash, senha, self.metodo)
+    
+    def verificar(self, senha_hash, senha):
+        return self._executar(check_password_hash, senha_hash, senha)
+    
+    def precisa_rehash(self, senha_hash):
+        """Hashes gerados com outro método ou número de iterações são refeitos no login"""
+        return senha_hash.split('$', 1)[0] != self.metodo
+    
+    def obter_metricas(self):
+        with self._lock:
+            return dict(self.metricas)
+
+servico_senhas = ServicoSenhas(
+    app.config['SENHA_ITERACOES'],
+    app.config['SENHA_PROCESSOS'],
+    app.config['SENHA_CONCORRENCIA'],
+    app.config['SENHA_ESPERA_MAXIMA']
+)
+
+def autenticar(conta, senha):
+    """Confere a senha da conta (User ou UsuarioOrador) e atualiza o hash se o fator mudou"""
+    if not conta or not servico_senhas.verificar(conta.password, senha):
+        return False
+    if servico_senhas.precisa_rehash(conta.password):
+        conta.password = servico_senhas.gerar(senha)
+        db.session.commit()
+    return True
+
+@app.errorhandler(ServicoSenhasOcupado)
+def servico_senhas_ocupado(e):
+    flash('Muitos acessos ao mesmo tempo. Aguarde alguns segundos e tente novamente.', 'warning')
+    return redirect(request.url), 303
+
+@app.route('/admin/metricas/senhas')
+@login_required
+def metricas_senhas():
+    return jsonify(servico_senhas.obter_metricas())
 
 # =============================================
 # ROTAS DE AUTENTICAÇÃO
@@ -425,7 +1146,7 @@ def login():
         password = request.form['password']
         user = User.query.filter_by(username=username, ativo=True).first()
         
-        if user and check_password_hash(user.password, password):
+        if autenticar(user, password):
             login_user(user)
             return redirect(url_for('dashboard'))
         else:
@@ -442,25 +1163,15 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    total_oradores = Orador.query.filter_by(ativo=True).count()
-    total_discursos = AgendaDiscurso.query.count()
-    discursos_este_mes = AgendaDiscurso.query.filter(
-        AgendaDiscurso.data_discurso >= date(date.today().year, date.today().month, 1)
-    ).count()
-    congregacoes_count = Congregacao.query.filter_by(ativo=True).count()
-    total_discursos_cadastrados = Discurso.query.count()
-    
-    proximos_discursos = AgendaDiscurso.query.filter(
+    contadores = contadores_dashboard.obter()
+    
+    proximos_discursos = AgendaDiscurso.query.options(*RELACIONAMENTOS_AGENDA).filter(
         AgendaDiscurso.data_discurso >= date.today()
     ).order_by(AgendaDiscurso.data_discurso).limit(5).all()
     
     return render_template('dashboard.html',
-                         total_oradores=total_oradores,
-                         total_discursos=total_discursos,
-                         discursos_este_mes=discursos_este_mes,
-                         congregacoes_count=congregacoes_count,
-                         total_discursos_cadastrados=total_discursos_cadastrados,
-                         proximos_discursos=proximos_discursos)
+                         proximos_discursos=proximos_discursos,
+                         **contadores)
 
 # =============================================
 # ROTAS PARA ADMINISTRAÇÃO DE USUÁRIOS ORADORES
@@ -471,11 +1182,13 @@ def dashboard():
 def admin_usuarios_oradores():
     """Lista todos os usuários de oradores para administração"""
     try:
-        usuarios_oradores = UsuarioOrador.query.join(Orador).filter(
+        usuarios_oradores = UsuarioOrador.query.join(Orador).options(
+            *RELACIONAMENTOS_USUARIOS_ORADORES
+        ).filter(
             UsuarioOrador.ativo == True
         ).order_by(UsuarioOrador.data_criacao.desc()).all()
         
-        oradores_sem_usuario = Orador.query.filter(
+        oradores_sem_usuario = Orador.query.options(*RELACIONAMENTOS_ORADOR).filter(
             Orador.ativo == True,
             ~Orador.id.in_([uo.orador_id for uo in usuarios_oradores])
         ).all()
@@ -521,7 +1234,7 @@ def admin_novo_usuario_orador():
             usuario = UsuarioOrador(
                 orador_id=orador_id,
                 username=username,
-                password=generate_password_hash(password)
+                password=servico_senhas.gerar(password)
             )
             
             db.session.add(usuario)
@@ -534,7 +1247,7 @@ def admin_novo_usuario_orador():
         except Exception as e:
             flash(f'Erro ao criar usuário: {str(e)}', 'error')
     
-    oradores_sem_usuario = Orador.query.filter(
+    oradores_sem_usuario = Orador.query.options(*RELACIONAMENTOS_ORADOR).filter(
         Orador.ativo == True,
         ~Orador.id.in_([uo.orador_id for uo in UsuarioOrador.query.filter_by(ativo=True).all()])
     ).all()
@@ -546,7 +1259,9 @@ def admin_novo_usuario_orador():
 @login_required
 def admin_editar_usuario_orador(id):
     """Edita usuário de orador"""
-    usuario = UsuarioOrador.query.get_or_404(id)
+    usuario = UsuarioOrador.query.options(
+        joinedload(UsuarioOrador.orador).joinedload(Orador.congregacao)
+    ).get_or_404(id)
     
     if request.method == 'POST':
         try:
@@ -572,7 +1287,7 @@ def admin_editar_usuario_orador(id):
                     flash('As senhas não coincidem!', 'error')
                     return redirect(url_for('admin_editar_usuario_orador', id=id))
                 
-                usuario.password = generate_password_hash(nova_senha)
+                usuario.password = servico_senhas.gerar(nova_senha)
                 flash('Senha atualizada com sucesso!', 'success')
             
             db.session.commit()
@@ -594,7 +1309,7 @@ def admin_resetar_senha_orador(id):
         orador = Orador.query.get(usuario.orador_id)
         senha_padrao = f"{orador.nome.split()[0].lower()}123"
         
-        usuario.password = generate_password_hash(senha_padrao)
+        usuario.password = servico_senhas.gerar(senha_padrao)
         db.session.commit()
         
         flash(f'Senha resetada para: {senha_padrao}', 'success')
@@ -625,35 +1340,29 @@ def admin_excluir_usuario_orador(id):
 def admin_relatorio_usuarios_oradores():
     """Gera relatório de usuários oradores"""
     try:
-        usuarios_oradores = UsuarioOrador.query.join(Orador).filter(
+        usuarios_oradores = db.session.query(
+            Orador.nome,
+            Congregacao.nome,
+            UsuarioOrador.username,
+            UsuarioOrador.data_criacao,
+            UsuarioOrador.ativo
+        ).join(Orador, UsuarioOrador.orador_id == Orador.id).join(
+            Congregacao, Orador.congregacao_id == Congregacao.id
+        ).filter(
             UsuarioOrador.ativo == True
-        ).order_by(UsuarioOrador.data_criacao.desc()).all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        writer.writerow(['Orador', 'Congregação', 'Usuário', 'Data de Criação', 'Status'])
-        
-        for usuario in usuarios_oradores:
-            writer.writerow([
-                usuario.orador.nome,
-                usuario.orador.congregacao.nome,
-                usuario.username,
-                usuario.data_criacao.strftime('%d/%m/%Y'),
-                'Ativo' if usuario.ativo else 'Inativo'
-            ])
-        
-        output.seek(0)
-        buffer = io.BytesIO()
-        buffer.write(output.getvalue().encode('utf-8'))
-        buffer.seek(0)
+        ).order_by(UsuarioOrador.data_criacao.desc()).execution_options(
+            yield_per=app.config['EXPORTACAO_LOTE']
+        )
         
-        filename = f"relatorio_usuarios_oradores_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+        linhas = (
+            [orador, congregacao, username, data_criacao.strftime('%d/%m/%Y'), 'Ativo' if ativo else 'Inativo']
+            for orador, congregacao, username, data_criacao, ativo in usuarios_oradores
+        )
         
-        return Response(
-            buffer.getvalue(),
-            mimetype="text/csv",
-            headers={"Content-Disposition": f"attachment;filename={filename}"}
+        return resposta_csv(
+            'relatorio_usuarios_oradores',
+            ['Orador', 'Congregação', 'Usuário', 'Data de Criação', 'Status'],
+            linhas
         )
         
     except Exception as e:
@@ -663,7 +1372,7 @@ def admin_relatorio_usuarios_oradores():
 @login_required
 def criar_usuario_orador(orador_id):
     """Cria usuário para um orador específico a partir da lista de oradores"""
-    orador = Orador.query.get_or_404(orador_id)
+    orador = Orador.query.options(*RELACIONAMENTOS_ORADOR).get_or_404(orador_id)
     
     # Verifica se já tem usuário
     usuario_existente = UsuarioOrador.query.filter_by(orador_id=orador_id, ativo=True).first()
@@ -691,7 +1400,7 @@ def criar_usuario_orador(orador_id):
             usuario = UsuarioOrador(
                 orador_id=orador_id,
                 username=username,
-                password=generate_password_hash(password)
+                password=servico_senhas.gerar(password)
             )
             
             db.session.add(usuario)
@@ -720,34 +1429,55 @@ def listar_congregacoes():
     status = request.args.get('status')
     localidade = request.args.get('localidade')
     
-    query = Congregacao.query
+    oradores_por_congregacao = db.session.query(
+        Orador.congregacao_id,
+        func.count(Orador.id).label('total_oradores')
+    ).filter(Orador.ativo == True).group_by(Orador.congregacao_id).subquery()
+    
+    # Coordenador ativo mais recente de cada congregação (ordem == 1)
+    coordenadores = db.session.query(
+        CoordenadorDiscursos.congregacao_id,
+        Orador.nome.label('coordenador_nome'),
+        func.row_number().over(
+            partition_by=CoordenadorDiscursos.congregacao_id,
+            order_by=(CoordenadorDiscursos.data_inicio.desc(), CoordenadorDiscursos.id.desc())
+        ).label('ordem')
+    ).join(Orador, CoordenadorDiscursos.orador_id == Orador.id).filter(
+        CoordenadorDiscursos.ativo == True
+    ).subquery()
+    
+    query = db.session.query(
+        Congregacao,
+        func.coalesce(oradores_por_congregacao.c.total_oradores, 0),
+        coordenadores.c.coordenador_nome
+    ).outerjoin(
+        oradores_por_congregacao,
+        oradores_por_congregacao.c.congregacao_id == Congregacao.id
+    ).outerjoin(
+        coordenadores,
+        and_(coordenadores.c.congregacao_id == Congregacao.id, coordenadores.c.ordem == 1)
+    )
     
     if status == 'ativas':
-        query = query.filter_by(ativo=True)
+        query = query.filter(Congregacao.ativo == True)
     elif status == 'inativas':
-        query = query.filter_by(ativo=False)
+        query = query.filter(Congregacao.ativo == False)
     
     if localidade:
         query = query.filter(Congregacao.localidade.ilike(f'%{localidade}%'))
     
-    congregacoes = query.all()
-    
-    total_congregacoes = Congregacao.query.count()
-    congregacoes_ativas = Congregacao.query.filter_by(ativo=True).count()
-    congregacoes_inativas = Congregacao.query.filter_by(ativo=False).count()
-    total_oradores = Orador.query.filter_by(ativo=True).count()
+    congregacoes = []
+    for congregacao, total_oradores_congregacao, coordenador_nome in query.order_by(Congregacao.id).all():
+        congregacao.total_oradores = total_oradores_congregacao
+        congregacao.coordenador_nome = coordenador_nome
+        congregacoes.append(congregacao)
     
-    for congregacao in congregacoes:
-        congregacao.total_oradores = Orador.query.filter_by(
-            congregacao_id=congregacao.id, 
-            ativo=True
-        ).count()
-        
-        coordenador = CoordenadorDiscursos.query.filter_by(
-            congregacao_id=congregacao.id, 
-            ativo=True
-        ).first()
-        congregacao.coordenador_atual = coordenador
+    total_congregacoes, congregacoes_ativas, congregacoes_inativas, total_oradores = db.session.query(
+        func.count(Congregacao.id),
+        func.count(case((Congregacao.ativo == True, 1))),
+        func.count(case((Congregacao.ativo == False, 1))),
+        select(func.count(Orador.id)).where(Orador.ativo == True).scalar_subquery()
+    ).one()
     
     return render_template('congregacoes/listar.html', 
                          congregacoes=congregacoes,
@@ -811,8 +1541,8 @@ def excluir_congregacao(id):
 @app.route('/oradores')
 @login_required
 def listar_oradores():
-    oradores = Orador.query.filter_by(ativo=True).all()
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    oradores = oradores_ativos()
+    congregacoes = congregacoes_ativas()
     return render_template('oradores/listar.html', oradores=oradores, congregacoes=congregacoes)
 
 @app.route('/oradores/novo', methods=['GET', 'POST'])
@@ -838,7 +1568,7 @@ def novo_orador():
         flash('Orador cadastrado com sucesso!', 'success')
         return redirect(url_for('listar_oradores'))
     
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    congregacoes = congregacoes_ativas()
     return render_template('oradores/novo.html', congregacoes=congregacoes)
 
 @app.route('/oradores/<int:id>/editar', methods=['GET', 'POST'])
@@ -857,7 +1587,7 @@ def editar_orador(id):
         flash('Orador atualizado com sucesso!', 'success')
         return redirect(url_for('listar_oradores'))
     
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    congregacoes = congregacoes_ativas()
     return render_template('oradores/editar.html', orador=orador, congregacoes=congregacoes)
 
 # =============================================
@@ -924,74 +1654,113 @@ def editar_discurso(id):
     
     return render_template('discursos/editar.html', discurso=discurso)
 
+def ler_linhas_discursos(linhas):
+    """Interpreta linhas "Número. Título" e devolve (nº da linha, número, título, erro)"""
+    for i, linha in enumerate(linhas, 1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        
+        if '. ' in linha:
+            partes = linha.split('. ', 1)
+        elif '.' in linha:
+            partes = linha.split('.', 1)
+        else:
+            yield i, None, linha, f"Linha {i}: Formato inválido - '{linha}'"
+            continue
+        
+        numero_str = partes[0].strip()
+        titulo = partes[1].strip()
+        
+        if not numero_str.isdigit():
+            yield i, None, titulo, f"Linha {i}: Número inválido - '{numero_str}'"
+            continue
+        
+        numero = int(numero_str)
+        
+        if numero < 1 or numero > 200:
+            yield i, numero, titulo, f"Linha {i}: Número fora do range (1-200) - '{numero}'"
+            continue
+        
+        yield i, numero, titulo, None
+
+def importar_catalogo(linhas):
+    """Aplica a lista de discursos com um SELECT, um INSERT e um UPDATE em massa
+    
+    Devolve o relatório linha a linha: novo, atualizado, sem alteração ou erro.
+    Se um número aparece mais de uma vez, vale a última ocorrência.
+    """
+    existentes = {
+        numero: (id_discurso, titulo)
+        for id_discurso, numero, titulo in db.session.query(Discurso.id, Discurso.numero, Discurso.titulo)
+    }
+    
+    relatorio = []
+    novos = {}
+    alterados = {}
+    
+    for i, numero, titulo, erro in ler_linhas_discursos(linhas):
+        if erro:
+            relatorio.append({'linha': i, 'numero': numero, 'acao': 'erro', 'titulo': titulo, 'mensagem': erro})
+            continue
+        
+        if numero in existentes:
+            id_discurso, titulo_anterior = existentes[numero]
+            acao = 'sem alteração' if titulo == titulo_anterior else 'atualizado'
+            if acao == 'atualizado':
+                alterados[numero] = {'id': id_discurso, 'titulo': titulo}
+            else:
+                alterados.pop(numero, None)
+            relatorio.append({'linha': i, 'numero': numero, 'acao': acao,
+                              'titulo': titulo, 'titulo_anterior': titulo_anterior})
+        else:
+            novos[numero] = {
+                'numero': numero,
+                'titulo': titulo,
+                'tema': "Tema a definir",
+                'descricao': f"Discurso público #{numero}",
+                'duracao': 30,
+                'bloqueado': False,
+                'ativo': True
+            }
+            relatorio.append({'linha': i, 'numero': numero, 'acao': 'novo', 'titulo': titulo})
+    
+    if novos:
+        db.session.execute(insert(Discurso), list(novos.values()))
+    if alterados:
+        db.session.execute(update(Discurso), list(alterados.values()))
+    db.session.commit()
+    
+    return relatorio, len(novos), len(alterados)
+
 @app.route('/discursos/importar', methods=['GET', 'POST'])
 @login_required
 def importar_discursos():
     if request.method == 'POST':
         try:
-            lista_discursos = request.form['lista_discursos']
-            
-            if not lista_discursos.strip():
-                flash('A lista de discursos está vazia!', 'error')
-                return redirect(url_for('importar_discursos'))
+            arquivo = request.files.get('arquivo_discursos')
             
-            linhas = lista_discursos.strip().split('\n')
-            discursos_importados = 0
-            discursos_atualizados = 0
-            erros = []
-            
-            for i, linha in enumerate(linhas, 1):
-                linha = linha.strip()
-                if not linha:
-                    continue
-                
-                if '. ' in linha:
-                    partes = linha.split('. ', 1)
-                elif '.' in linha:
-                    partes = linha.split('.', 1)
-                else:
-                    erros.append(f"Linha {i}: Formato inválido - '{linha}'")
-                    continue
-                
-                numero_str = partes[0].strip()
-                titulo = partes[1].strip()
-                
-                if not numero_str.isdigit():
-                    erros.append(f"Linha {i}: Número inválido - '{numero_str}'")
-                    continue
-                
-                numero = int(numero_str)
-                
-                if numero < 1 or numero > 200:
-                    erros.append(f"Linha {i}: Número fora do range (1-200) - '{numero}'")
-                    continue
-                
-                discurso_existente = Discurso.query.filter_by(numero=numero).first()
-                
-                if discurso_existente:
-                    discurso_existente.titulo = titulo
-                    discursos_atualizados += 1
-                else:
-                    discurso = Discurso(
-                        numero=numero,
-                        titulo=titulo,
-                        tema="Tema a definir",
-                        descricao=f"Discurso público #{numero}",
-                        duracao=30,
-                        bloqueado=False
-                    )
-                    db.session.add(discurso)
-                    discursos_importados += 1
+            if arquivo and arquivo.filename:
+                # Lê o upload linha a linha, sem carregar o arquivo inteiro
+                linhas = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', errors='replace')
+            else:
+                lista_discursos = request.form.get('lista_discursos', '')
+                if not lista_discursos.strip():
+                    flash('A lista de discursos está vazia!', 'error')
+                    return redirect(url_for('importar_discursos'))
+                linhas = lista_discursos.strip().split('\n')
             
-            db.session.commit()
+            relatorio, discursos_importados, discursos_atualizados = importar_catalogo(linhas)
+            erros = [item['mensagem'] for item in relatorio if item['acao'] == 'erro']
             
             if erros:
                 flash(f'Importação com erros: {", ".join(erros[:5])}', 'warning')
             
             flash(f'Importação concluída! {discursos_importados} novos e {discursos_atualizados} atualizados.', 'success')
-            return redirect(url_for('listar_discursos'))
+            return render_template('discursos/importar.html', relatorio=relatorio)
             
         except Exception as e:
+            db.session.rollback()
             flash(f'Erro na importação: {str(e)}', 'error')
     
     lista_preparada = """1. Você conhece bem a Deus?
@@ -1202,57 +1971,622 @@ def toggle_discurso(id):
     flash(f'Discurso #{discurso.numero} {status}!', 'success')
     return redirect(url_for('listar_discursos'))
 
+# =============================================
+# BLOQUEIO EM MASSA DE DISCURSOS
+# =============================================
+
+SELECOES_DISCURSOS = ('todos', 'faixa', 'numeros', 'tema')
+
+class SelecaoInvalida(ValueError):
+    pass
+
+def ler_numeros_discursos(texto):
+    """Converte "1, 5 7;12" na lista [1, 5, 7, 12]"""
+    numeros = []
+    for parte in texto.replace(';', ',').replace(',', ' ').split():
+        if not parte.isdigit():
+            raise SelecaoInvalida(f'Número de discurso inválido: "{parte}"')
+        numeros.append(int(parte))
+    if not numeros:
+        raise SelecaoInvalida('Informe ao menos um número de discurso')
+    return numeros
+
+def condicao_selecao_discursos(dados):
+    """Monta o filtro SQL e a descrição da seleção a partir do formulário ou JSON
+    
+    Seleções: todos, faixa (numero_inicio/numero_fim), numeros (lista) e tema.
+    """
+    selecao = dados.get('selecao') or 'todos'
+    
+    if selecao == 'todos':
+        return None, 'Todos os discursos'
+    
+    if selecao == 'faixa':
+        try:
+            inicio = int(dados.get('numero_inicio'))
+            fim = int(dados.get('numero_fim'))
+        except (TypeError, ValueError):
+            raise SelecaoInvalida('Informe o número inicial e final da faixa')
+        if inicio > fim:
+            inicio, fim = fim, inicio
+        return Discurso.numero.between(inicio, fim), f'Discursos #{inicio} a #{fim}'
+    
+    if selecao == 'numeros':
+        numeros = dados.get('numeros')
+        if isinstance(numeros, list):
+            if not all(isinstance(numero, int) for numero in numeros):
+                raise SelecaoInvalida('A lista de números deve conter apenas inteiros')
+        else:
+            numeros = ler_numeros_discursos(numeros or '')
+        if not numeros:
+            raise SelecaoInvalida('Informe ao menos um número de discurso')
+        return Discurso.numero.in_(numeros), f'{len(set(numeros))} discurso(s) selecionado(s)'
+    
+    if selecao == 'tema':
+        tema = (dados.get('tema') or '').strip()
+        if not tema:
+            raise SelecaoInvalida('Informe o tema')
+        return func.lower(Discurso.tema) == tema.lower(), f'Discursos do tema "{tema}"'
+    
+    raise SelecaoInvalida(f'Seleção inválida: "{selecao}"')
+
+def bloquear_discursos_em_massa(bloquear, condicao=None):
+    """Bloqueia/libera a seleção com um único UPDATE e devolve quantos mudaram"""
+    # bloqueado pode ser NULL em linhas antigas: NULL != x não é verdadeiro no SQL
+    comando = update(Discurso).where(or_(Discurso.bloqueado.is_(None), Discurso.bloqueado != bloquear))
+    if condicao is not None:
+        comando = comando.where(condicao)
+    resultado = db.session.execute(
+        comando.values(bloqueado=bloquear),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return resultado.rowcount
+
 @app.route('/discursos/toggle_all', methods=['POST'])
 @login_required
 def toggle_all_discursos():
     acao = request.form['acao']
-    bloquear = (acao == 'bloquear_todos')
+    bloquear = acao in ('bloquear', 'bloquear_todos')
     
-    discursos = Discurso.query.all()
-    for discurso in discursos:
-        discurso.bloqueado = bloquear
+    try:
+        condicao, descricao = condicao_selecao_discursos(request.form)
+    except SelecaoInvalida as e:
+        flash(str(e), 'error')
+        return redirect(url_for('listar_discursos'))
     
-    db.session.commit()
+    alterados = bloquear_discursos_em_massa(bloquear, condicao)
     
     acao_texto = "bloqueados" if bloquear else "liberados"
-    flash(f'Todos os discursos foram {acao_texto}!', 'success')
+    flash(f'{descricao}: {alterados} discurso(s) {acao_texto}!', 'success')
     return redirect(url_for('listar_discursos'))
 
-# =============================================
-# ROTAS PARA AGENDA
-# =============================================
-
-@app.route('/agenda')
+@app.route('/discursos/bloqueio', methods=['POST'])
 @login_required
-def listar_agenda():
-    data_inicio = request.args.get('data_inicio')
-    data_fim = request.args.get('data_fim')
-    congregacao_id = request.args.get('congregacao_id')
-    confirmacao = request.args.get('confirmacao')
+def bloqueio_discursos():
+    """Versão JSON do bloqueio em massa
     
-    query = AgendaDiscurso.query
+    Ex.: {"bloquear": true, "selecao": "faixa", "numero_inicio": 1, "numero_fim": 100}
+    """
+    dados = request.get_json(silent=True)
+    if not isinstance(dados, dict) or not isinstance(dados.get('bloquear'), bool):
+        return jsonify({'erro': 'Envie um JSON com "bloquear" (true/false) e a seleção'}), 400
     
-    if data_inicio:
-        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-        query = query.filter(AgendaDiscurso.data_discurso >= data_inicio)
+    try:
+        condicao, descricao = condicao_selecao_discursos(dados)
+    except SelecaoInvalida as e:
+        return jsonify({'erro': str(e)}), 400
+    
+    alterados = bloquear_discursos_em_massa(dados['bloquear'], condicao)
+    return jsonify({
+        'selecao': descricao,
+        'bloqueado': dados['bloquear'],
+        'alterados': alterados
+    })
+
+# =============================================
+# BUSCA GLOBAL
+# =============================================
+
+# (tipo, tabela, código no rowid do índice FTS5, colunas pesquisadas)
+ALVOS_BUSCA = (
+    ('discursos', 'speeches', 1, ('titulo', 'tema')),
+    ('oradores', 'speakers', 2, ('nome',)),
+    ('congregacoes', 'congregations', 3, ('nome', 'localidade')),
+)
+
+# No PostgreSQL os acentos saem com translate() (imutável, vale em índice de
+# expressão) em vez da extensão unaccent, que nem sempre pode ser instalada
+ACENTOS = 'áàâãäåéèêëíìîïóòôõöúùûüçñ'
+SEM_ACENTOS = 'aaaaaaeeeeiiiiooooouuuucn'
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos, como os índices de busca guardam o texto"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+def termos_busca(texto):
+    return re.findall(r'[a-z0-9]+', normalizar_texto(texto))
+
+def documento_busca_postgres(colunas):
+    """Expressão tsvector usada tanto no índice GIN quanto na consulta (precisam ser idênticas)"""
+    concatenado = " || ' ' || ".join(f"coalesce({coluna}, '')" for coluna in colunas)
+    return f"to_tsvector('simple'::regconfig, translate(lower({concatenado}), '{ACENTOS}', '{SEM_ACENTOS}'))"
+
+def criar_indice_busca(conexao):
+    """Migração: índices GIN no PostgreSQL ou tabela FTS5 mantida por triggers no SQLite"""
+    if conexao.dialect.name == 'postgresql':
+        for tipo, tabela, _, colunas in ALVOS_BUSCA:
+            conexao.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_busca_{tabela} ON {tabela} "
+                f"USING gin ({documento_busca_postgres(colunas)})"
+            )
+        return
+    
+    if conexao.dialect.name != 'sqlite' or not conexao.exec_driver_sql(
+        "SELECT 1 FROM pragma_module_list WHERE name = 'fts5'"
+    ).first():
+        print("⚠️ Banco sem FTS5: a busca global usará o índice em memória")
+        return
+    
+    conexao.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS busca_global USING fts5("
+        "texto, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # rowid = id * 4 + código do tipo, para apagar e atualizar sem varrer o índice
+    for tipo, tabela, codigo, colunas in ALVOS_BUSCA:
+        def texto(registro):
+            return " || ' ' || ".join(f"coalesce({registro}.{coluna}, '')" for coluna in colunas)
+        
+        conexao.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS busca_{tabela}_inserir AFTER INSERT ON {tabela} BEGIN
+                INSERT INTO busca_global(rowid, texto) VALUES (NEW.id * 4 + {codigo}, {texto('NEW')});
+            END""")
+        conexao.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS busca_{tabela}_atualizar AFTER UPDATE OF {', '.join(colunas)} ON {tabela} BEGIN
+                DELETE FROM busca_global WHERE rowid = OLD.id * 4 + {codigo};
+                INSERT INTO busca_global(rowid, texto) VALUES (NEW.id * 4 + {codigo}, {texto('NEW')});
+            END""")
+        conexao.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS busca_{tabela}_excluir AFTER DELETE ON {tabela} BEGIN
+                DELETE FROM busca_global WHERE rowid = OLD.id * 4 + {codigo};
+            END""")
+        conexao.exec_driver_sql(
+            f"INSERT OR REPLACE INTO busca_global(rowid, texto) "
+            f"SELECT id * 4 + {codigo}, {texto(tabela)} FROM {tabela}"
+        )
+
+def motor_busca():
+    """postgresql, fts5 ou memoria, conforme o banco e as migrações aplicadas"""
+    if app.config['BUSCA_MOTOR'] != 'auto':
+        return app.config['BUSCA_MOTOR']
+    motor = app.extensions.get('motor_busca')
+    if motor is None:
+        dialeto = db.engine.dialect.name
+        if dialeto == 'postgresql':
+            motor = 'postgresql'
+        elif dialeto == 'sqlite' and db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'busca_global'"
+        )).first():
+            motor = 'fts5'
+        else:
+            motor = 'memoria'
+        app.extensions['motor_busca'] = motor
+    return motor
+
+def construir_indice_memoria():
+    """Índice invertido em memória: termos ordenados para achar prefixos por bisect"""
+    termos = []
+    for tipo, tabela, _, colunas in ALVOS_BUSCA:
+        tabela_sa = db.metadata.tables[tabela]
+        for registro in db.session.execute(select(tabela_sa.c.id, *(tabela_sa.c[c] for c in colunas))):
+            for termo in set(termos_busca(' '.join(valor or '' for valor in registro[1:]))):
+                termos.append((termo, tipo, registro.id))
+    termos.sort()
+    return [termo for termo, _, _ in termos], [(tipo, id_) for _, tipo, id_ in termos]
+
+def indice_memoria_atual():
+    """Índice em memória do processo, reconstruído quando os contadores das tabelas mudam
+    
+    Os contadores ficam em data_versions, então uma alteração feita por outro
+    worker também é vista na próxima busca (ao custo de um SELECT pela chave).
+    """
+    versoes = versoes_tabelas([tabela for _, tabela, _, _ in ALVOS_BUSCA])
+    atual = app.extensions.get('indice_busca')
+    if atual is None or atual[0] != versoes:
+        atual = (versoes, construir_indice_memoria())
+        app.extensions['indice_busca'] = atual
+    return atual[1]
+
+def buscar_em_memoria(termos, limite):
+    chaves, registros = indice_memoria_atual()
+    encontrados = None
+    for termo in termos:
+        inicio = bisect.bisect_left(chaves, termo)
+        fim = bisect.bisect_left(chaves, termo + '\uffff')
+        com_termo = set(registros[inicio:fim])
+        encontrados = com_termo if encontrados is None else encontrados & com_termo
+        if not encontrados:
+            return {}
+    
+    resultado = {}
+    for tipo, id_ in sorted(encontrados):
+        ids = resultado.setdefault(tipo, [])
+        if len(ids) < limite:
+            ids.append(id_)
+    return resultado
+
+def buscar_ids(consulta, limite):
+    """IDs encontrados por tipo, em ordem de relevância; cada termo casa por prefixo"""
+    termos = termos_busca(consulta)
+    if not termos:
+        return {}
+    
+    motor = motor_busca()
+    if motor == 'memoria':
+        return buscar_em_memoria(termos, limite)
+    
+    resultado = {}
+    if motor == 'fts5':
+        # Um único MATCH na tabela compartilhada; os melhores de cada tipo saem pela janela
+        tipos = {codigo: tipo for tipo, _, codigo, _ in ALVOS_BUSCA}
+        linhas = db.session.execute(text(
+            "SELECT codigo, id FROM ("
+            "  SELECT rowid % 4 AS codigo, rowid / 4 AS id,"
+            "         ROW_NUMBER() OVER (PARTITION BY rowid % 4 ORDER BY rank) AS posicao"
+            "  FROM busca_global WHERE busca_global MATCH :consulta"
+            ") WHERE posicao <= :limite ORDER BY codigo, posicao"
+        ), {'consulta': ' '.join(f'"{termo}"*' for termo in termos), 'limite': limite})
+        for codigo, id_ in linhas:
+            if codigo in tipos:
+                resultado.setdefault(tipos[codigo], []).append(id_)
+        return resultado
+    
+    for tipo, tabela, codigo, colunas in ALVOS_BUSCA:
+        documento = documento_busca_postgres(colunas)
+        linhas = db.session.execute(text(
+            f"SELECT id FROM {tabela}, to_tsquery('simple'::regconfig, :consulta) AS q "
+            f"WHERE {documento} @@ q ORDER BY ts_rank({documento}, q) DESC, id LIMIT :limite"
+        ), {'consulta': ' & '.join(f'{termo}:*' for termo in termos), 'limite': limite})
+        ids = [id_ for (id_,) in linhas]
+        if ids:
+            resultado[tipo] = ids
+    return resultado
+
+def buscar_global(consulta, limite=20):
+    """Discursos, oradores e congregações que casam com a consulta, na ordem de relevância"""
+    ids = buscar_ids(consulta, limite)
+    modelos = {
+        'discursos': (Discurso, ()),
+        'oradores': (Orador, RELACIONAMENTOS_ORADOR),
+        'congregacoes': (Congregacao, ()),
+    }
+    resultado = {}
+    for tipo, (modelo, opcoes) in modelos.items():
+        if not ids.get(tipo):
+            resultado[tipo] = []
+            continue
+        por_id = {
+            registro.id: registro
+            for registro in modelo.query.options(*opcoes).filter(modelo.id.in_(ids[tipo]))
+        }
+        resultado[tipo] = [por_id[id_] for id_ in ids[tipo] if id_ in por_id]
+    return resultado
+
+@app.route('/busca')
+@login_required
+def busca_global():
+    consulta = request.args.get('q', '').strip()
+    inicio = time.perf_counter()
+    resultados = buscar_global(consulta) if consulta else {}
+    return render_template('busca.html',
+                         consulta=consulta,
+                         resultados=resultados,
+                         total=sum(len(itens) for itens in resultados.values()),
+                         duracao_ms=(time.perf_counter() - inicio) * 1000)
+
+# =============================================
+# CAIXA DE SAÍDA DE EMAILS
+# =============================================
+
+def enfileirar_email(tipo, agendamento, orador, assunto, corpo, enviar_apos=None):
+    """Adiciona o email à sessão atual: só existe se a alteração da agenda for confirmada"""
+    if not orador or not orador.email:
+        return
+    db.session.add(EmailPendente(
+        tipo=tipo,
+        agenda_id=agendamento.id,
+        destinatario=orador.email,
+        assunto=assunto,
+        corpo=corpo,
+        enviar_apos=enviar_apos or datetime.utcnow()
+    ))
+
+def descrever_agendamento(agendamento):
+    return (
+        f"Discurso: #{agendamento.discurso.numero} - {agendamento.discurso.titulo}\n"
+        f"Data: {agendamento.data_discurso.strftime('%d/%m/%Y')} às {agendamento.horario}\n"
+        f"Congregação: {agendamento.congregacao.nome} - {agendamento.congregacao.localidade}\n"
+    )
+
+def enfileirar_emails_agendamento(agendamento, atualizado=False):
+    """Confirmação para o orador e lembrete alguns dias antes do discurso"""
+    db.session.flush()  # garante agendamento.id e os relacionamentos atualizados
+    db.session.refresh(agendamento, ['discurso', 'orador', 'congregacao'])
+    
+    acao = "atualizado" if atualizado else "agendado"
+    enfileirar_email(
+        'confirmacao', agendamento, agendamento.orador,
+        f"Discurso {acao}: {agendamento.data_discurso.strftime('%d/%m/%Y')}",
+        f"Olá, {agendamento.orador.nome}!\n\nSeu discurso foi {acao}:\n\n"
+        f"{descrever_agendamento(agendamento)}\n"
+        "Por favor, confirme sua participação no sistema de discursos."
+    )
+    
+    # enviar_apos é comparado com datetime.utcnow() na reserva: meia-noite local em UTC
+    lembrete_em = datetime.combine(
+        agendamento.data_discurso - timedelta(days=app.config['EMAIL_LEMBRETE_DIAS']),
+        datetime.min.time(),
+        tzinfo=ZoneInfo(app.config['FUSO_HORARIO'])
+    ).astimezone(timezone.utc).replace(tzinfo=None)
+    if lembrete_em > datetime.utcnow():
+        enfileirar_email(
+            'lembrete', agendamento, agendamento.orador,
+            f"Lembrete: discurso em {agendamento.data_discurso.strftime('%d/%m/%Y')}",
+            f"Olá, {agendamento.orador.nome}!\n\nLembrete do seu próximo discurso:\n\n"
+            f"{descrever_agendamento(agendamento)}",
+            enviar_apos=lembrete_em
+        )
+
+def cancelar_emails_pendentes(agenda_id):
+    """Confirmações e lembretes ainda não enviados deixam de valer; cancelamentos seguem"""
+    EmailPendente.query.filter(
+        EmailPendente.agenda_id == agenda_id,
+        EmailPendente.status == 'pendente',
+        EmailPendente.tipo != 'cancelamento'
+    ).update({'status': 'cancelado'}, synchronize_session=False)
+
+def enfileirar_cancelamento(agendamento):
+    """Descarta os emails ainda não enviados do agendamento e avisa o orador"""
+    cancelar_emails_pendentes(agendamento.id)
+    orador = agendamento.orador
+    enfileirar_email(
+        'cancelamento', agendamento, orador,
+        f"Discurso cancelado: {agendamento.data_discurso.strftime('%d/%m/%Y')}",
+        f"Olá, {orador.nome}!\n\nO discurso abaixo foi cancelado:\n\n"
+        f"{descrever_agendamento(agendamento)}"
+    )
+
+def reservar_lote_emails(limite):
+    """Reserva até `limite` emails prontos para envio
+    
+    Como na fila de relatórios, a reserva é um UPDATE condicionado ao status;
+    cada worker marca as linhas com um identificador de lote próprio e depois
+    lê só as que ganhou. Emails presos em envio além do timeout voltam à fila.
+    """
+    agora = datetime.utcnow()
+    elegivel = or_(
+        and_(EmailPendente.status == 'pendente', EmailPendente.enviar_apos <= agora),
+        and_(EmailPendente.status == 'enviando',
+             EmailPendente.iniciado_em < agora - timedelta(seconds=app.config['EMAIL_TIMEOUT']))
+    )
+    candidatos = [id for (id,) in db.session.query(EmailPendente.id).filter(elegivel).order_by(
+        EmailPendente.enviar_apos, EmailPendente.id
+    ).limit(limite)]
+    if not candidatos:
+        return []
+    
+    lote = uuid.uuid4().hex
+    EmailPendente.query.filter(EmailPendente.id.in_(candidatos), elegivel).update(
+        {'status': 'enviando', 'lote': lote, 'iniciado_em': agora},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return EmailPendente.query.filter_by(lote=lote, status='enviando').order_by(EmailPendente.id).all()
+
+def montar_mensagem(email):
+    mensagem = MIMEMultipart()
+    mensagem['From'] = app.config['MAIL_DEFAULT_SENDER']
+    mensagem['To'] = email.destinatario
+    mensagem['Subject'] = Header(email.assunto, 'utf-8')
+    mensagem.attach(MIMEText(email.corpo, 'plain', 'utf-8'))
+    return mensagem
+
+def registrar_falha_email(email, erro):
+    """Reagenda com espera exponencial ou desiste após o máximo de tentativas"""
+    email.tentativas += 1
+    email.ultimo_erro = str(erro)
+    email.lote = None
+    if email.tentativas >= app.config['EMAIL_TENTATIVAS']:
+        email.status = 'erro'
+    else:
+        email.status = 'pendente'
+        email.enviar_apos = datetime.utcnow() + timedelta(
+            seconds=app.config['EMAIL_ESPERA_BASE'] * 2 ** (email.tentativas - 1)
+        )
+
+def enviar_lote_emails(emails):
+    """Envia o lote reaproveitando uma única conexão SMTP; devolve (enviados, falhas)"""
+    enviados = falhas = 0
+    try:
+        conexao = smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT'], timeout=30)
+    except (smtplib.SMTPException, OSError) as e:
+        for email in emails:
+            registrar_falha_email(email, e)
+        db.session.commit()
+        return 0, len(emails)
+    
+    try:
+        if app.config['MAIL_USE_TLS']:
+            conexao.starttls()
+        if app.config['MAIL_USERNAME'] and app.config['MAIL_PASSWORD']:
+            conexao.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
+        
+        for indice, email in enumerate(emails):
+            try:
+                conexao.sendmail(app.config['MAIL_DEFAULT_SENDER'], [email.destinatario], montar_mensagem(email).as_string())
+            except smtplib.SMTPServerDisconnected as e:
+                # Conexão perdida: este e os restantes voltam para a fila
+                for restante in emails[indice:]:
+                    registrar_falha_email(restante, e)
+                    falhas += 1
+                break
+            except (smtplib.SMTPException, OSError) as e:
+                registrar_falha_email(email, e)
+                falhas += 1
+            else:
+                email.status = 'enviado'
+                email.enviado_em = datetime.utcnow()
+                enviados += 1
+    except (smtplib.SMTPException, OSError) as e:
+        # Falha no STARTTLS/login: nada foi enviado
+        for email in emails:
+            if email.status == 'enviando':
+                registrar_falha_email(email, e)
+                falhas += 1
+    finally:
+        db.session.commit()
+        try:
+            conexao.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+    return enviados, falhas
+
+@app.cli.command('enviar-emails')
+@click.option('--uma-vez', is_flag=True, help='Envia os emails prontos e encerra.')
+@click.option('--intervalo', default=10.0, help='Segundos entre verificações da caixa de saída vazia.')
+def enviar_emails(uma_vez, intervalo):
+    """Worker da caixa de saída de emails"""
+    print(f"🔄 Envio de emails iniciado ({app.config['MAIL_SERVER']}:{app.config['MAIL_PORT']})")
+    while True:
+        emails = reservar_lote_emails(app.config['EMAIL_LOTE'])
+        if emails:
+            enviados, falhas = enviar_lote_emails(emails)
+            print(f"📧 Lote: {enviados} enviado(s), {falhas} falha(s)")
+            continue
+        if uma_vez:
+            break
+        # Sem transação aberta (nem conexão presa ao worker) durante a espera
+        db.session.remove()
+        time.sleep(intervalo)
+
+# =============================================
+# CONFLITOS DE AGENDAMENTO
+# =============================================
+
+def conflitos_agendamento(data_discurso, horario, orador_id, congregacao_id, anfitriao_id=None, ignorar_id=None):
+    """Procura, em uma única consulta, agendamentos que colidem com o proposto
+    
+    Na mesma data: o orador (ou o anfitrião) já escalado como orador ou anfitrião
+    em outro agendamento, ou a congregação já com discurso no mesmo horário.
+    Cada ramo do OR usa um índice que começa pela pessoa/congregação e a data.
+    """
+    pessoas = [int(pessoa) for pessoa in (orador_id, anfitriao_id) if pessoa]
+    ramos = [and_(
+        AgendaDiscurso.congregacao_id == congregacao_id,
+        AgendaDiscurso.data_discurso == data_discurso,
+        AgendaDiscurso.horario == horario
+    )]
+    if pessoas:
+        ramos.append(and_(AgendaDiscurso.orador_id.in_(pessoas), AgendaDiscurso.data_discurso == data_discurso))
+        ramos.append(and_(AgendaDiscurso.anfitriao_id.in_(pessoas), AgendaDiscurso.data_discurso == data_discurso))
+    
+    consulta = AgendaDiscurso.query.options(
+        *RELACIONAMENTOS_AGENDA, joinedload(AgendaDiscurso.anfitriao)
+    ).filter(or_(*ramos))
+    if ignorar_id:
+        consulta = consulta.filter(AgendaDiscurso.id != ignorar_id)
+    
+    mensagens = []
+    for agendamento in consulta.order_by(AgendaDiscurso.horario, AgendaDiscurso.id):
+        local = f"{agendamento.congregacao.nome} às {agendamento.horario}"
+        for pessoa in pessoas:
+            if agendamento.orador_id == pessoa:
+                mensagens.append(f"{agendamento.orador.nome} já é orador neste dia ({local}).")
+            if agendamento.anfitriao_id == pessoa:
+                mensagens.append(f"{agendamento.anfitriao.nome} já é anfitrião neste dia ({local}).")
+        if agendamento.congregacao_id == int(congregacao_id) and agendamento.horario == horario:
+            mensagens.append(f"{local} já tem o discurso #{agendamento.discurso.numero} com {agendamento.orador.nome}.")
+    return mensagens
+
+@app.route('/agenda/verificar-conflitos')
+@login_required
+def verificar_conflitos_agenda():
+    """Validação usada pelo formulário antes de enviar o agendamento"""
+    try:
+        data_discurso = datetime.strptime(request.args['data_discurso'], '%Y-%m-%d').date()
+        horario = request.args['horario']
+        orador_id = int(request.args['orador_id'])
+        congregacao_id = int(request.args['congregacao_id'])
+        anfitriao_id = request.args.get('anfitriao_id', type=int)
+        ignorar_id = request.args.get('agendamento_id', type=int)
+    except (KeyError, ValueError):
+        return jsonify({'erro': 'Informe data, horário, orador e congregação'}), 400
+    
+    return jsonify({'conflitos': conflitos_agendamento(
+        data_discurso, horario, orador_id, congregacao_id, anfitriao_id, ignorar_id
+    )})
+
+# =============================================
+# ROTAS PARA AGENDA
+# =============================================
+
+def filtros_agenda(args=None):
+    """Filtros da agenda (da query string por padrão) como lista de condições"""
+    if args is None:
+        args = request.args
+    data_inicio = args.get('data_inicio')
+    data_fim = args.get('data_fim')
+    congregacao_id = args.get('congregacao_id')
+    confirmacao = args.get('confirmacao')
+    
+    condicoes = []
+    
+    if data_inicio:
+        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+        condicoes.append(AgendaDiscurso.data_discurso >= data_inicio)
     
     if data_fim:
         data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date()
-        query = query.filter(AgendaDiscurso.data_discurso <= data_fim)
+        condicoes.append(AgendaDiscurso.data_discurso <= data_fim)
     
     if congregacao_id:
-        query = query.filter_by(congregacao_id=congregacao_id)
+        condicoes.append(AgendaDiscurso.congregacao_id == congregacao_id)
     
     if confirmacao == 'confirmados':
-        query = query.filter_by(confirmado_pelo_orador=True)
+        condicoes.append(AgendaDiscurso.confirmado_pelo_orador == True)
     elif confirmacao == 'pendentes':
-        query = query.filter_by(confirmado_pelo_orador=False)
+        condicoes.append(AgendaDiscurso.confirmado_pelo_orador == False)
     
-    agenda = query.order_by(AgendaDiscurso.data_discurso).all()
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    return condicoes
+
+@app.route('/agenda')
+@login_required
+def listar_agenda():
+    condicoes = filtros_agenda()
+    
+    pagina = paginar_por_cursor(
+        AgendaDiscurso.query.options(*RELACIONAMENTOS_AGENDA).filter(*condicoes),
+        AgendaDiscurso.data_discurso,
+        AgendaDiscurso.id
+    )
+    
+    total_agendados, total_confirmados, total_realizados = db.session.query(
+        func.count(AgendaDiscurso.id),
+        func.count(case((AgendaDiscurso.confirmado_pelo_orador == True, 1))),
+        func.count(case((AgendaDiscurso.realizado == True, 1)))
+    ).filter(*condicoes).one()
+    
+    congregacoes = congregacoes_ativas()
     
     return render_template('agenda/listar.html', 
-                         agenda=agenda, 
+                         agenda=pagina.itens, 
+                         pagina=pagina,
+                         argumentos_paginacao=argumentos_sem_cursor(),
+                         total_agendados=total_agendados,
+                         total_confirmados=total_confirmados,
+                         total_pendentes=total_agendados - total_confirmados,
+                         total_realizados=total_realizados,
                          congregacoes=congregacoes,
                          today=date.today())
 
@@ -1272,6 +2606,12 @@ def novo_agendamento():
             flash('Este discurso está bloqueado e não pode ser agendado!', 'error')
             return redirect(url_for('novo_agendamento'))
         
+        conflitos = conflitos_agendamento(data_discurso, horario, orador_id, congregacao_id, anfitriao_id)
+        if conflitos:
+            for conflito in conflitos:
+                flash(conflito, 'error')
+            return redirect(url_for('novo_agendamento'))
+        
         agendamento = AgendaDiscurso(
             data_discurso=data_discurso,
             horario=horario,
@@ -1283,14 +2623,15 @@ def novo_agendamento():
         )
         
         db.session.add(agendamento)
+        enfileirar_emails_agendamento(agendamento)
         db.session.commit()
         flash('Discurso agendado com sucesso!', 'success')
         return redirect(url_for('listar_agenda'))
     
-    discursos = Discurso.query.filter_by(bloqueado=False, ativo=True).all()
-    oradores = Orador.query.filter_by(aprovado=True, ativo=True).all()
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
-    anfitrioes = Orador.query.filter_by(anfitriao=True, aprovado=True, ativo=True).all()
+    discursos = discursos_liberados()
+    oradores = oradores_aprovados()
+    congregacoes = congregacoes_ativas()
+    anfitrioes = anfitrioes_aprovados()
     
     return render_template('agenda/novo.html',
                          discursos=discursos,
@@ -1302,7 +2643,7 @@ def novo_agendamento():
 @app.route('/agenda/<int:id>/editar', methods=['GET', 'POST'])
 @login_required
 def editar_agendamento(id):
-    agendamento = AgendaDiscurso.query.get_or_404(id)
+    agendamento = AgendaDiscurso.query.options(*RELACIONAMENTOS_AGENDA).get_or_404(id)
     
     if request.method == 'POST':
         try:
@@ -1319,6 +2660,24 @@ def editar_agendamento(id):
                 flash('Este discurso está bloqueado e não pode ser agendado!', 'error')
                 return redirect(url_for('editar_agendamento', id=id))
             
+            conflitos = conflitos_agendamento(data_discurso, horario, orador_id, congregacao_id, anfitriao_id, id)
+            if conflitos:
+                for conflito in conflitos:
+                    flash(conflito, 'error')
+                return redirect(url_for('editar_agendamento', id=id))
+            
+            mudou = (
+                agendamento.data_discurso != data_discurso or agendamento.horario != horario or
+                agendamento.orador_id != int(orador_id) or agendamento.congregacao_id != int(congregacao_id) or
+                agendamento.discurso_id != int(discurso_id)
+            )
+            if mudou and not realizado:
+                # Avisos com os dados antigos: o orador substituído recebe o cancelamento
+                if agendamento.orador_id != int(orador_id):
+                    enfileirar_cancelamento(agendamento)
+                else:
+                    cancelar_emails_pendentes(agendamento.id)
+            
             agendamento.data_discurso = data_discurso
             agendamento.horario = horario
             agendamento.discurso_id = discurso_id
@@ -1327,6 +2686,9 @@ def editar_agendamento(id):
             agendamento.anfitriao_id = anfitriao_id if anfitriao_id else None
             agendamento.realizado = realizado
             
+            if mudou and not realizado:
+                enfileirar_emails_agendamento(agendamento, atualizado=True)
+            
             db.session.commit()
             flash('Agendamento atualizado com sucesso!', 'success')
             return redirect(url_for('listar_agenda'))
@@ -1334,10 +2696,10 @@ def editar_agendamento(id):
         except Exception as e:
             flash(f'Erro ao atualizar agendamento: {str(e)}', 'error')
     
-    discursos = Discurso.query.filter_by(bloqueado=False, ativo=True).all()
-    oradores = Orador.query.filter_by(aprovado=True, ativo=True).all()
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
-    anfitrioes = Orador.query.filter_by(anfitriao=True, aprovado=True, ativo=True).all()
+    discursos = discursos_liberados()
+    oradores = oradores_aprovados()
+    congregacoes = congregacoes_ativas()
+    anfitrioes = anfitrioes_aprovados()
     
     return render_template('agenda/editar.html', 
                          agendamento=agendamento,
@@ -1355,6 +2717,8 @@ def excluir_agendamento(id):
     orador_info = agendamento.orador.nome
     data_info = agendamento.data_discurso.strftime('%d/%m/%Y')
     
+    if not agendamento.realizado:
+        enfileirar_cancelamento(agendamento)
     db.session.delete(agendamento)
     db.session.commit()
     
@@ -1377,63 +2741,188 @@ def realizar_discurso(id):
     )
     
     db.session.add(historico)
+    registrar_ultima_realizacao(historico.congregacao_id, historico.discurso_id, historico.data_realizacao)
     db.session.commit()
     
     flash('Discurso marcado como realizado e registrado no histórico!', 'success')
     return redirect(url_for('listar_agenda'))
 
+# =============================================
+# SUGESTÕES: DISCURSOS HÁ MAIS TEMPO SEM SEREM FEITOS
+# =============================================
+
+def registrar_ultima_realizacao(congregacao_id, discurso_id, data_realizacao):
+    """Atualiza o índice speech_last_given na mesma transação do histórico (upsert atômico)"""
+    valores = {
+        'congregacao_id': int(congregacao_id),
+        'discurso_id': int(discurso_id),
+        'ultima_data': data_realizacao,
+        'vezes': 1
+    }
+    dialeto = db.engine.dialect.name
+    
+    if dialeto not in ('postgresql', 'sqlite'):
+        ultima = db.session.get(UltimaRealizacao, (valores['congregacao_id'], valores['discurso_id']))
+        if ultima is None:
+            db.session.add(UltimaRealizacao(**valores))
+        else:
+            ultima.ultima_data = max(ultima.ultima_data, data_realizacao)
+            ultima.vezes += 1
+        return
+    
+    comando = (postgresql if dialeto == 'postgresql' else sqlite).insert(UltimaRealizacao).values(**valores)
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=['congregacao_id', 'discurso_id'],
+        set_={
+            'ultima_data': case(
+                (comando.excluded.ultima_data > UltimaRealizacao.ultima_data, comando.excluded.ultima_data),
+                else_=UltimaRealizacao.ultima_data
+            ),
+            'vezes': UltimaRealizacao.vezes + 1
+        }
+    ))
+
+def popular_ultimas_realizacoes(conexao):
+    """Reconstrói speech_last_given inteiro a partir do histórico"""
+    UltimaRealizacao.__table__.create(conexao, checkfirst=True)
+    conexao.execute(UltimaRealizacao.__table__.delete())
+    conexao.execute(UltimaRealizacao.__table__.insert().from_select(
+        ['congregacao_id', 'discurso_id', 'ultima_data', 'vezes'],
+        select(
+            HistoricoDiscurso.congregacao_id,
+            HistoricoDiscurso.discurso_id,
+            func.max(HistoricoDiscurso.data_realizacao),
+            func.count(HistoricoDiscurso.id)
+        ).group_by(HistoricoDiscurso.congregacao_id, HistoricoDiscurso.discurso_id)
+    ))
+
+def sugestoes_discursos(congregacao_id, limite=10):
+    """Discursos liberados ordenados pela última vez em que foram feitos na congregação
+    
+    Os nunca feitos vêm primeiro; discursos já agendados para a congregação ficam de fora.
+    """
+    ja_agendado = select(AgendaDiscurso.id).where(
+        AgendaDiscurso.congregacao_id == congregacao_id,
+        AgendaDiscurso.data_discurso >= date.today(),
+        AgendaDiscurso.discurso_id == Discurso.id,
+        AgendaDiscurso.realizado == False
+    ).exists()
+    
+    return db.session.query(
+        Discurso.id, Discurso.numero, Discurso.titulo,
+        UltimaRealizacao.ultima_data, UltimaRealizacao.vezes
+    ).outerjoin(UltimaRealizacao, and_(
+        UltimaRealizacao.discurso_id == Discurso.id,
+        UltimaRealizacao.congregacao_id == congregacao_id
+    )).filter(
+        Discurso.bloqueado == False,
+        Discurso.ativo == True,
+        ~ja_agendado
+    ).order_by(
+        case((UltimaRealizacao.ultima_data.is_(None), 0), else_=1),
+        UltimaRealizacao.ultima_data,
+        Discurso.numero
+    ).limit(limite).all()
+
+@app.route('/agenda/sugestoes')
+@login_required
+def sugestoes_agenda():
+    """Sugestões de discursos para a congregação escolhida no formulário da agenda"""
+    congregacao_id = request.args.get('congregacao_id', type=int)
+    if not congregacao_id:
+        return jsonify({'erro': 'Informe a congregação'}), 400
+    limite = max(1, min(request.args.get('limite', 10, type=int), 50))
+    
+    return jsonify({'sugestoes': [
+        {
+            'id': sugestao.id,
+            'numero': sugestao.numero,
+            'titulo': sugestao.titulo,
+            'ultima_data': sugestao.ultima_data.isoformat() if sugestao.ultima_data else None,
+            'vezes': sugestao.vezes or 0
+        }
+        for sugestao in sugestoes_discursos(congregacao_id, limite)
+    ]})
+
+@app.cli.command('reconstruir-sugestoes')
+def reconstruir_sugestoes():
+    """Recalcula o índice de última realização a partir de todo o histórico"""
+    with db.engine.begin() as conexao:
+        popular_ultimas_realizacoes(conexao)
+    print(f"✅ Índice reconstruído: {UltimaRealizacao.query.count()} pares congregação/discurso")
+
 # =============================================
 # ROTAS PARA HISTÓRICO DE DISCURSOS
 # =============================================
 
+def filtros_historico(avisar_datas_invalidas=False, args=None):
+    """Lê os filtros do histórico (da query string por padrão) e devolve (condições, valores)"""
+    if args is None:
+        args = request.args
+    filtros = {
+        'congregacao_id': args.get('congregacao_id', '').strip(),
+        'orador_id': args.get('orador_id', '').strip(),
+        'discurso_id': args.get('discurso_id', '').strip(),
+        'data_inicio': args.get('data_inicio', '').strip(),
+        'data_fim': args.get('data_fim', '').strip()
+    }
+    condicoes = []
+    
+    if filtros['congregacao_id'].isdigit():
+        condicoes.append(HistoricoDiscurso.congregacao_id == int(filtros['congregacao_id']))
+    
+    if filtros['orador_id'].isdigit():
+        condicoes.append(HistoricoDiscurso.orador_id == int(filtros['orador_id']))
+    
+    if filtros['discurso_id'].isdigit():
+        condicoes.append(HistoricoDiscurso.discurso_id == int(filtros['discurso_id']))
+    
+    if filtros['data_inicio']:
+        try:
+            data_inicio_obj = datetime.strptime(filtros['data_inicio'], '%Y-%m-%d').date()
+            condicoes.append(HistoricoDiscurso.data_realizacao >= data_inicio_obj)
+        except ValueError:
+            if avisar_datas_invalidas:
+                flash('Data de início inválida', 'warning')
+    
+    if filtros['data_fim']:
+        try:
+            data_fim_obj = datetime.strptime(filtros['data_fim'], '%Y-%m-%d').date()
+            condicoes.append(HistoricoDiscurso.data_realizacao <= data_fim_obj)
+        except ValueError:
+            if avisar_datas_invalidas:
+                flash('Data de fim inválida', 'warning')
+    
+    return condicoes, filtros
+
 @app.route('/historico')
 @login_required
 def listar_historico():
     try:
-        congregacao_id = request.args.get('congregacao_id', '').strip()
-        orador_id = request.args.get('orador_id', '').strip()
-        discurso_id = request.args.get('discurso_id', '').strip()
-        data_inicio = request.args.get('data_inicio', '').strip()
-        data_fim = request.args.get('data_fim', '').strip()
-        
-        query = HistoricoDiscurso.query.order_by(HistoricoDiscurso.data_realizacao.desc())
-        
-        if congregacao_id and congregacao_id.isdigit():
-            query = query.filter(HistoricoDiscurso.congregacao_id == int(congregacao_id))
-        
-        if orador_id and orador_id.isdigit():
-            query = query.filter(HistoricoDiscurso.orador_id == int(orador_id))
-        
-        if discurso_id and discurso_id.isdigit():
-            query = query.filter(HistoricoDiscurso.discurso_id == int(discurso_id))
-        
-        if data_inicio:
-            try:
-                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                query = query.filter(HistoricoDiscurso.data_realizacao >= data_inicio_obj)
-            except ValueError:
-                flash('Data de início inválida', 'warning')
-        
-        if data_fim:
-            try:
-                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                query = query.filter(HistoricoDiscurso.data_realizacao <= data_fim_obj)
-            except ValueError:
-                flash('Data de fim inválida', 'warning')
+        condicoes, filtros = filtros_historico(avisar_datas_invalidas=True)
         
-        historico = query.all()
+        pagina = paginar_por_cursor(
+            HistoricoDiscurso.query.options(*RELACIONAMENTOS_HISTORICO).filter(*condicoes),
+            HistoricoDiscurso.data_realizacao,
+            HistoricoDiscurso.id,
+            decrescente=True
+        )
         
-        congregacoes = Congregacao.query.filter_by(ativo=True).all()
-        oradores = Orador.query.filter_by(ativo=True).all()
-        discursos = Discurso.query.filter_by(ativo=True).order_by(Discurso.numero).all()
+        congregacoes = congregacoes_ativas()
+        oradores = oradores_ativos()
+        discursos = discursos_ativos()
         
-        total_registros = len(historico)
-        congregacoes_envolvidas = len(set(h.congregacao_id for h in historico))
-        oradores_envolvidos = len(set(h.orador_id for h in historico))
-        discursos_realizados = len(set(h.discurso_id for h in historico))
+        total_registros, congregacoes_envolvidas, oradores_envolvidos, discursos_realizados = db.session.query(
+            func.count(HistoricoDiscurso.id),
+            func.count(HistoricoDiscurso.congregacao_id.distinct()),
+            func.count(HistoricoDiscurso.orador_id.distinct()),
+            func.count(HistoricoDiscurso.discurso_id.distinct())
+        ).filter(*condicoes).one()
         
         return render_template('historico/listar.html', 
-                             historico=historico, 
+                             historico=pagina.itens, 
+                             pagina=pagina,
+                             argumentos_paginacao=argumentos_sem_cursor(),
                              congregacoes=congregacoes,
                              oradores=oradores,
                              discursos=discursos,
@@ -1441,13 +2930,7 @@ def listar_historico():
                              congregacoes_envolvidas=congregacoes_envolvidas,
                              oradores_envolvidos=oradores_envolvidos,
                              discursos_realizados=discursos_realizados,
-                             filtros={
-                                 'congregacao_id': congregacao_id,
-                                 'orador_id': orador_id,
-                                 'discurso_id': discurso_id,
-                                 'data_inicio': data_inicio,
-                                 'data_fim': data_fim
-                             })
+                             filtros=filtros)
                              
     except Exception as e:
         flash(f'Erro ao carregar histórico: {str(e)}', 'error')
@@ -1473,6 +2956,7 @@ def novo_historico():
             )
             
             db.session.add(historico)
+            registrar_ultima_realizacao(congregacao_id, discurso_id, data_realizacao)
             db.session.commit()
             flash('Discurso histórico registrado com sucesso!', 'success')
             return redirect(url_for('listar_historico'))
@@ -1480,164 +2964,280 @@ def novo_historico():
         except Exception as e:
             flash(f'Erro ao registrar histórico: {str(e)}', 'error')
     
-    discursos = Discurso.query.filter_by(ativo=True).all()
-    oradores = Orador.query.filter_by(ativo=True).all()
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    discursos = discursos_ativos()
+    oradores = oradores_ativos()
+    congregacoes = congregacoes_ativas()
     
     return render_template('historico/novo.html',
                          discursos=discursos,
                          oradores=oradores,
                          congregacoes=congregacoes)
 
+def chave_relatorio_pdf(filtros, condicoes):
+    """Hash dos filtros somado à versão dos dados que eles selecionam
+    
+    O histórico só recebe inserções, então (quantidade, maior id) das linhas
+    filtradas muda sempre que o relatório precisaria ser refeito. Os nomes de
+    discursos, oradores e congregações entram pelos contadores dessas tabelas.
+    """
+    total, ultimo_id = db.session.query(
+        func.count(HistoricoDiscurso.id),
+        func.max(HistoricoDiscurso.id)
+    ).filter(*condicoes).one()
+    tabelas = ['congregations', 'speakers', 'speeches']
+    conteudo = json.dumps({
+        'filtros': filtros,
+        'total': total,
+        'ultimo_id': ultimo_id,
+        'versoes': dict(zip(tabelas, versoes_tabelas(tabelas))),
+    }, sort_keys=True)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+def gerar_pdf_historico(filtros, solicitado_por, caminho):
+    """Monta o PDF do histórico diretamente em disco (executado pelo worker)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    
+    condicoes, filtros = filtros_historico(args=filtros)
+    historico = HistoricoDiscurso.query.options(*RELACIONAMENTOS_HISTORICO).filter(*condicoes).order_by(
+        HistoricoDiscurso.data_realizacao.desc(), HistoricoDiscurso.id.desc()
+    ).all()
+    
+    doc = SimpleDocTemplate(caminho, pagesize=A4, topMargin=30)
+    
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=1,
+        textColor=colors.HexColor('#2c3e50')
+    )
+    
+    elements.append(Paragraph("RELATÓRIO DE HISTÓRICO DE DISCURSOS", title_style))
+    
+    filtros_texto = []
+    if filtros['congregacao_id']:
+        congregacao = Congregacao.query.get(int(filtros['congregacao_id']))
+        if congregacao:
+            filtros_texto.append(f"Congregação: {congregacao.nome}")
+    
+    if filtros['orador_id']:
+        orador = Orador.query.get(int(filtros['orador_id']))
+        if orador:
+            filtros_texto.append(f"Orador: {orador.nome}")
+    
+    if filtros['discurso_id']:
+        discurso = Discurso.query.get(int(filtros['discurso_id']))
+        if discurso:
+            filtros_texto.append(f"Discurso: #{discurso.numero} - {discurso.titulo}")
+    
+    if filtros['data_inicio']:
+        filtros_texto.append(f"Data início: {filtros['data_inicio']}")
+    
+    if filtros['data_fim']:
+        filtros_texto.append(f"Data fim: {filtros['data_fim']}")
+    
+    if filtros_texto:
+        filtros_para = Paragraph("<br/>".join(filtros_texto), styles['Normal'])
+        elements.append(filtros_para)
+        elements.append(Spacer(1, 10))
+    
+    info_text = f"Total de registros: {len(historico)} | Data de geração: {datetime.now().strftime('%d/%m/%Y às %H:%M')}"
+    elements.append(Paragraph(info_text, styles['Normal']))
+    elements.append(Spacer(1, 20))
+    
+    data = [['Data', 'Discurso', 'Orador', 'Congregação', 'Observações']]
+    
+    for item in historico:
+        observacoes = item.observacoes if item.observacoes else '-'
+        if len(observacoes) > 50:
+            observacoes = observacoes[:47] + '...'
+        
+        data.append([
+            item.data_realizacao.strftime('%d/%m/%Y'),
+            f"#{item.discurso.numero} - {item.discurso.titulo[:30]}...",
+            item.orador.nome,
+            item.congregacao.nome,
+            observacoes
+        ])
+    
+    table = Table(data, colWidths=[60, 120, 100, 100, 120])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 7),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    
+    elements.append(table)
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph(f"Relatório gerado por: {solicitado_por}", styles['Normal']))
+    elements.append(Paragraph("Sistema de Discursos Públicos", styles['Normal']))
+    
+    doc.build(elements)
+
+def reservar_proximo_relatorio():
+    """Marca o próximo relatório pendente como em processamento
+    
+    A reserva é um UPDATE condicionado ao status, então dois workers nunca
+    processam o mesmo relatório. Relatórios presos em processamento além do
+    timeout (worker interrompido) voltam a ser elegíveis.
+    """
+    limite = datetime.utcnow() - timedelta(seconds=app.config['RELATORIOS_PDF_TIMEOUT'])
+    elegivel = or_(
+        RelatorioPDF.status == 'pendente',
+        and_(RelatorioPDF.status == 'processando', RelatorioPDF.iniciado_em < limite)
+    )
+    
+    candidato = db.session.query(RelatorioPDF.id).filter(elegivel).order_by(RelatorioPDF.id).first()
+    if not candidato:
+        return None
+    
+    reservados = RelatorioPDF.query.filter(RelatorioPDF.id == candidato.id, elegivel).update(
+        {'status': 'processando', 'iniciado_em': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return RelatorioPDF.query.get(candidato.id) if reservados else None
+
+def processar_relatorio(relatorio):
+    os.makedirs(app.config['RELATORIOS_PDF_DIR'], exist_ok=True)
+    caminho = os.path.join(app.config['RELATORIOS_PDF_DIR'], f"historico_{relatorio.chave[:16]}_{relatorio.id}.pdf")
+    
+    try:
+        # Gera em arquivo temporário para nunca expor um PDF incompleto
+        gerar_pdf_historico(json.loads(relatorio.filtros), relatorio.solicitado_por, caminho + '.tmp')
+        os.replace(caminho + '.tmp', caminho)
+        relatorio.status = 'concluido'
+        relatorio.arquivo = caminho
+        relatorio.concluido_em = datetime.utcnow()
+        db.session.commit()
+        print(f"✅ Relatório PDF #{relatorio.id} gerado")
+    except Exception as e:
+        db.session.rollback()
+        relatorio.status = 'erro'
+        relatorio.erro = str(e)
+        relatorio.concluido_em = datetime.utcnow()
+        db.session.commit()
+        print(f"❌ Erro no relatório PDF #{relatorio.id}: {e}")
+
+def limpar_relatorios_antigos():
+    limite = datetime.utcnow() - timedelta(days=app.config['RELATORIOS_PDF_RETENCAO_DIAS'])
+    antigos = RelatorioPDF.query.filter(
+        RelatorioPDF.status.in_(['concluido', 'erro']),
+        RelatorioPDF.concluido_em < limite
+    ).all()
+    
+    for relatorio in antigos:
+        if relatorio.arquivo and os.path.exists(relatorio.arquivo):
+            os.remove(relatorio.arquivo)
+        db.session.delete(relatorio)
+    db.session.commit()
+
+@app.cli.command('processar-relatorios')
+@click.option('--uma-vez', is_flag=True, help='Processa os relatórios pendentes e encerra.')
+@click.option('--intervalo', default=2.0, help='Segundos entre verificações da fila vazia.')
+def processar_relatorios(uma_vez, intervalo):
+    """Worker da fila de relatórios PDF"""
+    print("🔄 Worker de relatórios PDF iniciado")
+    ultima_limpeza = 0
+    
+    while True:
+        relatorio = reservar_proximo_relatorio()
+        if relatorio:
+            processar_relatorio(relatorio)
+            continue
+        
+        if time.monotonic() - ultima_limpeza > 3600:
+            limpar_relatorios_antigos()
+            ultima_limpeza = time.monotonic()
+        
+        if uma_vez:
+            break
+        db.session.remove()
+        time.sleep(intervalo)
+
 @app.route('/historico/exportar-pdf')
 @login_required
 def exportar_historico_pdf():
+    """Enfileira o relatório PDF, ou entrega o arquivo já gerado para os mesmos filtros e dados"""
     try:
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib import colors
+            import reportlab
         except ImportError:
             flash('Módulo reportlab não está instalado. Gerando CSV como alternativa.', 'warning')
             return exportar_historico_csv()
-
-        congregacao_id = request.args.get('congregacao_id', '').strip()
-        orador_id = request.args.get('orador_id', '').strip()
-        discurso_id = request.args.get('discurso_id', '').strip()
-        data_inicio = request.args.get('data_inicio', '').strip()
-        data_fim = request.args.get('data_fim', '').strip()
-        
-        query = HistoricoDiscurso.query.order_by(HistoricoDiscurso.data_realizacao.desc())
-        
-        if congregacao_id and congregacao_id.isdigit():
-            query = query.filter(HistoricoDiscurso.congregacao_id == int(congregacao_id))
         
-        if orador_id and orador_id.isdigit():
-            query = query.filter(HistoricoDiscurso.orador_id == int(orador_id))
+        condicoes, filtros = filtros_historico()
         
-        if discurso_id and discurso_id.isdigit():
-            query = query.filter(HistoricoDiscurso.discurso_id == int(discurso_id))
-        
-        if data_inicio:
-            try:
-                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                query = query.filter(HistoricoDiscurso.data_realizacao >= data_inicio_obj)
-            except ValueError:
-                pass
-        
-        if data_fim:
-            try:
-                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                query = query.filter(HistoricoDiscurso.data_realizacao <= data_fim_obj)
-            except ValueError:
-                pass
-        
-        historico = query.all()
-        
-        if not historico:
+        existe = db.session.query(HistoricoDiscurso.id).filter(*condicoes).first()
+        if not existe:
             flash('Nenhum dado encontrado para exportar com os filtros aplicados.', 'warning')
             return redirect(url_for('listar_historico'))
-
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=30)
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=20,
-            alignment=1,
-            textColor=colors.HexColor('#2c3e50')
-        )
-        
-        elements.append(Paragraph("RELATÓRIO DE HISTÓRICO DE DISCURSOS", title_style))
         
-        filtros_texto = []
-        if congregacao_id:
-            congregacao = Congregacao.query.get(int(congregacao_id))
-            if congregacao:
-                filtros_texto.append(f"Congregação: {congregacao.nome}")
+        chave = chave_relatorio_pdf(filtros, condicoes)
+        relatorio = RelatorioPDF.query.filter(
+            RelatorioPDF.chave == chave,
+            RelatorioPDF.status != 'erro'
+        ).order_by(RelatorioPDF.id.desc()).first()
         
-        if orador_id:
-            orador = Orador.query.get(int(orador_id))
-            if orador:
-                filtros_texto.append(f"Orador: {orador.nome}")
+        if relatorio and relatorio.status == 'concluido' and os.path.exists(relatorio.arquivo):
+            return baixar_relatorio_pdf(relatorio.id)
         
-        if discurso_id:
-            discurso = Discurso.query.get(int(discurso_id))
-            if discurso:
-                filtros_texto.append(f"Discurso: #{discurso.numero} - {discurso.titulo}")
-        
-        if data_inicio:
-            filtros_texto.append(f"Data início: {data_inicio}")
-        
-        if data_fim:
-            filtros_texto.append(f"Data fim: {data_fim}")
-        
-        if filtros_texto:
-            filtros_para = Paragraph("<br/>".join(filtros_texto), styles['Normal'])
-            elements.append(filtros_para)
-            elements.append(Spacer(1, 10))
-        
-        info_text = f"Total de registros: {len(historico)} | Data de geração: {datetime.now().strftime('%d/%m/%Y às %H:%M')}"
-        elements.append(Paragraph(info_text, styles['Normal']))
-        elements.append(Spacer(1, 20))
-        
-        data = [['Data', 'Discurso', 'Orador', 'Congregação', 'Observações']]
+        if not relatorio or relatorio.status == 'concluido':
+            relatorio = RelatorioPDF(
+                chave=chave,
+                filtros=json.dumps(filtros),
+                solicitado_por=current_user.nome
+            )
+            db.session.add(relatorio)
+            db.session.commit()
         
-        for item in historico:
-            observacoes = item.observacoes if item.observacoes else '-'
-            if len(observacoes) > 50:
-                observacoes = observacoes[:47] + '...'
-            
-            data.append([
-                item.data_realizacao.strftime('%d/%m/%Y'),
-                f"#{item.discurso.numero} - {item.discurso.titulo[:30]}...",
-                item.orador.nome,
-                item.congregacao.nome,
-                observacoes
-            ])
-        
-        table = Table(data, colWidths=[60, 120, 100, 100, 120])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 7),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 20))
-        
-        elements.append(Paragraph(f"Relatório gerado por: {current_user.nome}", styles['Normal']))
-        elements.append(Paragraph("Sistema de Discursos Públicos", styles['Normal']))
-        
-        doc.build(elements)
-        buffer.seek(0)
-        
-        filename = f"historico_discursos_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
-        
-        return Response(
-            buffer.getvalue(),
-            mimetype="application/pdf",
-            headers={"Content-Disposition": f"attachment;filename={filename}"}
-        )
+        return redirect(url_for('status_relatorio_pdf', id=relatorio.id))
         
     except Exception as e:
         flash(f'Erro ao gerar PDF: {str(e)}. Gerando CSV como alternativa.', 'error')
         return exportar_historico_csv()
 
+@app.route('/relatorios/pdf/<int:id>')
+@login_required
+def status_relatorio_pdf(id):
+    """Acompanha um relatório PDF enfileirado"""
+    relatorio = RelatorioPDF.query.get_or_404(id)
+    filtros = json.loads(relatorio.filtros)
+    return render_template('relatorios/status.html', relatorio=relatorio, filtros=filtros)
+
+@app.route('/relatorios/pdf/<int:id>/baixar')
+@login_required
+def baixar_relatorio_pdf(id):
+    relatorio = RelatorioPDF.query.get_or_404(id)
+    
+    if relatorio.status != 'concluido' or not os.path.exists(relatorio.arquivo):
+        flash('Este relatório ainda não está disponível.', 'warning')
+        return redirect(url_for('status_relatorio_pdf', id=id))
+    
+    filename = f"historico_discursos_{relatorio.concluido_em.strftime('%Y%m%d_%H%M')}.pdf"
+    return send_file(
+        relatorio.arquivo,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=filename
+    )
+
 @app.route('/relatorios/pdf')
 @login_required
 def relatorios_pdf():
@@ -1654,69 +3254,37 @@ def relatorios_pdf():
 def exportar_historico_csv():
     """Exporta histórico em formato CSV como alternativa ao PDF"""
     try:
-        congregacao_id = request.args.get('congregacao_id', '').strip()
-        orador_id = request.args.get('orador_id', '').strip()
-        discurso_id = request.args.get('discurso_id', '').strip()
-        data_inicio = request.args.get('data_inicio', '').strip()
-        data_fim = request.args.get('data_fim', '').strip()
-        
-        query = HistoricoDiscurso.query.order_by(HistoricoDiscurso.data_realizacao.desc())
-        
-        if congregacao_id and congregacao_id.isdigit():
-            query = query.filter(HistoricoDiscurso.congregacao_id == int(congregacao_id))
+        condicoes, _ = filtros_historico()
         
-        if orador_id and orador_id.isdigit():
-            query = query.filter(HistoricoDiscurso.orador_id == int(orador_id))
-        
-        if discurso_id and discurso_id.isdigit():
-            query = query.filter(HistoricoDiscurso.discurso_id == int(discurso_id))
-        
-        if data_inicio:
-            try:
-                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                query = query.filter(HistoricoDiscurso.data_realizacao >= data_inicio_obj)
-            except ValueError:
-                pass
-        
-        if data_fim:
-            try:
-                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                query = query.filter(HistoricoDiscurso.data_realizacao <= data_fim_obj)
-            except ValueError:
-                pass
-        
-        historico = query.all()
-        
-        if not historico:
+        existe = db.session.query(HistoricoDiscurso.id).filter(*condicoes).first()
+        if not existe:
             flash('Nenhum dado encontrado para exportar com os filtros aplicados.', 'warning')
             return redirect(url_for('listar_historico'))
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        writer.writerow(['Data', 'Número do Discurso', 'Título do Discurso', 'Orador', 'Congregação', 'Observações'])
-        
-        for item in historico:
-            writer.writerow([
-                item.data_realizacao.strftime('%d/%m/%Y'),
-                item.discurso.numero,
-                item.discurso.titulo,
-                item.orador.nome,
-                item.congregacao.nome,
-                item.observacoes or ''
-            ])
         
-        output.seek(0)
-        buffer = io.BytesIO()
-        buffer.write(output.getvalue().encode('utf-8'))
-        buffer.seek(0)
+        historico = db.session.query(
+            HistoricoDiscurso.data_realizacao,
+            Discurso.numero,
+            Discurso.titulo,
+            Orador.nome,
+            Congregacao.nome,
+            HistoricoDiscurso.observacoes
+        ).join(Discurso, HistoricoDiscurso.discurso_id == Discurso.id).join(
+            Orador, HistoricoDiscurso.orador_id == Orador.id
+        ).join(
+            Congregacao, HistoricoDiscurso.congregacao_id == Congregacao.id
+        ).filter(*condicoes).order_by(
+            HistoricoDiscurso.data_realizacao.desc(), HistoricoDiscurso.id.desc()
+        ).execution_options(yield_per=app.config['EXPORTACAO_LOTE'])
         
-        filename = f"historico_discursos_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+        linhas = (
+            [data_realizacao.strftime('%d/%m/%Y'), numero, titulo, orador, congregacao, observacoes or '']
+            for data_realizacao, numero, titulo, orador, congregacao, observacoes in historico
+        )
         
-        return Response(
-            buffer.getvalue(),
-            mimetype="text/csv",
-            headers={"Content-Disposition": f"attachment;filename={filename}"}
+        return resposta_csv(
+            'historico_discursos',
+            ['Data', 'Número do Discurso', 'Título do Discurso', 'Orador', 'Congregação', 'Observações'],
+            linhas
         )
         
     except Exception as e:
@@ -1766,8 +3334,9 @@ def coordenador_congregacao(id):
 # =============================================
 
 @app.route('/orador/<int:orador_id>/aceitar-discursos')
+@resposta_condicional_orador
 def aceitar_discursos_orador(orador_id):
-    orador = Orador.query.get_or_404(orador_id)
+    orador = Orador.query.options(*RELACIONAMENTOS_ORADOR).get_or_404(orador_id)
     
     todos_discursos = Discurso.query.order_by(Discurso.numero).all()
     
@@ -1820,12 +3389,15 @@ def remover_discurso_orador(orador_id, discurso_id):
     flash(f'Discurso {discurso_info} removido da sua lista!', 'success')
     return redirect(url_for('aceitar_discursos_orador', orador_id=orador_id))
 @app.route('/orador/<int:orador_id>/discursos-preparados')
+@resposta_condicional_orador
 def discursos_preparados_orador(orador_id):
     """Página onde o orador vê seus discursos preparados/aceitos"""
     orador = Orador.query.get_or_404(orador_id)
     
     # Busca os discursos que o orador aceitou
-    discursos_preparados = OradorDiscurso.query.filter_by(
+    discursos_preparados = OradorDiscurso.query.options(
+        joinedload(OradorDiscurso.discurso)
+    ).filter_by(
         orador_id=orador_id,
         aceito=True
     ).order_by(OradorDiscurso.data_aceitacao.desc()).all()
@@ -1872,7 +3444,9 @@ def admin_discursos_aceitos():
     congregacao_id = request.args.get('congregacao_id')
     orador_id = request.args.get('orador_id')
     
-    query = OradorDiscurso.query.join(Orador).filter(OradorDiscurso.aceito == True)
+    query = OradorDiscurso.query.join(Orador).options(
+        *RELACIONAMENTOS_DISCURSOS_ACEITOS
+    ).filter(OradorDiscurso.aceito == True)
     
     if congregacao_id:
         query = query.filter(Orador.congregacao_id == congregacao_id)
@@ -1882,8 +3456,8 @@ def admin_discursos_aceitos():
     
     discursos_aceitos = query.order_by(OradorDiscurso.data_aceitacao.desc()).all()
     
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
-    oradores = Orador.query.filter_by(ativo=True).all()
+    congregacoes = congregacoes_ativas()
+    oradores = oradores_ativos()
     
     return render_template('admin/discursos_aceitos.html',
                          discursos_aceitos=discursos_aceitos,
@@ -1902,7 +3476,7 @@ def orador_login():
         
         usuario = UsuarioOrador.query.filter_by(username=username, ativo=True).first()
         
-        if usuario and check_password_hash(usuario.password, password):
+        if autenticar(usuario, password):
             return redirect(url_for('orador_discursos', orador_id=usuario.orador_id))
         else:
             flash('Usuário ou senha inválidos!', 'error')
@@ -1917,9 +3491,10 @@ def orador_logout():
     return redirect(url_for('orador_login'))
 
 @app.route('/orador/<int:orador_id>/discursos')
+@resposta_condicional_orador
 def orador_discursos(orador_id):
-    orador = Orador.query.get_or_404(orador_id)
-    discursos = AgendaDiscurso.query.filter(
+    orador = Orador.query.options(*RELACIONAMENTOS_ORADOR).get_or_404(orador_id)
+    discursos = AgendaDiscurso.query.options(*RELACIONAMENTOS_AGENDA).filter(
         AgendaDiscurso.orador_id == orador_id,
         AgendaDiscurso.data_discurso >= date.today()
     ).order_by(AgendaDiscurso.data_discurso).all()
@@ -1960,6 +3535,248 @@ def cancelar_confirmacao_discurso(orador_id, agenda_id):
     flash('Confirmação do discurso cancelada!', 'warning')
     return redirect(url_for('orador_discursos', orador_id=orador_id))
 
+# =============================================
+# CALENDÁRIOS ICS (ASSINATURA POR ORADOR E CONGREGAÇÃO)
+# =============================================
+
+# Mudanças nessas tabelas alteram o conteúdo de qualquer calendário (nomes,
+# títulos, locais); mudanças em linhas da agenda alteram só os calendários delas
+TABELAS_CALENDARIO = {'speeches', 'congregations', 'speakers', 'speech_schedule'}
+
+def calendarios_alterados(objeto):
+    """Versões de calendário afetadas pelo objeto (inclusive os valores anteriores da linha)"""
+    if isinstance(objeto, (Discurso, Congregacao, Orador)):
+        return {'calendarios'}
+    if isinstance(objeto, AgendaDiscurso):
+        atributos = db.inspect(objeto).attrs
+        nomes = set()
+        for coluna, prefixo in (('orador_id', 'calendario_orador'), ('congregacao_id', 'calendario_congregacao')):
+            historico = getattr(atributos, coluna).history
+            nomes.update(
+                f'{prefixo}:{valor}'
+                for valor in (*historico.added, *historico.unchanged, *historico.deleted) if valor
+            )
+        return nomes
+    return set()
+
+@event.listens_for(Session, 'after_flush')
+def versionar_calendarios_do_flush(session, flush_context):
+    nomes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        nomes.update(calendarios_alterados(obj))
+    if nomes:
+        incrementar_versoes(session.connection(), nomes)
+
+@event.listens_for(Session, 'do_orm_execute')
+def versionar_calendarios_em_massa(orm_execute_state):
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.bind_mapper.local_table.name in TABELAS_CALENDARIO:
+        incrementar_versoes(orm_execute_state.session.connection(), {'calendarios'})
+
+def etag_calendario(tipo, id_):
+    """Versão geral + versão das linhas do calendário + data (a janela de dias anda com o tempo)"""
+    nome = f'calendario_{tipo}:{id_}'
+    versoes = dict(db.session.query(VersaoDados.nome, VersaoDados.versao).filter(
+        VersaoDados.nome.in_(('calendarios', nome))
+    ).all())
+    return f"{tipo}-{id_}-{versoes.get('calendarios', 0)}-{versoes.get(nome, 0)}-{date.today().isoformat()}"
+
+class CacheCalendarios:
+    """Calendários já montados, por processo
+    
+    Uma entrada conferida há menos de `ttl` segundos é servida sem ir ao banco.
+    Depois disso, a ETag é conferida em data_versions (um SELECT pela chave) e o
+    .ics só é remontado se a versão mudou. Um commit neste processo nas tabelas
+    do calendário obriga a conferir de novo na próxima requisição.
+    """
+    
+    def __init__(self, ttl, maximo):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self.metricas = {'sem_banco': 0, 'conferidos': 0, 'montados': 0}
+    
+    def obter(self, tipo, id_, montar):
+        """Devolve (etag, conteúdo); `montar` só é chamado quando o calendário mudou"""
+        chave = (tipo, id_)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and time.monotonic() - entrada['conferido_em'] < self.ttl:
+                self._entradas.move_to_end(chave)
+                self.metricas['sem_banco'] += 1
+                return entrada['etag'], entrada['conteudo']
+        
+        etag = etag_calendario(tipo, id_)
+        if entrada and entrada['etag'] == etag:
+            with self._lock:
+                entrada['conferido_em'] = time.monotonic()
+                self.metricas['conferidos'] += 1
+            return etag, entrada['conteudo']
+        
+        conteudo = montar()
+        with self._lock:
+            self._entradas[chave] = {'etag': etag, 'conteudo': conteudo, 'conferido_em': time.monotonic()}
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+            self.metricas['montados'] += 1
+        return etag, conteudo
+    
+    def invalidar(self, tabelas):
+        if not TABELAS_CALENDARIO & set(tabelas):
+            return
+        with self._lock:
+            for entrada in self._entradas.values():
+                entrada['conferido_em'] = float('-inf')
+
+cache_calendarios = CacheCalendarios(app.config['CALENDARIO_TTL'], app.config['CALENDARIO_CACHE_MAXIMO'])
+ao_alterar_tabelas(cache_calendarios.invalidar)
+
+def texto_ics(valor):
+    """Escapa um valor TEXT do iCalendar (RFC 5545, 3.3.11)"""
+    return (str(valor or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def linha_ics(linha):
+    """Dobra a linha em pedaços de até 75 bytes, continuando com um espaço"""
+    codificada = linha.encode('utf-8')
+    if len(codificada) <= 75:
+        return linha + '\r\n'
+    partes, atual = [], ''
+    for caractere in linha:
+        limite = 75 if not partes else 74
+        if len((atual + caractere).encode('utf-8')) > limite:
+            partes.append(atual)
+            atual = ''
+        atual += caractere
+    partes.append(atual)
+    return '\r\n '.join(partes) + '\r\n'
+
+def evento_ics(agendamento, carimbo, titulo):
+    discurso = agendamento.discurso
+    try:
+        # Horário local convertido para UTC (sufixo Z): dispensa o VTIMEZONE que
+        # um DTSTART com TZID exigiria
+        inicio = datetime.combine(
+            agendamento.data_discurso,
+            datetime.strptime(agendamento.horario, '%H:%M').time(),
+            tzinfo=ZoneInfo(app.config['CALENDARIO_FUSO'])
+        ).astimezone(timezone.utc)
+        fim = inicio + timedelta(minutes=discurso.duracao or 30)
+        quando = [
+            f"DTSTART:{inicio.strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTEND:{fim.strftime('%Y%m%dT%H%M%SZ')}",
+        ]
+    except (TypeError, ValueError):
+        # Horário fora do formato HH:MM: evento de dia inteiro
+        quando = [
+            f"DTSTART;VALUE=DATE:{agendamento.data_discurso.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(agendamento.data_discurso + timedelta(days=1)).strftime('%Y%m%d')}",
+        ]
+    
+    descricao = [f"Discurso #{discurso.numero}: {discurso.titulo}", f"Orador: {agendamento.orador.nome}"]
+    if agendamento.anfitriao:
+        descricao.append(f"Anfitrião: {agendamento.anfitriao.nome}")
+    descricao.append('Confirmado pelo orador' if agendamento.confirmado_pelo_orador else 'Aguardando confirmação do orador')
+    # As observações são anotações internas e ficam fora do calendário assinado
+    
+    linhas = [
+        'BEGIN:VEVENT',
+        f"UID:agenda-{agendamento.id}@sistema-discursos",
+        f"DTSTAMP:{carimbo}",
+        *quando,
+        f"SUMMARY:{texto_ics(titulo)}",
+        f"LOCATION:{texto_ics(f'{agendamento.congregacao.nome} - {agendamento.congregacao.localidade}')}",
+        f"DESCRIPTION:{texto_ics(chr(10).join(descricao))}",
+        f"STATUS:{'CONFIRMED' if agendamento.confirmado_pelo_orador else 'TENTATIVE'}",
+        'END:VEVENT',
+    ]
+    return ''.join(linha_ics(linha) for linha in linhas)
+
+def montar_calendario(nome, agendamentos, titulo_evento):
+    carimbo = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    partes = [''.join(linha_ics(linha) for linha in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Sistema de Discursos//Agenda//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{texto_ics(nome)}",
+        f"X-WR-TIMEZONE:{app.config['CALENDARIO_FUSO']}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:PT{max(app.config['CALENDARIO_TTL'] // 60, 15)}M",
+    ))]
+    partes.extend(evento_ics(agendamento, carimbo, titulo_evento(agendamento)) for agendamento in agendamentos)
+    partes.append(linha_ics('END:VCALENDAR'))
+    return ''.join(partes).encode('utf-8')
+
+def agenda_do_calendario(*condicoes):
+    inicio = date.today() - timedelta(days=app.config['CALENDARIO_DIAS_PASSADOS'])
+    return AgendaDiscurso.query.options(
+        *RELACIONAMENTOS_AGENDA, joinedload(AgendaDiscurso.anfitriao)
+    ).filter(
+        AgendaDiscurso.data_discurso >= inicio, *condicoes
+    ).order_by(AgendaDiscurso.data_discurso, AgendaDiscurso.horario).all()
+
+def resposta_calendario(tipo, id_, montar):
+    etag, conteudo = cache_calendarios.obter(tipo, id_, montar)
+    # ETag fraca: o DTSTAMP muda a cada montagem, mesmo com os mesmos eventos
+    if request.if_none_match.contains_weak(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(conteudo, mimetype='text/calendar')
+        resposta.headers['Content-Disposition'] = f'inline; filename="{tipo}-{id_}.ics"'
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+@app.route('/calendario/orador/<int:orador_id>.ics')
+def calendario_orador(orador_id):
+    """Assinatura dos discursos do orador (mesmo acesso das páginas do portal)"""
+    def montar():
+        orador = Orador.query.get_or_404(orador_id)
+        return montar_calendario(
+            f"Discursos - {orador.nome}",
+            agenda_do_calendario(AgendaDiscurso.orador_id == orador_id),
+            lambda agendamento: f"Discurso #{agendamento.discurso.numero} - {agendamento.congregacao.nome}"
+        )
+    return resposta_calendario('orador', orador_id, montar)
+
+def token_calendario(tipo, id_):
+    """Assinatura da URL do calendário: apps de calendário não enviam o cookie de sessão
+    
+    Derivada da SECRET_KEY; trocar a chave invalida todas as assinaturas.
+    """
+    mensagem = f'calendario:{tipo}:{id_}'.encode('utf-8')
+    return hmac.new(app.config['SECRET_KEY'].encode('utf-8'), mensagem, hashlib.sha256).hexdigest()[:32]
+
+@app.template_global()
+def url_calendario_congregacao(congregacao_id, **opcoes):
+    return url_for('calendario_congregacao', congregacao_id=congregacao_id,
+                   token=token_calendario('congregacao', congregacao_id), **opcoes)
+
+@app.route('/calendario/congregacao/<int:congregacao_id>.ics')
+def calendario_congregacao(congregacao_id):
+    """Assinatura dos discursos públicos agendados na congregação (só com a URL assinada)"""
+    token = request.args.get('token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), token_calendario('congregacao', congregacao_id).encode('utf-8')):
+        return Response('Calendário não encontrado\n', 404, mimetype='text/plain')
+    
+    def montar():
+        congregacao = Congregacao.query.get_or_404(congregacao_id)
+        return montar_calendario(
+            f"Discursos públicos - {congregacao.nome}",
+            agenda_do_calendario(AgendaDiscurso.congregacao_id == congregacao_id),
+            lambda agendamento: f"Discurso #{agendamento.discurso.numero} - {agendamento.orador.nome}"
+        )
+    return resposta_calendario('congregacao', congregacao_id, montar)
+
+@app.route('/admin/metricas/calendarios')
+@login_required
+def metricas_calendarios():
+    return jsonify(cache_calendarios.metricas)
+
 # =============================================
 # ROTAS PARA USUÁRIOS ADMINISTRADORES
 # =============================================
@@ -1967,8 +3784,8 @@ def cancelar_confirmacao_discurso(orador_id, agenda_id):
 @app.route('/usuarios')
 @login_required
 def listar_usuarios():
-    usuarios = User.query.filter_by(ativo=True).all()
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    usuarios = User.query.options(joinedload(User.congregacao)).filter_by(ativo=True).all()
+    congregacoes = congregacoes_ativas()
     return render_template('usuarios/listar.html', usuarios=usuarios, congregacoes=congregacoes)
 
 @app.route('/usuarios/novo', methods=['GET', 'POST'])
@@ -1987,7 +3804,7 @@ def novo_usuario():
         
         usuario = User(
             username=username,
-            password=generate_password_hash(password),
+            password=servico_senhas.gerar(password),
             nome=nome,
             congregacao_id=congregacao_id if congregacao_id else None
         )
@@ -1997,7 +3814,7 @@ def novo_usuario():
         flash(f'Usuário {nome} criado com sucesso!', 'success')
         return redirect(url_for('listar_usuarios'))
     
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    congregacoes = congregacoes_ativas()
     return render_template('usuarios/novo.html', congregacoes=congregacoes)
 
 @app.route('/usuarios/<int:id>/editar', methods=['GET', 'POST'])
@@ -2008,17 +3825,18 @@ def editar_usuario(id):
     if request.method == 'POST':
         usuario.username = request.form['username']
         usuario.nome = request.form['nome']
-        usuario.congregacao_id = request.form.get('congregacao_id')
+        congregacao_id = request.form.get('congregacao_id')
+        usuario.congregacao_id = congregacao_id if congregacao_id else None
         
         nova_senha = request.form.get('password')
         if nova_senha:
-            usuario.password = generate_password_hash(nova_senha)
+            usuario.password = servico_senhas.gerar(nova_senha)
         
         db.session.commit()
         flash('Usuário atualizado com sucesso!', 'success')
         return redirect(url_for('listar_usuarios'))
     
-    congregacoes = Congregacao.query.filter_by(ativo=True).all()
+    congregacoes = congregacoes_ativas()
     return render_template('usuarios/editar.html', usuario=usuario, congregacoes=congregacoes)
 
 @app.route('/usuarios/<int:id>/excluir', methods=['POST'])
@@ -2040,35 +3858,839 @@ def excluir_usuario(id):
     flash(f'Usuário {usuario.nome} excluído com sucesso!', 'success')
     return redirect(url_for('listar_usuarios'))
 
+# =============================================
+# REGISTRO DE CONSULTAS LENTAS
+# =============================================
+
+# Comandos que o banco consegue explicar sem executá-los de novo
+COMANDOS_COM_PLANO = ('select', 'with', 'insert', 'update', 'delete')
+
+class RegistroConsultasLentas:
+    """Grava em arquivo rotativo (uma linha JSON por consulta) os comandos SQL acima do limite"""
+    
+    def __init__(self, arquivo, limite_ms, tamanho, copias, capturar_plano, validade_plano, gravar_parametros):
+        self.arquivo = arquivo
+        self.limite = limite_ms / 1000
+        self.tamanho = tamanho
+        self.copias = copias
+        self.capturar_plano = capturar_plano
+        self.validade_plano = validade_plano
+        self.gravar_parametros = gravar_parametros
+        self._lock = threading.Lock()
+        self._logger = None
+        # SQL -> (momento da captura, plano): a mesma consulta lenta repetida
+        # não paga outro EXPLAIN na conexão da requisição
+        self._planos = OrderedDict()
+    
+    @property
+    def ativo(self):
+        return self.limite > 0
+    
+    def _obter_logger(self):
+        # O arquivo só é aberto na primeira consulta lenta. Vários processos do
+        # gunicorn escrevem no mesmo arquivo; numa rotação simultânea algumas
+        # linhas podem se perder, o que é aceitável para um log de diagnóstico.
+        with self._lock:
+            if self._logger is None:
+                os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+                handler = RotatingFileHandler(
+                    self.arquivo, maxBytes=self.tamanho, backupCount=self.copias,
+                    encoding='utf-8', delay=True
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger = logging.getLogger('consultas_lentas')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+    
+    def _plano(self, conexao, sql, parametros, executemany):
+        if not self.capturar_plano or executemany:
+            return None
+        if not sql.lstrip().lower().startswith(COMANDOS_COM_PLANO):
+            return None
+        
+        with self._lock:
+            capturado = self._planos.get(sql)
+            if capturado and time.monotonic() - capturado[0] < self.validade_plano:
+                return capturado[1]
+        plano = self._capturar_plano(conexao, sql, parametros)
+        with self._lock:
+            self._planos[sql] = (time.monotonic(), plano)
+            self._planos.move_to_end(sql)
+            while len(self._planos) > 200:
+                self._planos.popitem(last=False)
+        return plano
+    
+    def _capturar_plano(self, conexao, sql, parametros):
+        # O plano é pedido na mesma conexão; no PostgreSQL um savepoint evita que
+        # uma falha no EXPLAIN aborte a transação da requisição
+        postgres = conexao.dialect.name == 'postgresql'
+        conexao.info['capturando_plano'] = True
+        try:
+            if postgres:
+                conexao.exec_driver_sql('SAVEPOINT plano_consulta_lenta')
+            plano = plano_do_sql(conexao, sql, parametros)
+            if postgres:
+                conexao.exec_driver_sql('RELEASE SAVEPOINT plano_consulta_lenta')
+            return plano
+        except Exception as e:
+            if postgres:
+                conexao.exec_driver_sql('ROLLBACK TO SAVEPOINT plano_consulta_lenta')
+            return f'indisponível: {e.__class__.__name__}: {e}'
+        finally:
+            conexao.info['capturando_plano'] = False
+    
+    def registrar(self, conexao, sql, parametros, duracao, executemany):
+        if self.gravar_parametros and 'password' not in sql.lower():
+            parametros_texto = repr(parametros)[:1000]
+        else:
+            parametros_texto = '[omitidos]'
+        
+        registro = {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'duracao_ms': round(duracao * 1000, 1),
+            'rota': request.endpoint if has_request_context() else None,
+            'requisicao': f'{request.method} {request.full_path.rstrip("?")}' if has_request_context() else None,
+            'pid': os.getpid(),
+            'sql': sql,
+            'parametros': parametros_texto,
+            'plano': self._plano(conexao, sql, parametros, executemany),
+        }
+        self._obter_logger().info(json.dumps(registro, ensure_ascii=False))
+    
+    def recentes(self, limite):
+        """Últimos registros, do mais novo para o mais antigo, percorrendo os arquivos rotacionados"""
+        registros = []
+        for indice in range(self.copias + 1):
+            caminho = self.arquivo if indice == 0 else f'{self.arquivo}.{indice}'
+            if not os.path.exists(caminho):
+                break
+            # Só as últimas linhas que ainda cabem no limite ficam em memória
+            with open(caminho, encoding='utf-8') as arquivo:
+                linhas = deque(arquivo, maxlen=limite - len(registros))
+            for linha in reversed(linhas):
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    continue
+                if len(registros) >= limite:
+                    return registros
+        return registros
+
+consultas_lentas = RegistroConsultasLentas(
+    app.config['CONSULTAS_LENTAS_ARQUIVO'],
+    app.config['CONSULTAS_LENTAS_MS'],
+    app.config['CONSULTAS_LENTAS_TAMANHO'],
+    app.config['CONSULTAS_LENTAS_COPIAS'],
+    app.config['CONSULTAS_LENTAS_PLANO'],
+    app.config['CONSULTAS_LENTAS_PLANO_TTL'],
+    app.config['CONSULTAS_LENTAS_PARAMETROS']
+)
+
+@app.route('/admin/consultas-lentas')
+@login_required
+def admin_consultas_lentas():
+    limite = max(1, min(request.args.get('limite', 100, type=int), 1000))
+    return render_template('admin/consultas_lentas.html',
+                         registros=consultas_lentas.recentes(limite),
+                         limite_ms=app.config['CONSULTAS_LENTAS_MS'],
+                         limite=limite)
+
+# =============================================
+# MÉTRICAS POR ROTA
+# =============================================
+
+class MetricasRotas:
+    """Totais por endpoint de cada processo, somados entre os processos no /metrics
+    
+    Cada processo grava os seus totais em <pid>-<sufixo>.json (o sufixo evita
+    que um worker novo com o PID de um antigo sobrescreva os totais dele). Quando
+    o gunicorn recolhe um worker encerrado, o mestre soma o arquivo dele em
+    encerrados.json e o apaga, então os contadores nunca diminuem e o diretório
+    não cresce com a reciclagem de workers.
+    """
+    
+    ENCERRADOS = 'encerrados.json'
+    
+    def __init__(self, diretorio, faixas, intervalo):
+        self.diretorio = diretorio
+        self.faixas = sorted(faixas)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._dados = {}
+        self._gravado_em = 0.0
+        self._arquivo = None
+    
+    def _novo(self):
+        return {
+            'requisicoes': {},
+            'faixas': [0] * (len(self.faixas) + 1),
+            'segundos': 0.0,
+            'consultas_sql': 0,
+            'segundos_sql': 0.0,
+            'segundos_template': 0.0,
+            'bytes': 0,
+        }
+    
+    def registrar(self, endpoint, status, segundos, consultas_sql, segundos_sql, segundos_template, tamanho):
+        with self._lock:
+            dados = self._dados.get(endpoint)
+            if dados is None:
+                dados = self._dados[endpoint] = self._novo()
+            dados['requisicoes'][status] = dados['requisicoes'].get(status, 0) + 1
+            dados['faixas'][bisect.bisect_left(self.faixas, segundos)] += 1
+            dados['segundos'] += segundos
+            dados['consultas_sql'] += consultas_sql
+            dados['segundos_sql'] += segundos_sql
+            dados['segundos_template'] += segundos_template
+            dados['bytes'] += tamanho
+            gravar = time.monotonic() - self._gravado_em >= self.intervalo
+        if gravar:
+            self.gravar()
+    
+    def _escrever(self, nome, conteudo):
+        """Troca atômica do arquivo: quem lê vê o conteúdo antigo ou o novo, nunca metade"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, nome)
+        with open(f'{caminho}.tmp', 'w') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(f'{caminho}.tmp', caminho)
+    
+    def _ler(self, nome):
+        with open(os.path.join(self.diretorio, nome)) as arquivo:
+            return json.load(arquivo)
+    
+    def gravar(self):
+        """Grava os totais deste processo no arquivo dele"""
+        with self._lock:
+            if not self._dados:
+                return
+            self._gravado_em = time.monotonic()
+            conteudo = json.dumps(self._dados)
+            pid = os.getpid()
+            if self._arquivo is None or not self._arquivo.startswith(f'{pid}-'):
+                self._arquivo = f'{pid}-{uuid.uuid4().hex[:8]}.json'
+            nome = self._arquivo
+        self._escrever(nome, conteudo)
+    
+    def limpar(self):
+        """Zera os arquivos de uma execução anterior (chamado ao iniciar o gunicorn)"""
+        if os.path.isdir(self.diretorio):
+            for nome in os.listdir(self.diretorio):
+                os.remove(os.path.join(self.diretorio, nome))
+    
+    def _somar(self, total, dados_processos):
+        for endpoint, dados in dados_processos.items():
+            soma = total.setdefault(endpoint, self._novo())
+            for status, quantidade in dados['requisicoes'].items():
+                soma['requisicoes'][status] = soma['requisicoes'].get(status, 0) + quantidade
+            if len(dados['faixas']) == len(soma['faixas']):
+                soma['faixas'] = [a + b for a, b in zip(soma['faixas'], dados['faixas'])]
+            for chave in ('segundos', 'consultas_sql', 'segundos_sql', 'segundos_template', 'bytes'):
+                soma[chave] += dados[chave]
+        return total
+    
+    def _ler_encerrados(self):
+        try:
+            return self._ler(self.ENCERRADOS)
+        except (OSError, ValueError):
+            return {'arquivos': [], 'dados': {}}
+    
+    def incorporar_processo(self, pid):
+        """Soma os totais de um worker encerrado em encerrados.json (gunicorn child_exit, no mestre)"""
+        if not os.path.isdir(self.diretorio):
+            return
+        existentes = os.listdir(self.diretorio)
+        encerrados = self._ler_encerrados()
+        incorporados = set(encerrados['arquivos'])
+        novos = [
+            nome for nome in existentes
+            if nome.startswith(f'{pid}-') and nome.endswith('.json') and nome not in incorporados
+        ]
+        for nome in novos:
+            try:
+                self._somar(encerrados['dados'], self._ler(nome))
+            except (OSError, ValueError):
+                continue
+            incorporados.add(nome)
+        if not novos:
+            return
+        # A lista só guarda os arquivos ainda presentes: quem agregar entre a
+        # gravação e a remoção abaixo ignora esses arquivos em vez de somá-los duas vezes
+        encerrados['arquivos'] = sorted(incorporados & set(existentes))
+        self._escrever(self.ENCERRADOS, json.dumps(encerrados))
+        for nome in novos:
+            try:
+                os.remove(os.path.join(self.diretorio, nome))
+            except OSError:
+                pass
+    
+    def agregar(self, tentativas=3):
+        """Soma os totais dos processos ativos aos dos workers já encerrados"""
+        self.gravar()
+        if not os.path.isdir(self.diretorio):
+            return {}
+        for _ in range(tentativas):
+            nomes = os.listdir(self.diretorio)
+            encerrados = self._ler_encerrados()
+            incorporados = set(encerrados['arquivos'])
+            total = self._somar({}, encerrados['dados'])
+            try:
+                for nome in nomes:
+                    if nome == self.ENCERRADOS or not nome.endswith('.json') or nome in incorporados:
+                        continue
+                    try:
+                        self._somar(total, self._ler(nome))
+                    except ValueError:
+                        continue
+            except FileNotFoundError:
+                # O mestre incorporou um worker durante a leitura: recomeça com o encerrados.json novo
+                continue
+            return total
+        return total
+    
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus"""
+        def rotulo(valor):
+            return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        
+        total = self.agregar()
+        linhas = [
+            '# HELP discursos_requisicoes_total Requisições atendidas por endpoint e status.',
+            '# TYPE discursos_requisicoes_total counter',
+        ]
+        for endpoint, dados in sorted(total.items()):
+            for status, quantidade in sorted(dados['requisicoes'].items()):
+                linhas.append(f'discursos_requisicoes_total{{endpoint="{rotulo(endpoint)}",status="{status}"}} {quantidade}')
+        
+        linhas += [
+            '# HELP discursos_requisicao_segundos Duração das requisições por endpoint.',
+            '# TYPE discursos_requisicao_segundos histogram',
+        ]
+        for endpoint, dados in sorted(total.items()):
+            acumulado = 0
+            for limite, quantidade in zip(self.faixas + ['+Inf'], dados['faixas']):
+                acumulado += quantidade
+                linhas.append(f'discursos_requisicao_segundos_bucket{{endpoint="{rotulo(endpoint)}",le="{limite}"}} {acumulado}')
+            linhas.append(f'discursos_requisicao_segundos_sum{{endpoint="{rotulo(endpoint)}"}} {dados["segundos"]:.6f}')
+            linhas.append(f'discursos_requisicao_segundos_count{{endpoint="{rotulo(endpoint)}"}} {acumulado}')
+        
+        for nome, chave, descricao in (
+            ('discursos_sql_consultas_total', 'consultas_sql', 'Comandos SQL executados por endpoint.'),
+            ('discursos_sql_segundos_total', 'segundos_sql', 'Tempo gasto em comandos SQL por endpoint.'),
+            ('discursos_template_segundos_total', 'segundos_template', 'Tempo de renderização de templates por endpoint.'),
+            ('discursos_resposta_bytes_total', 'bytes', 'Bytes enviados no corpo das respostas por endpoint.'),
+        ):
+            linhas += [f'# HELP {nome} {descricao}', f'# TYPE {nome} counter']
+            for endpoint, dados in sorted(total.items()):
+                valor = dados[chave]
+                valor = f'{valor:.6f}' if isinstance(valor, float) else valor
+                linhas.append(f'{nome}{{endpoint="{rotulo(endpoint)}"}} {valor}')
+        
+        return '\n'.join(linhas) + '\n'
+
+metricas_rotas = MetricasRotas(
+    app.config['METRICAS_DIR'],
+    app.config['METRICAS_FAIXAS'],
+    app.config['METRICAS_INTERVALO']
+)
+# Totais ainda não gravados quando o processo termina (reciclagem do gunicorn)
+atexit.register(metricas_rotas.gravar)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def marcar_inicio_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    # No contexto da execução, não na conexão: um comando que falha não chega ao
+    # after_cursor_execute e o valor é descartado junto com o contexto
+    if contexto is not None:
+        contexto._inicio_consulta = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def medir_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    inicio = getattr(contexto, '_inicio_consulta', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    if conexao.info.get('capturando_plano'):
+        return
+    if consultas_lentas.ativo and duracao >= consultas_lentas.limite:
+        consultas_lentas.registrar(conexao, sql, parametros, duracao, executemany)
+    medicao = g.get('medicao') if has_request_context() else None
+    if medicao is not None:
+        medicao[1] += 1
+        medicao[2] += duracao
+
+@before_render_template.connect_via(app)
+def marcar_inicio_template(sender, template, context, **extra):
+    g.inicio_template = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def medir_template(sender, template, context, **extra):
+    medicao = g.get('medicao')
+    if medicao is not None and 'inicio_template' in g:
+        medicao[3] += time.perf_counter() - g.pop('inicio_template')
+
+@app.before_request
+def iniciar_medicao_requisicao():
+    if app.config['METRICAS_ATIVAS']:
+        # [início, comandos SQL, segundos em SQL, segundos em templates]
+        g.medicao = [time.perf_counter(), 0, 0.0, 0.0]
+
+class CorpoContado:
+    """Corpo de uma resposta em streaming que conta os bytes à medida que são enviados"""
+    
+    def __init__(self, response):
+        self._original = response.response
+        self._partes = response.iter_encoded()
+        self.total = 0
+    
+    def __iter__(self):
+        for parte in self._partes:
+            self.total += len(parte)
+            yield parte
+    
+    def close(self):
+        if hasattr(self._original, 'close'):
+            self._original.close()
+
+@app.after_request
+def registrar_medicao_requisicao(response):
+    medicao = g.get('medicao')
+    if medicao is None:
+        return response
+    endpoint = request.endpoint or 'nao_encontrado'
+    
+    def registrar(tamanho):
+        inicio, consultas_sql, segundos_sql, segundos_template = medicao
+        metricas_rotas.registrar(
+            endpoint,
+            response.status_code,
+            time.perf_counter() - inicio,
+            consultas_sql,
+            segundos_sql,
+            segundos_template,
+            tamanho
+        )
+    
+    if response.content_length is None and response.is_streamed:
+        # Corpo gerado durante o envio (exportação CSV): bytes, duração e SQL são
+        # contados quando o envio termina
+        corpo = CorpoContado(response)
+        response.response = corpo
+        response.call_on_close(lambda: registrar(corpo.total))
+    else:
+        registrar(response.content_length or 0)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Coletor com `Authorization: Bearer <METRICAS_TOKEN>` ou usuário logado no sistema"""
+    token = app.config['METRICAS_TOKEN']
+    autorizacao = request.headers.get('Authorization', '')
+    token_valido = bool(token) and hmac.compare_digest(autorizacao.encode(), f'Bearer {token}'.encode())
+    if not token_valido and not current_user.is_authenticated:
+        return Response('Não autorizado\n', 401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Bearer'})
+    return Response(metricas_rotas.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# =============================================
+# SAÚDE DO SERVIÇO
+# =============================================
+
+def uso_do_pool():
+    pool = db.engine.pool
+    uso = {'tipo': type(pool).__name__}
+    for nome, metodo in (('tamanho', 'size'), ('em_uso', 'checkedout'),
+                         ('livres', 'checkedin'), ('excedentes', 'overflow')):
+        if hasattr(pool, metodo):
+            uso[nome] = getattr(pool, metodo)()
+    return uso
+
+@app.route('/saude/pronto')
+def saude_pronto():
+    """Readiness: o processo responde e consegue uma conexão do pool para um SELECT 1"""
+    inicio = time.monotonic()
+    try:
+        db.session.execute(text('SELECT 1'))
+        db.session.rollback()
+        banco = 'ok'
+    except Exception as e:
+        db.session.rollback()
+        banco = f'erro: {e.__class__.__name__}'
+    
+    return jsonify({
+        'status': 'pronto' if banco == 'ok' else 'indisponivel',
+        'banco': banco,
+        'latencia_ms': round((time.monotonic() - inicio) * 1000, 1),
+        'pid': os.getpid(),
+        'pool': uso_do_pool(),
+    }), 200 if banco == 'ok' else 503
+
+# =============================================
+# API JSON (SOMENTE LEITURA)
+# =============================================
+
+def filtros_api_oradores(args):
+    condicoes = [Orador.ativo == True]
+    if args.get('congregacao_id', '').isdigit():
+        condicoes.append(Orador.congregacao_id == int(args['congregacao_id']))
+    if args.get('anfitriao') in ('0', '1'):
+        condicoes.append(Orador.anfitriao == (args['anfitriao'] == '1'))
+    return condicoes
+
+def filtros_api_congregacoes(args):
+    return [Congregacao.ativo == True]
+
+def filtros_api_discursos(args):
+    condicoes = [Discurso.ativo == True]
+    if args.get('bloqueado') in ('0', '1'):
+        condicoes.append(Discurso.bloqueado == (args['bloqueado'] == '1'))
+    if args.get('tema'):
+        condicoes.append(func.lower(Discurso.tema) == args['tema'].strip().lower())
+    return condicoes
+
+# Para cada recurso: campos disponíveis (coluna e o relacionamento a juntar para obtê-la),
+# filtros aceitos e a chave da paginação. Só as colunas pedidas entram no SELECT.
+RECURSOS_API = {
+    'agenda': {
+        'modelo': AgendaDiscurso,
+        'filtros': filtros_agenda,
+        'coluna_data': AgendaDiscurso.data_discurso,
+        'decrescente': False,
+        'campos': {
+            'id': (AgendaDiscurso.id, None),
+            'data_discurso': (AgendaDiscurso.data_discurso, None),
+            'horario': (AgendaDiscurso.horario, None),
+            'discurso_id': (AgendaDiscurso.discurso_id, None),
+            'discurso_numero': (Discurso.numero, AgendaDiscurso.discurso),
+            'discurso_titulo': (Discurso.titulo, AgendaDiscurso.discurso),
+            'orador_id': (AgendaDiscurso.orador_id, None),
+            'orador_nome': (Orador.nome, AgendaDiscurso.orador),
+            'congregacao_id': (AgendaDiscurso.congregacao_id, None),
+            'congregacao_nome': (Congregacao.nome, AgendaDiscurso.congregacao),
+            'anfitriao_id': (AgendaDiscurso.anfitriao_id, None),
+            'confirmado_pelo_orador': (AgendaDiscurso.confirmado_pelo_orador, None),
+            'realizado': (AgendaDiscurso.realizado, None),
+        },
+    },
+    'historico': {
+        'modelo': HistoricoDiscurso,
+        'filtros': lambda args: filtros_historico(args=args)[0],
+        'coluna_data': HistoricoDiscurso.data_realizacao,
+        'decrescente': True,
+        'campos': {
+            'id': (HistoricoDiscurso.id, None),
+            'data_realizacao': (HistoricoDiscurso.data_realizacao, None),
+            'discurso_id': (HistoricoDiscurso.discurso_id, None),
+            'discurso_numero': (Discurso.numero, HistoricoDiscurso.discurso),
+            'discurso_titulo': (Discurso.titulo, HistoricoDiscurso.discurso),
+            'orador_id': (HistoricoDiscurso.orador_id, None),
+            'orador_nome': (Orador.nome, HistoricoDiscurso.orador),
+            'congregacao_id': (HistoricoDiscurso.congregacao_id, None),
+            'congregacao_nome': (Congregacao.nome, HistoricoDiscurso.congregacao),
+            'observacoes': (HistoricoDiscurso.observacoes, None),
+        },
+    },
+    'oradores': {
+        'modelo': Orador,
+        'filtros': filtros_api_oradores,
+        'campos': {
+            'id': (Orador.id, None),
+            'nome': (Orador.nome, None),
+            'congregacao_id': (Orador.congregacao_id, None),
+            'congregacao_nome': (Congregacao.nome, Orador.congregacao),
+            'anfitriao': (Orador.anfitriao, None),
+            'telefone': (Orador.telefone, None),
+            'email': (Orador.email, None),
+            'aprovado': (Orador.aprovado, None),
+        },
+    },
+    'congregacoes': {
+        'modelo': Congregacao,
+        'filtros': filtros_api_congregacoes,
+        'campos': {
+            'id': (Congregacao.id, None),
+            'nome': (Congregacao.nome, None),
+            'localidade': (Congregacao.localidade, None),
+        },
+    },
+    'discursos': {
+        'modelo': Discurso,
+        'filtros': filtros_api_discursos,
+        'campos': {
+            'id': (Discurso.id, None),
+            'numero': (Discurso.numero, None),
+            'titulo': (Discurso.titulo, None),
+            'tema': (Discurso.tema, None),
+            'bloqueado': (Discurso.bloqueado, None),
+        },
+    },
+}
+
+def serializar_valor(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(valor).__name__}')
+
+def resposta_json(dados, status=200):
+    """JSON compacto, comprimido com gzip quando o cliente aceita e compensa"""
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'), default=serializar_valor).encode('utf-8')
+    resposta = Response(corpo, status=status, mimetype='application/json')
+    resposta.vary.add('Accept-Encoding')
+    if len(corpo) >= app.config['API_GZIP_MINIMO'] and request.accept_encodings.quality('gzip') > 0:
+        resposta.set_data(gzip.compress(corpo, compresslevel=6))
+        resposta.headers['Content-Encoding'] = 'gzip'
+    return resposta
+
+@app.route('/api/<recurso>')
+@login_required
+def api_listar(recurso):
+    """Lista paginada por cursor: ?campos=a,b&por_pagina=N&apos=CURSOR e os filtros das telas"""
+    config = RECURSOS_API.get(recurso)
+    if not config:
+        return resposta_json({'erro': f'Recurso desconhecido: {recurso}', 'recursos': sorted(RECURSOS_API)}, 404)
+    
+    campos_disponiveis = config['campos']
+    campos = [campo.strip() for campo in request.args.get('campos', '').split(',') if campo.strip()] or list(campos_disponiveis)
+    desconhecidos = [campo for campo in campos if campo not in campos_disponiveis]
+    if desconhecidos:
+        return resposta_json({'erro': f"Campos desconhecidos: {', '.join(desconhecidos)}",
+                              'campos': list(campos_disponiveis)}, 400)
+    
+    try:
+        condicoes = config['filtros'](request.args)
+    except ValueError:
+        return resposta_json({'erro': 'Filtro inválido (datas no formato AAAA-MM-DD)'}, 400)
+    
+    # A chave da paginação é sempre selecionada, mesmo que não seja devolvida
+    coluna_data = config.get('coluna_data')
+    selecionados = list(dict.fromkeys(campos + ['id'] + ([coluna_data.key] if coluna_data is not None else [])))
+    consulta = db.session.query(
+        *(campos_disponiveis[campo][0].label(campo) for campo in selecionados)
+    ).select_from(config['modelo'])
+    for relacionamento in dict.fromkeys(campos_disponiveis[campo][1] for campo in selecionados):
+        if relacionamento is not None:
+            consulta = consulta.join(relacionamento)
+    consulta = consulta.filter(*condicoes)
+    
+    if coluna_data is not None:
+        pagina = paginar_por_cursor(consulta, coluna_data, config['modelo'].id, decrescente=config['decrescente'])
+    else:
+        pagina = paginar_por_id(consulta, config['modelo'].id)
+    
+    argumentos = argumentos_sem_cursor()
+    return resposta_json({
+        'dados': [{campo: linha._mapping[campo] for campo in campos} for linha in pagina.itens],
+        'por_pagina': pagina.por_pagina,
+        'proximo': pagina.proximo and url_for('api_listar', recurso=recurso, apos=pagina.proximo, **argumentos),
+        'anterior': pagina.anterior and url_for('api_listar', recurso=recurso, antes=pagina.anterior, **argumentos),
+    })
+
+# =============================================
+# MIGRAÇÕES DE ESQUEMA
+# =============================================
+
+def criar_indices(*nomes):
+    """Migração que cria, se ainda não existirem, os índices declarados nos modelos"""
+    def aplicar(conexao):
+        indices = {indice.name: indice for tabela in db.metadata.sorted_tables for indice in tabela.indexes}
+        for nome in nomes:
+            indices[nome].create(conexao, checkfirst=True)
+    return aplicar
+
+# (versão, descrição, função que recebe a conexão). Nunca altere uma migração
+# já publicada: acrescente uma nova versão no fim da lista.
+MIGRACOES = [
+    (1, 'Índices compostos e parciais dos filtros das rotas', criar_indices(
+        'ix_speech_schedule_data',
+        'ix_speech_schedule_congregacao_data',
+        'ix_speech_schedule_orador_data',
+        'ix_speech_history_data',
+        'ix_speech_history_congregacao_data',
+        'ix_speech_history_orador_data',
+        'ix_speech_history_discurso_data',
+        'ix_speaker_speeches_orador_discurso',
+        'ix_speaker_speeches_aceitos',
+        'ix_speeches_numero',
+        'ix_speakers_congregacao_ativos',
+        'ix_speech_coordinators_congregacao_ativos',
+        'ix_speaker_users_orador_ativos',
+    )),
+    (2, 'Índices da detecção de conflitos de agendamento', criar_indices(
+        'ix_speech_schedule_congregacao_data_horario',
+        'ix_speech_schedule_anfitriao_data',
+    )),
+    (3, 'Índice de última realização por congregação e discurso', popular_ultimas_realizacoes),
+    (4, 'Índice da busca global (FTS5 no SQLite, GIN no PostgreSQL)', criar_indice_busca),
+]
+
+def aplicar_migracoes():
+    """Aplica, em ordem, as migrações ainda não registradas em schema_migrations"""
+    MigracaoAplicada.__table__.create(db.engine, checkfirst=True)
+    aplicadas = {versao for (versao,) in db.session.query(MigracaoAplicada.versao)}
+    db.session.commit()
+    
+    for versao, descricao, aplicar in MIGRACOES:
+        if versao in aplicadas:
+            continue
+        with db.engine.begin() as conexao:
+            aplicar(conexao)
+            conexao.execute(MigracaoAplicada.__table__.insert().values(
+                versao=versao,
+                descricao=descricao,
+                aplicada_em=datetime.utcnow()
+            ))
+        print(f"✅ Migração {versao:03d} aplicada: {descricao}")
+
+def plano_do_sql(conexao, sql, parametros=None):
+    """Texto do plano escolhido pelo banco (EXPLAIN QUERY PLAN no SQLite, EXPLAIN no PostgreSQL)"""
+    if conexao.dialect.name == 'sqlite':
+        return '\n'.join(linha[-1] for linha in conexao.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros))
+    return '\n'.join(linha[0] for linha in conexao.exec_driver_sql(f'EXPLAIN {sql}', parametros))
+
+def plano_de_execucao(conexao, consulta):
+    sql = str(consulta.compile(dialect=conexao.dialect, compile_kwargs={'literal_binds': True}))
+    return plano_do_sql(conexao, sql)
+
+def consultas_indexadas():
+    """Consultas das rotas e o índice que o planejador deve escolher para cada uma"""
+    hoje = date.today()
+    return [
+        ('Agenda paginada', select(AgendaDiscurso.id).where(
+            AgendaDiscurso.data_discurso >= hoje
+        ).order_by(AgendaDiscurso.data_discurso, AgendaDiscurso.id).limit(51), 'ix_speech_schedule_data'),
+        ('Agenda da congregação', select(AgendaDiscurso.id).where(
+            AgendaDiscurso.congregacao_id == 1, AgendaDiscurso.data_discurso >= hoje
+        ), 'ix_speech_schedule_congregacao_data'),
+        ('Agenda do orador', select(AgendaDiscurso.id).where(
+            AgendaDiscurso.orador_id == 1, AgendaDiscurso.data_discurso >= hoje
+        ).order_by(AgendaDiscurso.data_discurso), 'ix_speech_schedule_orador_data'),
+        ('Histórico paginado', select(HistoricoDiscurso.id).order_by(
+            HistoricoDiscurso.data_realizacao.desc(), HistoricoDiscurso.id.desc()
+        ).limit(51), 'ix_speech_history_data'),
+        ('Histórico da congregação', select(HistoricoDiscurso.id).where(
+            HistoricoDiscurso.congregacao_id == 1, HistoricoDiscurso.data_realizacao >= hoje
+        ), 'ix_speech_history_congregacao_data'),
+        ('Histórico do orador', select(HistoricoDiscurso.id).where(
+            HistoricoDiscurso.orador_id == 1
+        ).order_by(HistoricoDiscurso.data_realizacao.desc()), 'ix_speech_history_orador_data'),
+        ('Histórico do discurso', select(HistoricoDiscurso.id).where(
+            HistoricoDiscurso.discurso_id == 1
+        ).order_by(HistoricoDiscurso.data_realizacao.desc()), 'ix_speech_history_discurso_data'),
+        ('Discurso aceito pelo orador', select(OradorDiscurso.id).where(
+            OradorDiscurso.orador_id == 1, OradorDiscurso.discurso_id == 1
+        ), 'ix_speaker_speeches_orador_discurso'),
+        ('Discursos aceitos recentes', select(OradorDiscurso.id).where(
+            OradorDiscurso.aceito == True
+        ).order_by(OradorDiscurso.data_aceitacao.desc()).limit(50), 'ix_speaker_speeches_aceitos'),
+        ('Discurso por número', select(Discurso.id).where(Discurso.numero == 1), 'ix_speeches_numero'),
+        ('Oradores ativos da congregação', select(func.count(Orador.id)).where(
+            Orador.congregacao_id == 1, Orador.ativo == True
+        ), 'ix_speakers_congregacao_ativos'),
+        ('Coordenador ativo', select(CoordenadorDiscursos.id).where(
+            CoordenadorDiscursos.congregacao_id == 1, CoordenadorDiscursos.ativo == True
+        ), 'ix_speech_coordinators_congregacao_ativos'),
+        ('Usuário ativo do orador', select(UsuarioOrador.id).where(
+            UsuarioOrador.orador_id == 1, UsuarioOrador.ativo == True
+        ), 'ix_speaker_users_orador_ativos'),
+        ('Conflito de congregação e horário', select(AgendaDiscurso.id).where(
+            AgendaDiscurso.congregacao_id == 1, AgendaDiscurso.data_discurso == hoje,
+            AgendaDiscurso.horario == '19:30'
+        ), 'ix_speech_schedule_congregacao_data_horario'),
+        ('Conflito de anfitrião', select(AgendaDiscurso.id).where(
+            AgendaDiscurso.anfitriao_id == 1, AgendaDiscurso.data_discurso == hoje
+        ), 'ix_speech_schedule_anfitriao_data'),
+    ]
+
+@app.cli.command('migrar')
+def migrar():
+    """Cria as tabelas que faltam e aplica as migrações pendentes"""
+    db.create_all()
+    aplicar_migracoes()
+    print("✅ Esquema atualizado")
+
+@app.cli.command('verificar-indices')
+def verificar_indices():
+    """Confere, via EXPLAIN, se o planejador usa os índices nas consultas das rotas"""
+    falhas = 0
+    with db.engine.begin() as conexao:
+        if conexao.dialect.name == 'postgresql':
+            # Em tabelas pequenas o PostgreSQL prefere varredura sequencial
+            conexao.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        for descricao, consulta, indice in consultas_indexadas():
+            plano = plano_de_execucao(conexao, consulta)
+            if indice in plano:
+                print(f"✅ {descricao}: {indice}")
+            else:
+                falhas += 1
+                print(f"❌ {descricao}: esperado {indice}\n   {plano}")
+    
+    if falhas:
+        raise click.ClickException(f"{falhas} consulta(s) sem o índice esperado")
+
 # =============================================
 # INICIALIZAÇÃO DO BANCO
 # =============================================
 
-def inicializar_banco():
-    """Inicializa o banco apenas se necessário, sem apagar dados existentes"""
+@contextmanager
+def trava_entre_processos(nome):
+    """Garante que apenas um processo por vez execute o bloco
+    
+    No PostgreSQL usa um advisory lock; no SQLite, que só é acessado pela
+    própria máquina, uma trava de arquivo na pasta instance.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        chave = int(hashlib.sha256(nome.encode('utf-8')).hexdigest()[:15], 16)
+        with db.engine.connect() as conexao:
+            conexao.execute(text('SELECT pg_advisory_lock(:chave)'), {'chave': chave})
+            try:
+                yield
+            finally:
+                conexao.execute(text('SELECT pg_advisory_unlock(:chave)'), {'chave': chave})
+                conexao.commit()
+    else:
+        os.makedirs(app.instance_path, exist_ok=True)
+        with open(os.path.join(app.instance_path, f'{nome}.lock'), 'w') as arquivo:
+            if fcntl:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+def inicializar_banco(falhar=False):
+    """Inicializa o banco apenas se necessário, sem apagar dados existentes
+    
+    Com falhar=True (comando semear do deploy) o erro é propagado, para que o
+    processo termine com código diferente de zero e o deploy pare.
+    """
     with app.app_context():
         try:
             print("🔄 Verificando banco de dados...")
             
-            db.create_all()
-            
-            if not Congregacao.query.first():
-                print("🌱 Criando dados iniciais...")
+            with trava_entre_processos('inicializar_banco'):
+                db.create_all()
+                aplicar_migracoes()
                 criar_dados_iniciais()
-                print("✅ Dados iniciais criados!")
-            else:
-                print("✅ Banco já possui dados, mantendo existentes.")
                 
         except Exception as e:
             print(f"❌ Erro na inicialização do banco: {e}")
+            if falhar:
+                raise
             try:
                 db.create_all()
                 print("✅ Tabelas criadas com sucesso!")
             except Exception as e2:
                 print(f"❌ Erro crítico: {e2}")
 
-inicializar_banco()
+@app.cli.command('semear')
+def semear():
+    """Cria o esquema, aplica migrações e os dados iniciais (uma vez por deploy)"""
+    inicializar_banco(falhar=True)
 
 if __name__ == '__main__':
+    inicializar_banco()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# =============================================
+# PERFIL DE PRODUÇÃO DO GUNICORN
+# =============================================
+# Lido automaticamente por `gunicorn app:app` (Procfile). Tudo pode ser
+# ajustado por variáveis de ambiente, sem editar este arquivo:
+#
+#   WEB_CONCURRENCY     processos (padrão: 2 x núcleos + 1)
+#   GUNICORN_WORKER     gthread (padrão) ou gevent (requer `pip install gevent`)
+#   GUNICORN_THREADS    threads por processo no gthread (padrão: 4)
+#   GUNICORN_CONEXOES   conexões simultâneas por processo no gevent (padrão: 100)
+#   GUNICORN_TIMEOUT    segundos até reiniciar um worker travado (padrão: 30)
+#
+# O pool de conexões do banco é configurado no app.py (DB_POOL_*). Cada processo
+# tem o seu pool: o total de conexões abertas pode chegar a
+# WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW), que precisa caber no
+# limite de conexões do PostgreSQL. No gthread, DB_POOL_SIZE >= GUNICORN_THREADS
+# evita que threads esperem por conexão.
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER', 'gthread')
+
+if worker_class == 'gevent':
+    worker_connections = int(os.environ.get('GUNICORN_CONEXOES', 100))
+else:
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Reinicia cada worker após algumas milhares de requisições (com variação para
+# não reiniciarem todos juntos), limitando o crescimento de memória
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# Importa o app uma vez no processo mestre; os workers herdam o código já carregado
+preload_app = True
+
+accesslog = '-'
+
+
+def on_starting(server):
+    """Métricas por rota (/metrics) recomeçam do zero a cada início do servidor"""
+    from app import metricas_rotas
+
+    metricas_rotas.limpar()
+
+
+def worker_exit(server, worker):
+    """Últimos totais do worker antes de sair (reciclagem por max_requests ou desligamento)"""
+    from app import metricas_rotas
+
+    metricas_rotas.gravar()
+
+
+def child_exit(server, worker):
+    """No mestre: soma os totais do worker encerrado aos dos workers anteriores"""
+    from app import metricas_rotas
+
+    metricas_rotas.incorporar_processo(worker.pid)
+
+
+def post_fork(server, worker):
+    """Conexões abertas no mestre não podem ser compartilhadas entre processos"""
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,213 @@
+"""Mede as rotas mais usadas pelo test client do Flask e compara com uma execução anterior
+
+Rode contra um banco gerado por scripts/gerar_dados.py:
+
+    python scripts/benchmark_rotas.py --banco sqlite:////tmp/circuito.db --saida base.json
+    # ... depois da mudança:
+    python scripts/benchmark_rotas.py --banco sqlite:////tmp/circuito.db --saida atual.json --base base.json
+
+O script termina com código 1 se alguma rota responder com erro 5xx e, com
+--base, se alguma rota mudou de status, ficou mais lenta que a base além da
+tolerância (mediana) ou passou a executar mais comandos SQL.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def escolher_alvos(m):
+    """Congregação, orador e período usados nas URLs, os mesmos a cada execução"""
+    congregacao_id = m.db.session.query(m.HistoricoDiscurso.congregacao_id).group_by(
+        m.HistoricoDiscurso.congregacao_id
+    ).order_by(m.func.count().desc(), m.HistoricoDiscurso.congregacao_id).limit(1).scalar()
+    orador_id = m.db.session.query(m.AgendaDiscurso.orador_id).filter(
+        m.AgendaDiscurso.data_discurso >= date.today()
+    ).group_by(m.AgendaDiscurso.orador_id).order_by(
+        m.func.count().desc(), m.AgendaDiscurso.orador_id
+    ).limit(1).scalar()
+    m.db.session.commit()
+    return congregacao_id, orador_id
+
+
+def rotas_medidas(congregacao_id, orador_id):
+    ano_passado = (date.today() - timedelta(days=365)).isoformat()
+    hoje = date.today().isoformat()
+    return [
+        ('dashboard', '/dashboard'),
+        ('agenda', '/agenda'),
+        ('agenda_congregacao', f'/agenda?congregacao_id={congregacao_id}'),
+        ('historico', '/historico'),
+        ('historico_periodo', f'/historico?data_inicio={ano_passado}&data_fim={hoje}'),
+        ('exportar_csv', f'/historico/exportar-csv?data_inicio={ano_passado}&data_fim={hoje}'),
+        ('exportar_pdf', f'/historico/exportar-pdf?congregacao_id={congregacao_id}&data_inicio={ano_passado}&data_fim={hoje}'),
+        ('congregacoes', '/congregacoes'),
+        ('portal_orador_agenda', f'/orador/{orador_id}/discursos'),
+        ('portal_orador_aceitar', f'/orador/{orador_id}/aceitar-discursos'),
+        ('portal_orador_preparados', f'/orador/{orador_id}/discursos-preparados'),
+    ]
+
+
+def gerar_pdf_enfileirado(m, cliente, url):
+    """O PDF é gerado pelo worker: mede o pedido e a geração do arquivo na mesma conta"""
+    resposta = cliente.get(url)
+    relatorio = m.reservar_proximo_relatorio()
+    if relatorio:
+        m.processar_relatorio(relatorio)
+    return resposta
+
+
+def medir_rota(m, cliente, contador, url, repeticoes, pdf):
+    tempos, consultas = [], []
+    resposta = None
+    ultimo_relatorio = m.db.session.query(m.func.max(m.RelatorioPDF.id)).scalar() or 0
+    for _ in range(repeticoes + 1):
+        if pdf:
+            # Sem o relatório da repetição anterior, cada repetição gera o PDF de novo
+            m.RelatorioPDF.query.filter(m.RelatorioPDF.id > ultimo_relatorio).delete()
+            m.db.session.commit()
+        contador['consultas'] = 0
+        inicio = time.perf_counter()
+        if pdf:
+            resposta = gerar_pdf_enfileirado(m, cliente, url)
+        else:
+            resposta = cliente.get(url)
+            resposta.get_data()  # consome respostas em streaming (CSV)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(contador['consultas'])
+
+    frio, quentes = tempos[0], sorted(tempos[1:])
+    return {
+        'url': url,
+        'status': resposta.status_code,
+        'bytes': len(resposta.get_data()),
+        'frio_ms': round(frio, 2),
+        'mediana_ms': round(statistics.median(quentes), 2),
+        'minimo_ms': round(quentes[0], 2),
+        'maximo_ms': round(quentes[-1], 2),
+        'consultas': max(consultas[1:]),
+    }
+
+
+def comparar(resultados, base, tolerancia, folga_ms):
+    """Lista as regressões em relação à base (tempo mediano e número de comandos SQL)"""
+    regressoes = []
+    for nome, atual in resultados['rotas'].items():
+        anterior = base['rotas'].get(nome)
+        if not anterior:
+            continue
+        if atual['status'] != anterior['status']:
+            regressoes.append(f"{nome}: status {atual['status']}, base {anterior['status']}")
+        limite = anterior['mediana_ms'] * (1 + tolerancia) + folga_ms
+        if atual['mediana_ms'] > limite:
+            regressoes.append(
+                f"{nome}: mediana {atual['mediana_ms']} ms, base {anterior['mediana_ms']} ms (limite {limite:.2f} ms)"
+            )
+        if atual['consultas'] > anterior['consultas']:
+            regressoes.append(f"{nome}: {atual['consultas']} comandos SQL, base {anterior['consultas']}")
+    return regressoes
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--banco', help='URL do banco (padrão: DATABASE_URL)')
+    parser.add_argument('--repeticoes', type=int, default=5, help='medições após a primeira (fria)')
+    parser.add_argument('--rotas', help='nomes separados por vírgula (padrão: todas)')
+    parser.add_argument('--saida', help='arquivo JSON com os resultados')
+    parser.add_argument('--base', help='resultado anterior para comparação')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='aumento aceito na mediana (0.25 = 25%%)')
+    parser.add_argument('--folga-ms', type=float, default=5.0, help='diferença absoluta sempre aceita')
+    parser.add_argument('--usuario', default='admin')
+    parser.add_argument('--senha', default='admin123')
+    args = parser.parse_args()
+    if args.repeticoes < 1:
+        parser.error('--repeticoes precisa ser pelo menos 1')
+
+    if args.banco:
+        os.environ['DATABASE_URL'] = args.banco
+    os.environ.setdefault('SENHA_PROCESSOS', '0')
+    os.environ.setdefault('METRICAS_ATIVAS', '0')
+    # O EXPLAIN e a gravação do log de consultas lentas entrariam no tempo e na contagem de SQL
+    os.environ.setdefault('CONSULTAS_LENTAS_MS', '0')
+    os.environ.setdefault('RELATORIOS_PDF_DIR', tempfile.mkdtemp())
+    import app as m
+
+    contador = {'consultas': 0}
+
+    @m.event.listens_for(m.Engine, 'after_cursor_execute')
+    def contar_consulta(*_):
+        contador['consultas'] += 1
+
+    resultados = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao': versao_codigo(),
+        'python': platform.python_version(),
+        'repeticoes': args.repeticoes,
+        'rotas': {},
+    }
+
+    with m.app.app_context():
+        resultados['banco'] = m.db.engine.dialect.name
+        resultados['linhas'] = {
+            modelo.__tablename__: m.db.session.query(m.func.count(modelo.id)).scalar()
+            for modelo in (m.Congregacao, m.Orador, m.AgendaDiscurso, m.HistoricoDiscurso,
+                           m.OradorDiscurso, m.UsuarioOrador, m.Evento)
+        }
+        congregacao_id, orador_id = escolher_alvos(m)
+
+        cliente = m.app.test_client()
+        login = cliente.post('/login', data={'username': args.usuario, 'password': args.senha})
+        if login.status_code != 302:
+            sys.exit('❌ Não foi possível entrar com o usuário informado')
+
+        selecionadas = set(args.rotas.split(',')) if args.rotas else None
+        for nome, url in rotas_medidas(congregacao_id, orador_id):
+            if selecionadas and nome not in selecionadas:
+                continue
+            resultado = medir_rota(m, cliente, contador, url, args.repeticoes, nome == 'exportar_pdf')
+            resultados['rotas'][nome] = resultado
+            print(f"{nome:28} {resultado['status']}  mediana {resultado['mediana_ms']:9.2f} ms  "
+                  f"frio {resultado['frio_ms']:9.2f} ms  {resultado['consultas']:3} SQL  {resultado['bytes']} bytes")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados gravados em {args.saida}")
+
+    com_erro = [nome for nome, resultado in resultados['rotas'].items() if resultado['status'] >= 500]
+    if com_erro:
+        sys.exit(f"❌ Rotas com erro: {', '.join(com_erro)}")
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar(resultados, base, args.tolerancia, args.folga_ms)
+        if regressoes:
+            print("❌ Regressões em relação a", args.base)
+            for regressao in regressoes:
+                print(f"   {regressao}")
+            sys.exit(1)
+        print(f"✅ Nenhuma regressão em relação a {args.base}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Leituras e escritas concorrentes no SQLite, no modo padrão e no modo otimizado
+
+Cada modo roda numa cópia do banco: vários processos leem a agenda enquanto um
+processo confirma discursos (escrita com commit, como o portal do orador faz).
+
+    python scripts/benchmark_sqlite.py instance/sistema_discursos.db --leitores 4 --duracao 10
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def carregar_app(caminho, otimizado, comeco):
+    """Importa o app com o modo escolhido e espera o início combinado"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+    os.environ['SQLITE_OTIMIZADO'] = '1' if otimizado else '0'
+    os.environ.setdefault('SENHA_PROCESSOS', '0')
+    import app as modulo
+    time.sleep(max(comeco - time.monotonic(), 0))
+    return modulo
+
+
+def ler(caminho, otimizado, comeco, fim, fila):
+    m = carregar_app(caminho, otimizado, comeco)
+    latencias, erros = [], 0
+    with m.app.app_context():
+        while time.monotonic() < fim:
+            inicio = time.monotonic()
+            try:
+                m.db.session.execute(
+                    m.select(m.AgendaDiscurso.id, m.Orador.nome)
+                    .join(m.Orador, m.AgendaDiscurso.orador_id == m.Orador.id)
+                    .order_by(m.AgendaDiscurso.data_discurso.desc())
+                    .limit(50)
+                ).all()
+                m.db.session.rollback()
+                latencias.append(time.monotonic() - inicio)
+            except OperationalError:
+                m.db.session.rollback()
+                erros += 1
+    fila.put(('leitura', latencias, erros))
+
+
+def escrever(caminho, otimizado, comeco, fim, fila):
+    m = carregar_app(caminho, otimizado, comeco)
+    latencias, erros = [], 0
+    with m.app.app_context():
+        ids = m.db.session.scalars(m.select(m.AgendaDiscurso.id)).all()
+        m.db.session.rollback()
+        posicao = 0
+        while time.monotonic() < fim and ids:
+            inicio = time.monotonic()
+            try:
+                m.db.session.execute(
+                    m.update(m.AgendaDiscurso)
+                    .where(m.AgendaDiscurso.id == ids[posicao % len(ids)])
+                    .values(confirmado_pelo_orador=True, data_confirmacao=datetime.utcnow())
+                )
+                m.db.session.commit()
+                latencias.append(time.monotonic() - inicio)
+            except OperationalError:
+                m.db.session.rollback()
+                erros += 1
+            posicao += 1
+    fila.put(('escrita', latencias, erros))
+
+
+def resumir(latencias, erros, duracao):
+    latencias = sorted(latencias)
+    if not latencias:
+        return {'operacoes': 0, 'erros': erros}
+    return {
+        'operacoes': len(latencias),
+        'por_segundo': round(len(latencias) / duracao, 1),
+        'erros': erros,
+        'p50_ms': round(statistics.median(latencias) * 1000, 2),
+        'p99_ms': round(latencias[max(int(len(latencias) * 0.99) - 1, 0)] * 1000, 2),
+    }
+
+
+def medir(origem, otimizado, leitores, duracao):
+    pasta = tempfile.mkdtemp()
+    caminho = os.path.join(pasta, 'benchmark.db')
+    shutil.copy(origem, caminho)
+    # Parte sempre do modo padrão: o journal_mode=WAL fica gravado no arquivo
+    conexao = sqlite3.connect(caminho)
+    conexao.execute('PRAGMA journal_mode=DELETE')
+    conexao.close()
+
+    fila = multiprocessing.Queue()
+    comeco = time.monotonic() + 3  # tempo para todos importarem o app
+    fim = comeco + duracao
+    processos = [multiprocessing.Process(target=escrever, args=(caminho, otimizado, comeco, fim, fila))]
+    processos += [
+        multiprocessing.Process(target=ler, args=(caminho, otimizado, comeco, fim, fila))
+        for _ in range(leitores)
+    ]
+    for processo in processos:
+        processo.start()
+    resultados = [fila.get() for _ in processos]
+    for processo in processos:
+        processo.join()
+    shutil.rmtree(pasta)
+
+    leituras = [r for r in resultados if r[0] == 'leitura']
+    escrita = next(r for r in resultados if r[0] == 'escrita')
+    return {
+        'leitura': resumir([l for _, parcial, _ in leituras for l in parcial],
+                           sum(e for _, _, e in leituras), duracao),
+        'escrita': resumir(escrita[1], escrita[2], duracao),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('banco', help='arquivo SQLite de origem (não é alterado)')
+    parser.add_argument('--leitores', type=int, default=4)
+    parser.add_argument('--duracao', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'padrao': medir(args.banco, False, args.leitores, args.duracao),
+        'otimizado': medir(args.banco, True, args.leitores, args.duracao),
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
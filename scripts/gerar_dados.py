@@ -0,0 +1,253 @@
+"""Gera um circuito sintético para medir desempenho (congregações, oradores, agenda, histórico...)
+
+Usa o banco de DATABASE_URL (ou --banco). Cria o esquema, aplica as migrações e
+os dados iniciais, e depois insere em lotes:
+
+    python scripts/gerar_dados.py --banco sqlite:////tmp/circuito.db --escala grande
+    python scripts/gerar_dados.py --escala pequena --historico 50000 --semente 7
+
+Escalas (congregações / oradores / linhas de histórico):
+    pequena   20 /    400 /    20.000
+    media    200 /  4.000 /   200.000
+    grande 1.000 / 20.000 / 1.000.000
+
+Os usuários oradores são criados como orador<id> com a senha orador123.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ESCALAS = {
+    'pequena': {'congregacoes': 20, 'oradores': 400, 'historico': 20000},
+    'media': {'congregacoes': 200, 'oradores': 4000, 'historico': 200000},
+    'grande': {'congregacoes': 1000, 'oradores': 20000, 'historico': 1000000},
+}
+
+CIDADES = [
+    'São Paulo', 'Campinas', 'Santos', 'Sorocaba', 'Ribeirão Preto', 'Bauru', 'Marília',
+    'Piracicaba', 'Jundiaí', 'Franca', 'Limeira', 'Taubaté', 'Guarulhos', 'Osasco',
+]
+BAIRROS = ['Central', 'Norte', 'Sul', 'Leste', 'Oeste', 'Jardim', 'Vila Nova', 'Parque', 'Alto', 'Vale']
+NOMES = [
+    'João', 'José', 'Antônio', 'Francisco', 'Carlos', 'Paulo', 'Pedro', 'Lucas', 'Marcos',
+    'Luiz', 'Gabriel', 'Rafael', 'Daniel', 'Marcelo', 'Bruno', 'Eduardo', 'Felipe', 'Rodrigo',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+    'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes',
+]
+HORARIOS = ['09:00', '10:00', '18:00', '19:30']
+EVENTOS = [
+    ('assembleia', 'Assembleia de circuito', True),
+    ('congresso', 'Congresso regional', True),
+    ('visita', 'Visita do superintendente de circuito', False),
+]
+
+
+def inserir_em_lotes(m, modelo, linhas, lote):
+    """Insere as linhas (um gerador de dicts) direto pela tabela, sem passar pelo ORM"""
+    tabela = modelo.__table__
+    total = 0
+    buffer = []
+    for linha in linhas:
+        buffer.append(linha)
+        if len(buffer) >= lote:
+            m.db.session.connection().execute(tabela.insert(), buffer)
+            m.db.session.commit()
+            total += len(buffer)
+            buffer = []
+    if buffer:
+        m.db.session.connection().execute(tabela.insert(), buffer)
+        m.db.session.commit()
+        total += len(buffer)
+    return total
+
+
+def ultimo_id(m, modelo):
+    return m.db.session.query(m.func.max(modelo.id)).scalar() or 0
+
+
+def gerar(m, args, aleatorio):
+    hoje = date.today()
+    domingo = hoje + timedelta(days=(6 - hoje.weekday()) % 7)
+    discursos = [id_ for (id_,) in m.db.session.query(m.Discurso.id).filter(m.Discurso.ativo == True)]
+    contagem = {}
+
+    def medir(nome, funcao):
+        inicio = time.monotonic()
+        contagem[nome] = funcao()
+        print(f"✅ {nome}: {contagem[nome]} linhas em {time.monotonic() - inicio:.1f}s")
+
+    antes = ultimo_id(m, m.Congregacao)
+    medir('congregacoes', lambda: inserir_em_lotes(m, m.Congregacao, (
+        {
+            'nome': f"Congregação {aleatorio.choice(BAIRROS)} {numero}",
+            'localidade': aleatorio.choice(CIDADES),
+            'ativo': aleatorio.random() > 0.03,
+        }
+        for numero in range(1, args.congregacoes + 1)
+    ), args.lote))
+    congregacoes = [id_ for (id_,) in m.db.session.query(m.Congregacao.id).filter(m.Congregacao.id > antes)]
+
+    antes = ultimo_id(m, m.Orador)
+    medir('oradores', lambda: inserir_em_lotes(m, m.Orador, (
+        {
+            'nome': f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}",
+            'congregacao_id': aleatorio.choice(congregacoes),
+            'anfitriao': aleatorio.random() < 0.3,
+            'telefone': f"(11) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}",
+            'email': f"orador{numero}@exemplo.org",
+            'aprovado': aleatorio.random() > 0.05,
+            'ativo': aleatorio.random() > 0.05,
+        }
+        for numero in range(1, args.oradores + 1)
+    ), args.lote))
+    oradores = []
+    anfitrioes_por_congregacao = {}
+    for id_, congregacao_id, anfitriao in m.db.session.query(
+        m.Orador.id, m.Orador.congregacao_id, m.Orador.anfitriao
+    ).filter(m.Orador.id > antes).order_by(m.Orador.id):
+        oradores.append(id_)
+        if anfitriao:
+            anfitrioes_por_congregacao.setdefault(congregacao_id, []).append(id_)
+    m.db.session.commit()
+
+    def linhas_historico():
+        dias = args.anos * 365
+        for _ in range(args.historico):
+            yield {
+                'data_realizacao': hoje - timedelta(days=aleatorio.randint(1, dias)),
+                'discurso_id': aleatorio.choice(discursos),
+                'orador_id': aleatorio.choice(oradores),
+                'congregacao_id': aleatorio.choice(congregacoes),
+                'created_at': datetime.utcnow(),
+            }
+    medir('historico', lambda: inserir_em_lotes(m, m.HistoricoDiscurso, linhas_historico(), args.lote))
+
+    def linhas_agenda():
+        # Uma reunião pública por semana em cada congregação, algumas semanas para trás e para frente
+        for congregacao_id in congregacoes:
+            horario = aleatorio.choice(HORARIOS)
+            anfitrioes = anfitrioes_por_congregacao.get(congregacao_id)
+            for semana in range(-args.semanas_passadas, args.semanas):
+                if aleatorio.random() < 0.1:
+                    continue
+                data_discurso = domingo + timedelta(weeks=semana)
+                passado = data_discurso < hoje
+                confirmado = passado or aleatorio.random() < 0.5
+                yield {
+                    'data_discurso': data_discurso,
+                    'horario': horario,
+                    'discurso_id': aleatorio.choice(discursos),
+                    'orador_id': aleatorio.choice(oradores),
+                    'congregacao_id': congregacao_id,
+                    'anfitriao_id': aleatorio.choice(anfitrioes) if anfitrioes else None,
+                    'realizado': passado,
+                    'confirmado_pelo_orador': confirmado,
+                    'data_confirmacao': datetime.utcnow() if confirmado else None,
+                }
+    medir('agenda', lambda: inserir_em_lotes(m, m.AgendaDiscurso, linhas_agenda(), args.lote))
+
+    def linhas_oradores_discursos():
+        # Como no portal: a linha só existe depois que o orador aceita o discurso
+        quantidade = min(args.discursos_por_orador, len(discursos))
+        for orador_id in oradores:
+            for discurso_id in aleatorio.sample(discursos, quantidade):
+                yield {
+                    'orador_id': orador_id,
+                    'discurso_id': discurso_id,
+                    'aceito': True,
+                    'data_aceitacao': datetime.utcnow() - timedelta(days=aleatorio.randint(0, 720)),
+                    'preparado': aleatorio.random() < 0.6,
+                    'created_at': datetime.utcnow(),
+                }
+    medir('oradores_discursos', lambda: inserir_em_lotes(
+        m, m.OradorDiscurso, linhas_oradores_discursos(), args.lote
+    ))
+
+    # Uma única derivação da senha serve para todos os usuários gerados
+    senha = m.servico_senhas.gerar('orador123')
+    medir('usuarios_oradores', lambda: inserir_em_lotes(m, m.UsuarioOrador, (
+        {
+            'orador_id': orador_id,
+            'username': f"orador{orador_id}",
+            'password': senha,
+            'ativo': True,
+            'data_criacao': datetime.utcnow(),
+        }
+        for orador_id in oradores if aleatorio.random() < args.usuarios
+    ), args.lote))
+
+    def linhas_eventos():
+        for congregacao_id in congregacoes:
+            for _ in range(args.eventos):
+                tipo, titulo, bloqueia = aleatorio.choice(EVENTOS)
+                inicio = hoje + timedelta(days=aleatorio.randint(-180, 365))
+                yield {
+                    'tipo': tipo,
+                    'titulo': titulo,
+                    'descricao': f"{titulo} ({congregacao_id})",
+                    'data_inicio': inicio,
+                    'data_fim': inicio + timedelta(days=aleatorio.randint(0, 2)),
+                    'bloqueia_agenda': bloqueia,
+                    'discursos_especiais': 1 if tipo == 'visita' else 0,
+                    'congregacao_id': congregacao_id,
+                }
+    medir('eventos', lambda: inserir_em_lotes(m, m.Evento, linhas_eventos(), args.lote))
+
+    inicio = time.monotonic()
+    with m.db.engine.begin() as conexao:
+        m.popular_ultimas_realizacoes(conexao)
+    print(f"✅ Índice de últimas realizações reconstruído em {time.monotonic() - inicio:.1f}s")
+    return contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--banco', help='URL do banco (padrão: DATABASE_URL)')
+    parser.add_argument('--escala', choices=ESCALAS, default='pequena')
+    parser.add_argument('--congregacoes', type=int)
+    parser.add_argument('--oradores', type=int)
+    parser.add_argument('--historico', type=int, help='linhas de histórico')
+    parser.add_argument('--anos', type=int, default=10, help='anos cobertos pelo histórico')
+    parser.add_argument('--semanas', type=int, default=26, help='semanas de agenda futura por congregação')
+    parser.add_argument('--semanas-passadas', type=int, default=8)
+    parser.add_argument('--discursos-por-orador', type=int, default=6)
+    parser.add_argument('--usuarios', type=float, default=0.5, help='fração dos oradores com usuário')
+    parser.add_argument('--eventos', type=int, default=2, help='eventos por congregação')
+    parser.add_argument('--lote', type=int, default=10000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--forcar', action='store_true', help='gera mesmo se o banco já tiver oradores')
+    args = parser.parse_args()
+
+    for chave, valor in ESCALAS[args.escala].items():
+        if getattr(args, chave) is None:
+            setattr(args, chave, valor)
+
+    if args.banco:
+        os.environ['DATABASE_URL'] = args.banco
+    # O hash da senha dos usuários gerados roda neste processo
+    os.environ.setdefault('SENHA_PROCESSOS', '0')
+    import app as m
+
+    with m.app.app_context():
+        m.db.create_all()
+        m.aplicar_migracoes()
+        m.criar_dados_iniciais()
+
+        if m.db.session.query(m.Orador.id).first() and not args.forcar:
+            sys.exit('❌ O banco já tem oradores. Use um banco vazio ou --forcar.')
+
+        inicio = time.monotonic()
+        contagem = gerar(m, args, random.Random(args.semente))
+        print(f"✅ {sum(contagem.values())} linhas geradas em {time.monotonic() - inicio:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Teste de carga simples contra uma instância em execução (só biblioteca padrão)
+
+Exemplos:
+    python scripts/teste_carga.py http://localhost:5000/saude/pronto
+    python scripts/teste_carga.py http://localhost:5000/api/discursos --usuario admin --senha admin123 \
+        --processos 4 --conexoes 8 --duracao 20
+
+Compare a vazão (req/s) subindo o servidor com WEB_CONCURRENCY=1, 2, 4...
+"""
+
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import statistics
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def abrir_sessao(url, usuario, senha):
+    """Cliente HTTP com cookies; faz login no app quando usuário e senha são informados"""
+    cookies = http.cookiejar.CookieJar()
+    cliente = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+    if usuario:
+        partes = urllib.parse.urlsplit(url)
+        login = f"{partes.scheme}://{partes.netloc}/login"
+        dados = urllib.parse.urlencode({'username': usuario, 'password': senha}).encode()
+        cliente.open(login, data=dados).read()
+    return cliente
+
+
+def executar_conexao(url, usuario, senha, fim):
+    cliente = abrir_sessao(url, usuario, senha)
+    latencias, erros = [], 0
+    while time.monotonic() < fim:
+        inicio = time.monotonic()
+        try:
+            with cliente.open(url, timeout=30) as resposta:
+                resposta.read()
+            latencias.append(time.monotonic() - inicio)
+        except Exception:
+            erros += 1
+    return latencias, erros
+
+
+def executar_processo(argumentos):
+    url, usuario, senha, conexoes, duracao = argumentos
+    fim = time.monotonic() + duracao
+    with ThreadPoolExecutor(conexoes) as executor:
+        resultados = list(executor.map(
+            lambda _: executar_conexao(url, usuario, senha, fim), range(conexoes)
+        ))
+    latencias = [latencia for parcial, _ in resultados for latencia in parcial]
+    return latencias, sum(erros for _, erros in resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--usuario')
+    parser.add_argument('--senha')
+    parser.add_argument('--processos', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--conexoes', type=int, default=4, help='conexões simultâneas por processo')
+    parser.add_argument('--duracao', type=float, default=10.0, help='segundos de carga')
+    args = parser.parse_args()
+
+    tarefa = (args.url, args.usuario, args.senha, args.conexoes, args.duracao)
+    with multiprocessing.Pool(args.processos) as pool:
+        resultados = pool.map(executar_processo, [tarefa] * args.processos)
+
+    latencias = sorted(latencia for parcial, _ in resultados for latencia in parcial)
+    erros = sum(erros for _, erros in resultados)
+    if not latencias:
+        print(json.dumps({'url': args.url, 'requisicoes': 0, 'erros': erros}))
+        return
+
+    print(json.dumps({
+        'url': args.url,
+        'clientes': args.processos * args.conexoes,
+        'requisicoes': len(latencias),
+        'erros': erros,
+        'req_por_segundo': round(len(latencias) / args.duracao, 1),
+        'p50_ms': round(statistics.median(latencias) * 1000, 1),
+        'p95_ms': round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 1),
+        'max_ms': round(latencias[-1] * 1000, 1),
+    }, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()